@@ -0,0 +1,27 @@
+"""add parse_key to resumes
+
+Revision ID: 8c1d4f2a9b37
+Revises: 34d3ab8675eb
+Create Date: 2026-10-18 09:12:41.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1d4f2a9b37'
+down_revision: Union[str, Sequence[str], None] = '34d3ab8675eb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.add_column('resumes', sa.Column('parse_key', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_resumes_parse_key'), 'resumes', ['parse_key'], unique=False)
+
+def downgrade():
+    op.drop_index(op.f('ix_resumes_parse_key'), table_name='resumes')
+    op.drop_column('resumes', 'parse_key')
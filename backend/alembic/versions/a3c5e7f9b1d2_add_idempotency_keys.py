@@ -0,0 +1,58 @@
+"""add idempotency_keys and unique answer per question
+
+Revision ID: a3c5e7f9b1d2
+Revises: f6b3d8e0a2c4
+Create Date: 2026-10-18 18:41:07.529163
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c5e7f9b1d2'
+down_revision: Union[str, Sequence[str], None] = 'f6b3d8e0a2c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.create_table('idempotency_keys',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('endpoint', sa.String(length=255), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('fingerprint', sa.String(length=64), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=True),
+    sa.Column('response_body', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'endpoint', 'key', name='uq_idempotency_keys_user_endpoint_key')
+    )
+    op.create_index(op.f('ix_idempotency_keys_user_id'), 'idempotency_keys', ['user_id'], unique=False)
+
+    # Keep the first answer of any duplicates left by racing submits
+    op.execute(
+        "DELETE FROM user_responses a USING user_responses b "
+        "WHERE a.session_id = b.session_id AND a.question_index = b.question_index "
+        "AND (COALESCE(a.created_at, 'epoch'), a.id::text) > (COALESCE(b.created_at, 'epoch'), b.id::text)"
+    )
+    # Sessions counted the dropped duplicates as answered
+    op.execute(
+        "UPDATE mock_sessions SET answered_questions = "
+        "(SELECT count(*) FROM user_responses WHERE user_responses.session_id = mock_sessions.id)"
+    )
+    op.create_unique_constraint(
+        'uq_user_responses_session_question', 'user_responses', ['session_id', 'question_index']
+    )
+
+def downgrade():
+    op.drop_constraint('uq_user_responses_session_question', 'user_responses', type_='unique')
+    op.drop_index(op.f('ix_idempotency_keys_user_id'), table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
@@ -0,0 +1,25 @@
+"""add grading_mode to mock_sessions
+
+Revision ID: b4e7a19c2d05
+Revises: 8c1d4f2a9b37
+Create Date: 2026-10-18 11:37:08.604912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e7a19c2d05'
+down_revision: Union[str, Sequence[str], None] = '8c1d4f2a9b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.add_column('mock_sessions', sa.Column('grading_mode', sa.String(length=20), nullable=True))
+
+def downgrade():
+    op.drop_column('mock_sessions', 'grading_mode')
@@ -0,0 +1,28 @@
+"""add file_hash to resumes
+
+Revision ID: c7d9e1f3a5b6
+Revises: a3c5e7f9b1d2
+Create Date: 2026-10-18 20:03:52.418260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d9e1f3a5b6'
+down_revision: Union[str, Sequence[str], None] = 'a3c5e7f9b1d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Existing resumes keep a NULL hash: their uploaded bytes were never stored
+    op.add_column('resumes', sa.Column('file_hash', sa.String(length=64), nullable=True))
+    op.create_index('ix_resumes_user_id_file_hash', 'resumes', ['user_id', 'file_hash'], unique=False)
+
+def downgrade():
+    op.drop_index('ix_resumes_user_id_file_hash', table_name='resumes')
+    op.drop_column('resumes', 'file_hash')
@@ -0,0 +1,26 @@
+"""add llm_usage to mock_sessions
+
+Revision ID: e2a9c4d7f1b3
+Revises: b4e7a19c2d05
+Create Date: 2026-10-18 14:52:31.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a9c4d7f1b3'
+down_revision: Union[str, Sequence[str], None] = 'b4e7a19c2d05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    op.add_column('mock_sessions', sa.Column('llm_usage', postgresql.JSONB(astext_type=sa.Text()), nullable=True))
+
+def downgrade():
+    op.drop_column('mock_sessions', 'llm_usage')
@@ -0,0 +1,33 @@
+"""strip raw_text from parsed_data
+
+Revision ID: f6b3d8e0a2c4
+Revises: e2a9c4d7f1b3
+Create Date: 2026-10-18 17:20:44.310952
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b3d8e0a2c4'
+down_revision: Union[str, Sequence[str], None] = 'e2a9c4d7f1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # The original text is already stored in `content`
+    for table in ('resumes', 'job_descriptions'):
+        op.execute(
+            f"UPDATE {table} SET parsed_data = parsed_data - 'raw_text' "
+            f"WHERE jsonb_exists(parsed_data, 'raw_text')"
+        )
+
+def downgrade():
+    for table in ('resumes', 'job_descriptions'):
+        op.execute(
+            f"UPDATE {table} SET parsed_data = parsed_data || jsonb_build_object('raw_text', content) "
+            f"WHERE parsed_data IS NOT NULL"
+        )
@@ -1,6 +1,15 @@
 # app/core/config.py
+from pydantic import BaseModel
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
+
+class LLMBackend(BaseModel):
+    """One (model, API key, endpoint) combination the LLM router can send calls to"""
+    name: str
+    model: str
+    api_key: Optional[str] = None  # defaults to chatgroq_api_key
+    base_url: Optional[str] = None  # defaults to llm_base_url
+    pools: List[str] = ["grading", "generation"]
 
 class Settings(BaseSettings):
     database_url: str
@@ -8,8 +17,107 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     chatgroq_api_key: Optional[str] = None
-    
+
+    # Shared LLM HTTP client
+    llm_base_url: Optional[str] = None
+    llm_http2: bool = True
+    llm_max_connections: int = 100
+    llm_max_keepalive_connections: int = 20
+    llm_keepalive_expiry: float = 30.0
+    llm_timeout: float = 120.0
+    llm_connect_timeout: float = 10.0
+    llm_max_retries: int = 2
+
+    # LLM admission control (per model; refined from provider rate-limit headers)
+    llm_requests_per_minute: int = 1000
+    llm_tokens_per_minute: int = 300000
+    llm_max_concurrency: int = 32
+    llm_max_queue: int = 200
+
+    # LLM routing. LLM_BACKENDS is a JSON list of LLMBackend objects; when empty,
+    # grading uses llm_grading_model and generation llm_generation_model on chatgroq_api_key.
+    llm_backends: List[LLMBackend] = []
+    llm_grading_model: str = "llama-3.3-70b-versatile"
+    llm_generation_model: str = "openai/gpt-oss-120b"
+    llm_hedge_after: float = 6.0  # seconds before a slow grading call is hedged
+    llm_max_attempts: int = 2  # backends tried before giving up
+    llm_latency_window: int = 100  # samples kept per backend for p95
+    llm_coalesce_requests: bool = True  # share one call between identical in-flight requests
+
+    # Fake / recorded LLM for offline and load testing: live | fake | record | replay
+    llm_mode: str = "live"
+    llm_record_path: str = "llm_recordings.jsonl"
+    fake_llm_latency: str = "lognormal:0.8,0.4"  # or fixed:S, uniform:A,B, normal:MU,SIGMA, recorded
+    fake_llm_seconds_per_kchar: float = 0.0  # prompt processing time
+    fake_llm_tokens_per_second: float = 0.0  # generation speed; 0 answers instantly
+    fake_llm_rate_limit_rate: float = 0.0  # share of calls answered with 429
+    fake_llm_malformed_rate: float = 0.0  # share of answers with damaged JSON
+    fake_llm_seed: Optional[int] = None
+
+    # LLM call metrics. Prices are USD per million [prompt, completion] tokens.
+    llm_pricing: Dict[str, List[float]] = {
+        "llama-3.3-70b-versatile": [0.59, 0.79],
+        "openai/gpt-oss-120b": [0.15, 0.75],
+    }
+    llm_metrics_max_users: int = 1000
+
+    # LLM failure handling
+    llm_call_timeout: float = 45.0  # cap on a single LLM call attempt
+    llm_request_deadline: float = 90.0  # total LLM budget of an API request
+    llm_breaker_failures: int = 5  # consecutive failures that open a backend's circuit
+    llm_breaker_cooldown: float = 30.0  # seconds an open circuit rejects calls
+    disconnect_poll_interval: float = 0.5
+
+    # Uploads: larger files are rejected while they are being received
+    max_upload_size_mb: int = 10
+
+    # PDF / DOCX text extraction in a process pool, with per-document limits
+    extraction_workers: int = 2
+    extraction_timeout: float = 20.0  # wall-clock seconds
+    extraction_cpu_seconds: int = 20
+    extraction_memory_mb: int = 1024  # address space of a worker process
+    extraction_pdf_pages_per_task: int = 8
+    # PDFs with at least this many pages are split across workers; 0 never splits.
+    # Each chunk re-parses the file, so measure with benchmarks/bench_extraction first.
+    extraction_pdf_parallel_min_pages: int = 0
+    extraction_max_chars: int = 100_000  # text kept per document; 0 = no limit
+
+    # Idempotency-Key handling on uploads and answer submission
+    idempotency_ttl_seconds: float = 24 * 60 * 60  # how long a key's response is replayed
+    idempotency_lock_timeout: float = 300.0  # an unfinished claim older than this is taken over
+    idempotency_wait_timeout: float = 120.0  # how long a repeat waits for the first request
+    idempotency_poll_interval: float = 0.25
+
+    # Caches
+    resume_parse_cache_size: int = 512
+    question_cache_size: int = 256
+    question_cache_ttl_seconds: float = 6 * 60 * 60
+
+    # Question generation fan-out
+    question_chunk_size: int = 5
+    question_fanout_concurrency: int = 4
+    question_dedupe_threshold: float = 0.8
+    question_repair_attempts: int = 1
+    # Token budget of a question generation prompt; the parsed content gets what the
+    # instructions leave, but never less than the minimum
+    question_prompt_token_budget: int = 3000
+    question_prompt_min_content_tokens: int = 500
+    # Parse an upload and generate its questions in one LLM call instead of two
+    fused_upload_pipeline: bool = False
+
+    # QA grading: "inline" grades during the submit request, "background" on a worker
+    # pool, "batch" once the whole session is answered. Sessions may override it.
+    qa_grading_mode: str = "inline"
+    pre_grader_enabled: bool = True  # grade trivial QA answers locally, without the LLM
+    batch_grading_max_answers: int = 10
+    grading_workers: int = 4
+    grading_queue_size: int = 1000
+    # Background / batch grades that hit an LLM outage stay pending and are retried
+    grading_max_retries: int = 3
+    grading_retry_backoff: float = 30.0  # seconds, doubled per retry
+    grading_stream_idle_timeout: float = 300.0  # a responses stream with no new grade for this long ends
+
     class Config:
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -1,21 +1,57 @@
 # app/main.py
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Request, status
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.core.config import settings
+from app.services.document_extractor import ExtractionLimitError, document_extractor
+from app.services.grading_worker import grading_pool
+from app.services.llm_client import close_llm_client
+from app.services.llm_guard import LLMDeadlineExceeded, LLMUnavailableError
+from app.services.llm_scheduler import LLMQueueFullError
+from app.services.qa_grading import requeue_pending_grades
+from app.services.uploads import MAX_UPLOAD_BYTES, REQUEST_OVERHEAD_BYTES, RequestSizeLimitMiddleware
+from contextlib import asynccontextmanager
+import logging
+import math
 import uvicorn
 
 # Import routers (we'll create these next)
-from app.routers import auth, users, resumes, job_descriptions, mock_sessions, file_parser, user_metrics
+from app.routers import auth, users, resumes, job_descriptions, mock_sessions, file_parser, user_metrics, metrics
+
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    grading_pool.start()
+    # Grading jobs are in memory only: pick up answers a restart left pending
+    try:
+        queued = requeue_pending_grades()
+        if queued:
+            logger.info("Re-queued %d pending grading jobs", queued)
+    except Exception:
+        logger.exception("Could not re-queue pending grading jobs")
+    yield
+    await grading_pool.stop()
+    document_extractor.shutdown()
+    # Release the pooled LLM connections
+    await close_llm_client()
 
 app = FastAPI(
     title="Mockr API",
     description="Mock Interview Platform API",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan,
+)
+
+# Request size limit: rejects oversized uploads while they are received. Added
+# before CORS so it runs inside it and its 413s still carry CORS headers.
+app.add_middleware(
+    RequestSizeLimitMiddleware, max_bytes=MAX_UPLOAD_BYTES + REQUEST_OVERHEAD_BYTES
 )
 
 # CORS middleware
@@ -31,6 +67,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(LLMQueueFullError)
+async def llm_queue_full_handler(request: Request, exc: LLMQueueFullError):
+    # Shed load instead of queueing without bound
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "The service is busy, please retry shortly."},
+        headers={"Retry-After": str(int(exc.retry_after))},
+    )
+
+@app.exception_handler(LLMUnavailableError)
+async def llm_unavailable_handler(request: Request, exc: LLMUnavailableError):
+    # Fail fast while the LLM is down or the request's time budget is spent
+    if isinstance(exc, LLMDeadlineExceeded):
+        return JSONResponse(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            content={"detail": "The request took too long, please retry."},
+        )
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "The AI service is temporarily unavailable, please retry shortly."},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+@app.exception_handler(ExtractionLimitError)
+async def extraction_limit_handler(request: Request, exc: ExtractionLimitError):
+    # The document itself is the problem (too slow or too big to read)
+    return JSONResponse(
+        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        content={"detail": f"Could not read the document: {exc}"},
+    )
+
 # Security
 security = HTTPBearer()
 
@@ -42,6 +109,7 @@ app.include_router(job_descriptions.router, prefix="/api/job-descriptions", tags
 app.include_router(file_parser.router, prefix="/api/parse", tags=["File Parsing"])
 app.include_router(mock_sessions.router, prefix="/api/mock-sessions", tags=["Mock Sessions"])
 app.include_router(user_metrics.router, prefix="/api/user-metrics", tags=["User Metrics"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["Metrics"])
 
 @app.get("/")
 async def root():
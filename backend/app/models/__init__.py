@@ -3,5 +3,6 @@ from .user import User
 from .resume import Resume
 from .job_description import JobDescription
 from .mock_session import MockSession, UserResponse
+from .idempotency_key import IdempotencyKey
 
-__all__ = ["User", "Resume", "JobDescription", "MockSession", "UserResponse"]
\ No newline at end of file
+__all__ = ["User", "Resume", "JobDescription", "MockSession", "UserResponse", "IdempotencyKey"]
\ No newline at end of file
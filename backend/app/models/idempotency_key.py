@@ -0,0 +1,23 @@
+# app/models/idempotency_key.py
+from sqlalchemy import Column, String, DateTime, Integer, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from app.database import Base
+import uuid
+from datetime import datetime, timezone
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "endpoint", "key", name="uq_idempotency_keys_user_endpoint_key"),
+    )
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    endpoint = Column(String(255), nullable=False)  # request path
+    key = Column(String(255), nullable=False)  # Idempotency-Key header
+    fingerprint = Column(String(64), nullable=False)  # sha256 of the request payload
+    status = Column(String(20), nullable=False, default="in_progress")  # in_progress / completed
+    status_code = Column(Integer)
+    response_body = Column(JSONB)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    completed_at = Column(DateTime(timezone=True))
@@ -1,5 +1,5 @@
 # app/models/mock_session.py
-from sqlalchemy import ARRAY, Column, String, DateTime, Integer, ForeignKey
+from sqlalchemy import ARRAY, Column, String, DateTime, Integer, ForeignKey, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -22,6 +22,8 @@ class MockSession(Base):
     status = Column(String(50), default='active')  # active, completed, abandoned
     difficulty_level = Column(String(20), default='medium')
     focus_areas = Column(ARRAY(String), nullable=True, default=[])
+    grading_mode = Column(String(20), nullable=True)  # inline, background, batch (None: server default)
+    llm_usage = Column(JSONB, nullable=True)  # LLM calls, tokens, cost and latency spent on this session
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     completed_at = Column(DateTime, nullable=True)
     
@@ -31,6 +33,9 @@ class MockSession(Base):
 
 class UserResponse(Base):
     __tablename__ = "user_responses"
+    __table_args__ = (
+        UniqueConstraint("session_id", "question_index", name="uq_user_responses_session_question"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     session_id = Column(UUID(as_uuid=True), ForeignKey("mock_sessions.id"), nullable=False)
@@ -1,5 +1,5 @@
 # app/models/resume.py
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -8,6 +8,9 @@ from datetime import datetime, timezone
 
 class Resume(Base):
     __tablename__ = "resumes"
+    __table_args__ = (
+        Index("ix_resumes_user_id_file_hash", "user_id", "file_hash"),
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -17,6 +20,8 @@ class Resume(Base):
     parsed_data = Column(JSONB)
     file_type = Column(String(10), nullable=False)  # pdf, docx, txt
     file_size = Column(String(20))
+    parse_key = Column(String(64), index=True)  # sha256 of content + parse prompt version
+    file_hash = Column(String(64))  # sha256 of the uploaded file
     created_at = Column(DateTime, default=datetime.now(timezone.utc))
     
     # Relationships
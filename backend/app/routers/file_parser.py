@@ -1,38 +1,45 @@
 # app/routers/file_parser.py
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, Request, UploadFile, File, HTTPException
+from sqlalchemy.orm import Session
+from app.database import get_db
 from app.services.file_processor import FileProcessor
+from app.services.llm_guard import cancel_on_disconnect, llm_deadline
+from app.services.uploads import spool_upload
 
 router = APIRouter()
 
-@router.post("/parse-resume")
-async def parse_resume(file: UploadFile = File(...)):
-    content = await file.read()
-    filename = file.filename.lower()
-
-    if filename.endswith(".pdf"):
-        text = FileProcessor.extract_text_from_pdf(content)
-    elif filename.endswith(".docx"):
-        text = FileProcessor.extract_text_from_docx(content)
-    elif filename.endswith(".txt"):
-        text = FileProcessor.extract_text_from_txt(content)
-    else:
+
+async def read_upload_text(file: UploadFile) -> str:
+    """Text of an uploaded PDF / DOCX / TXT whose extension matches its content"""
+    file_type = file.filename.lower().rsplit(".", 1)[-1]
+    if file_type not in ("pdf", "docx", "txt"):
         raise HTTPException(status_code=400, detail="Unsupported file format")
+    with await spool_upload(file) as upload:
+        if upload.file_type != file_type:
+            raise HTTPException(status_code=400, detail="File content does not match its extension")
+        return await FileProcessor.extract_text(file_type, upload.path)
 
-    return FileProcessor.parse_resume_with_llm(text)
+@router.post("/parse-resume")
+async def parse_resume(
+    request: Request, file: UploadFile = File(...), db: Session = Depends(get_db)
+):
+    text = await read_upload_text(file)
+
+    with llm_deadline(request):
+        parsed_data, _ = await cancel_on_disconnect(
+            request, FileProcessor.parse_resume_cached(text, db)
+        )
+    # The model no longer echoes the text back; attach the original here
+    return {**parsed_data, "raw_text": text}
 
 @router.post("/parse-job-description")
-async def parse_job_description(file: UploadFile = File(...)):
-    content = await file.read()
-    filename = file.filename.lower()
-
-    if filename.endswith(".pdf"):
-        text = FileProcessor.extract_text_from_pdf(content)
-    elif filename.endswith(".docx"):
-        text = FileProcessor.extract_text_from_docx(content)
-    elif filename.endswith(".txt"):
-        text = FileProcessor.extract_text_from_txt(content)
-    else:
-        raise HTTPException(status_code=400, detail="Unsupported file format")
-
-    return FileProcessor.parse_job_description_with_llm(text)
+async def parse_job_description(request: Request, file: UploadFile = File(...)):
+    text = await read_upload_text(file)
+
+    with llm_deadline(request):
+        parsed_data = await cancel_on_disconnect(
+            request, FileProcessor.parse_job_description_with_llm(text)
+        )
+    # The model no longer echoes the text back; attach the original here
+    return {**parsed_data, "raw_text": text}
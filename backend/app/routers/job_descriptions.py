@@ -2,9 +2,11 @@
 from datetime import datetime, timezone
 import json
 from uuid import uuid4
-from fastapi import APIRouter, Depends, Form, HTTPException, status
+from fastapi import APIRouter, Depends, Form, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
 from app.database import get_db
 from app.models.user import User
 from app.models.job_description import JobDescription
@@ -12,12 +14,74 @@ from app.models.mock_session import MockSession
 from app.schemas.job_description import JobDescriptionCreate, JobDescriptionResponse
 from app.core.auth import get_current_user
 from app.services.file_processor import FileProcessor, JobDescriptionNormalizer
-from app.schemas.mock_session import MockSessionResponse
+from app.schemas.mock_session import GRADING_MODES, MockSessionResponse
+from app.services.llm_grader import LLMGrader
+from app.services.idempotency import request_fingerprint, run_idempotent
+from app.services.llm_guard import cancel_on_disconnect, llm_deadline
+from app.services.llm_metrics import track_llm_usage
+from app.services.session_stream import stream_mock_session
 
 router = APIRouter()
 
+def normalize_job_description_content(content: str) -> str:
+    """Validate and normalize job description content"""
+    if not content.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Job description content cannot be empty",
+        )
+    return JobDescriptionNormalizer.normalize_with_validation(content)
+
+def save_job_description(
+    title: str,
+    company: str,
+    content: str,
+    parsed_data: Dict[str, Any],
+    db: Session,
+    current_user: User,
+) -> JobDescription:
+    """Create the job description record for parsed content"""
+    db_job = JobDescription(
+        user_id=current_user.id,
+        title=title,
+        company=company,
+        content=content,
+        parsed_data=parsed_data,
+        created_at=datetime.now(timezone.utc),
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+
+    return db_job
+
+async def store_job_description(
+    title: str, company: str, content: str, db: Session, current_user: User
+) -> JobDescription:
+    """Validate, normalize, parse and save job description content"""
+
+    # Normalize + parse JD
+    normalized_content = normalize_job_description_content(content)
+    parsed_data = await FileProcessor.parse_job_description_with_llm(
+        normalized_content, normalized=True
+    )
+
+    return save_job_description(title, company, content, parsed_data, db, current_user)
+
+async def store_job_description_with_questions(
+    title: str, company: str, content: str, db: Session, current_user: User, **question_args: Any
+) -> Tuple[JobDescription, List[Dict[str, Any]]]:
+    """`store_job_description` plus question generation, as one fused LLM call"""
+    normalized_content = normalize_job_description_content(content)
+    parsed_data, questions = await FileProcessor.parse_and_generate(
+        "job_description", normalized_content, **question_args
+    )
+    db_job = save_job_description(title, company, content, parsed_data, db, current_user)
+    return db_job, questions
+
 @router.post("/upload", response_model=MockSessionResponse, status_code=status.HTTP_201_CREATED)
 async def upload_job_description(
+    request: Request,
     title: str = Form(...),
     company: str = Form(""),
     content: str = Form(...),
@@ -26,70 +90,150 @@ async def upload_job_description(
     difficulty: str = Form(...),
     practice_mode: str = Form(...),
     focus_areas: List[str] = Form(default=[]),
+    grading: Optional[str] = Form(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Upload job description content and create a mock interview session"""
-
-    if not content.strip():
+    if grading is not None and grading not in GRADING_MODES:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Job description content cannot be empty",
+            detail=f"Invalid grading mode. Allowed: {', '.join(GRADING_MODES)}",
         )
+    # Repeats with the same Idempotency-Key replay the first response
+    fingerprint = request_fingerprint(
+        title, company, content, mock_name, num_questions, difficulty, practice_mode, focus_areas, grading
+    )
 
-    # Normalize + parse JD
-    normalized_content = JobDescriptionNormalizer.normalize_with_validation(content)
-    parsed_data = FileProcessor.parse_job_description_with_llm(normalized_content)
+    async def create_session() -> MockSession:
+        # LLM work is bounded by the request deadline and dropped if the client leaves
+        with llm_deadline(request), track_llm_usage(user_id=current_user.id) as usage:
+            if settings.fused_upload_pipeline:
+                db_job, questions = await cancel_on_disconnect(request, store_job_description_with_questions(
+                    title, company, content, db, current_user,
+                    difficulty=difficulty,
+                    practice_mode=practice_mode,
+                    num_questions=num_questions,
+                    focus_areas=focus_areas
+                ))
+            else:
+                db_job = await cancel_on_disconnect(
+                    request, store_job_description(title, company, content, db, current_user)
+                )
 
-    # Save job description
-    db_job = JobDescription(
-        user_id=current_user.id,
-        title=title,
-        company=company,
-        content=content,
-        parsed_data=parsed_data,
-        created_at=datetime.now(timezone.utc),
-    )
-    db.add(db_job)
-    db.commit()
-    db.refresh(db_job)
+                # Generate MCQ questions
+                questions = await cancel_on_disconnect(request, FileProcessor.generate_questions(
+                    json.dumps(db_job.parsed_data),
+                    difficulty=difficulty,
+                    practice_mode=practice_mode,
+                    num_questions=num_questions,
+                    focus_areas=focus_areas
+                ))
+        if not questions:
+            raise HTTPException(
+                status_code=500, detail="Failed to generate mock questions from JD."
+            )
 
-    # Generate MCQ questions
-    questions = await FileProcessor.generate_questions(
-        json.dumps(parsed_data),
-        difficulty=difficulty,
-        practice_mode=practice_mode,
-        num_questions=num_questions,
-        focus_areas=focus_areas
+        # Create session
+        mock_session_id = uuid4()
+        session = MockSession(
+            id=mock_session_id,
+            user_id=current_user.id,
+            source_type="job_description",
+            practice_mode=practice_mode,
+            source_id=db_job.id,
+            session_name=mock_name,
+            questions=LLMGrader.attach_rubrics(questions),
+            total_questions=len(questions),
+            answered_questions=0,
+            status="ongoing",
+            difficulty_level=difficulty,
+            focus_areas=focus_areas,
+            grading_mode=grading,
+            llm_usage=usage.to_dict(),
+            created_at=datetime.now(timezone.utc),
+        )
+
+        db.add(session)
+        db.commit()
+        db.refresh(session)
+
+        return session
+
+    return await run_idempotent(
+        request, current_user.id, fingerprint, create_session, MockSessionResponse, status.HTTP_201_CREATED
     )
-    if not questions:
+
+@router.post("/upload/stream")
+async def upload_job_description_stream(
+    request: Request,
+    title: str = Form(...),
+    company: str = Form(""),
+    content: str = Form(...),
+    mock_name: str = Form(...),
+    num_questions: str = Form(...),
+    difficulty: str = Form(...),
+    practice_mode: str = Form(...),
+    focus_areas: List[str] = Form(default=[]),
+    grading: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Upload job description content and stream the mock session back as
+    Server-Sent Events, starting as soon as the first question is generated.
+    """
+    if grading is not None and grading not in GRADING_MODES:
         raise HTTPException(
-            status_code=500, detail="Failed to generate mock questions from JD."
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid grading mode. Allowed: {', '.join(GRADING_MODES)}",
         )
+    # Only parsing is bounded here; the stream itself ends when the client disconnects
+    if settings.fused_upload_pipeline:
+        pipeline = FileProcessor.stream_parse_and_generate(
+            "job_description",
+            normalize_job_description_content(content),
+            difficulty=difficulty,
+            practice_mode=practice_mode,
+            num_questions=num_questions,
+            focus_areas=focus_areas
+        )
+        # The fused call is read up to its parsed_data section here, the questions while streaming
+        with llm_deadline(request), track_llm_usage(user_id=current_user.id) as usage:
+            _, parsed_data = await cancel_on_disconnect(request, anext(pipeline))
+        db_job = save_job_description(title, company, content, parsed_data, db, current_user)
+        questions = (question async for _, question in pipeline)
+    else:
+        with llm_deadline(request), track_llm_usage(user_id=current_user.id) as usage:
+            db_job = await cancel_on_disconnect(
+                request, store_job_description(title, company, content, db, current_user)
+            )
 
-    # Create session
-    mock_session_id = uuid4()
-    session = MockSession(
-        id=mock_session_id,
+        questions = FileProcessor.stream_questions(
+            json.dumps(db_job.parsed_data),
+            difficulty=difficulty,
+            practice_mode=practice_mode,
+            num_questions=num_questions,
+            focus_areas=focus_areas
+        )
+    events = stream_mock_session(
+        questions,
+        expected_questions=int(num_questions),
+        usage=usage,
         user_id=current_user.id,
         source_type="job_description",
         practice_mode=practice_mode,
         source_id=db_job.id,
         session_name=mock_name,
-        questions=questions,
-        total_questions=len(questions),
-        answered_questions=0,
-        status="ongoing",
         difficulty_level=difficulty,
         focus_areas=focus_areas,
-        created_at=datetime.now(timezone.utc),
+        grading_mode=grading,
+    )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-
-    db.add(session)
-    db.commit()
-    db.refresh(session)
-
-    return session
 
 @router.get("/", response_model=List[JobDescriptionResponse])
 async def get_user_job_descriptions(
@@ -122,6 +266,7 @@ async def get_job_description(
 
 @router.put("/{job_id}", response_model=JobDescriptionResponse)
 async def update_job_description(
+    request: Request,
     job_id: str,
     job_data: JobDescriptionCreate,
     db: Session = Depends(get_db),
@@ -140,7 +285,10 @@ async def update_job_description(
         )
     
     # Parse updated content
-    parsed_data = FileProcessor.parse_job_description_with_llm(job_data.content)
+    with llm_deadline(request), track_llm_usage(user_id=current_user.id):
+        parsed_data = await cancel_on_disconnect(
+            request, FileProcessor.parse_job_description_with_llm(job_data.content)
+        )
     
     # Update job description
     job.title = job_data.title
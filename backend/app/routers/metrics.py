@@ -0,0 +1,55 @@
+# app/routers/metrics.py
+from fastapi import APIRouter, Depends
+from app.core.auth import get_current_user
+from app.services.document_extractor import document_extractor
+from app.services.file_processor import FileProcessor
+from app.services.llm_metrics import llm_metrics
+from app.services.llm_router import llm_router
+from app.services.llm_scheduler import llm_scheduler
+from app.services.llm_singleflight import llm_single_flight
+from app.services.pre_grader import PreGrader
+
+# Operational counters (spend, backends, queue depth) are for signed-in users only
+router = APIRouter(dependencies=[Depends(get_current_user)])
+
+
+@router.get("/cache")
+async def get_cache_metrics():
+    """Hit/miss counters for the LLM result caches"""
+    return FileProcessor.cache_stats()
+
+
+@router.get("/llm-scheduler")
+async def get_llm_scheduler_metrics():
+    """Queue times, rejections and rate-limit state of the LLM scheduler"""
+    return llm_scheduler.stats()
+
+
+@router.get("/llm-backends")
+async def get_llm_backend_metrics():
+    """Per-backend latency, error rate and load as seen by the LLM router"""
+    return llm_router.stats()
+
+
+@router.get("/pre-grader")
+async def get_pre_grader_metrics():
+    """How many QA answers were graded locally, by reason, and how many went to the LLM"""
+    return PreGrader.stats()
+
+
+@router.get("/llm-calls")
+async def get_llm_call_metrics():
+    """LLM calls by operation, model and outcome: latency and token histograms, retries and cost"""
+    return llm_metrics.stats()
+
+
+@router.get("/llm-coalescing")
+async def get_llm_coalescing_metrics():
+    """LLM calls made vs identical in-flight requests that shared one of them"""
+    return llm_single_flight.stats()
+
+
+@router.get("/document-extraction")
+async def get_document_extraction_metrics():
+    """Documents read by the extraction process pool, failures and limit hits"""
+    return document_extractor.stats()
@@ -1,18 +1,33 @@
-from fastapi import APIRouter, Depends, Form, HTTPException, status
+from fastapi import APIRouter, Depends, Form, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from uuid import UUID, uuid4
 from typing import List, Optional
 from app.core.auth import get_current_user
-from app.database import get_db
+from app.core.config import settings
+from app.database import SessionLocal, get_db
 from app.models.user import User
 from app.models.resume import Resume
 from app.models.job_description import JobDescription
-from app.services.llm_grader import LLMGrader
 from app.models.mock_session import MockSession, UserResponse
 from app.schemas.mock_session import AnswerSubmission, MockSessionCreate, MockSessionResponse, UserResponseResponse
 from app.services.file_processor import FileProcessor
+from app.services.grading_worker import grading_pool
+from app.services.idempotency import request_fingerprint, run_idempotent
+from app.services.llm_guard import cancel_on_disconnect, llm_deadline
+from app.services.llm_metrics import track_llm_usage
+from app.services.qa_grading import (
+    grade_pending_response,
+    grade_qa_response,
+    grade_session_batch,
+    pre_grade_response,
+)
+from app.services.session_stream import sse_event
 from datetime import datetime, timezone
+import asyncio
 import uuid
 import json
 
@@ -177,6 +192,7 @@ async def delete_mock_session(
 
 @router.post("/{session_id}/submit", response_model=UserResponseResponse)
 async def submit_answer(
+    request: Request,
     session_id: UUID,
     answer_data: AnswerSubmission,
     db: Session = Depends(get_db),
@@ -184,129 +200,150 @@ async def submit_answer(
 ):
     """Submit an answer for a specific question in a mock session"""
 
-    session = db.query(MockSession).filter(
-        MockSession.id == session_id,
-        MockSession.user_id == current_user.id
-    ).first()
-
-    if not session:
-        raise HTTPException(status_code=404, detail="Mock session not found")
+    # Repeats with the same Idempotency-Key replay the first response
+    fingerprint = request_fingerprint(str(session_id), answer_data.model_dump(mode="json"))
 
-    if session.status != "ongoing":
-        raise HTTPException(status_code=400, detail="Session is already completed or inactive")
+    async def record_answer() -> UserResponse:
+        session = db.query(MockSession).filter(
+            MockSession.id == session_id,
+            MockSession.user_id == current_user.id
+        ).first()
 
-    # Prevent duplicate submission
-    existing = db.query(UserResponse).filter(
-        UserResponse.session_id == session_id,
-        UserResponse.question_index == answer_data.question_index
-    ).first()
+        if not session:
+            raise HTTPException(status_code=404, detail="Mock session not found")
 
-    if existing:
-        raise HTTPException(status_code=400, detail="Answer for this question already submitted")
+        if session.status != "ongoing":
+            raise HTTPException(status_code=400, detail="Session is already completed or inactive")
 
-    # Fetch the correct question
-    try:
-        question = session.questions[answer_data.question_index]
-    except IndexError:
-        raise HTTPException(status_code=400, detail="Invalid question index")
+        # Prevent duplicate submission
+        existing = db.query(UserResponse).filter(
+            UserResponse.session_id == session_id,
+            UserResponse.question_index == answer_data.question_index
+        ).first()
 
-    # Default response
-    is_correct = "ungraded"
-    score = 0
-    feedback = "Your answer will be reviewed."
-    detailed_feedback = None
+        if existing:
+            raise HTTPException(status_code=400, detail="Answer for this question already submitted")
 
-    # Determine question type and grade accordingly
-    question_type = session.practice_mode or "mcq"
+        # Fetch the correct question
+        try:
+            question = session.questions[answer_data.question_index]
+        except IndexError:
+            raise HTTPException(status_code=400, detail="Invalid question index")
+
+        # Default response
+        is_correct = "ungraded"
+        score = 0
+        feedback = "Your answer will be reviewed."
+        detailed_feedback = None
+        grading_mode = None  # QA only
+
+        # Determine question type and grade accordingly
+        question_type = session.practice_mode or "mcq"
     
-    if question_type == "mcq":
-        # Existing MCQ logic
-        correct_answer = question.get("answer")
-        if correct_answer:
-            user_ans = answer_data.user_answer.strip().lower()
-            correct_ans = correct_answer.strip().lower()
-            if user_ans == correct_ans:
-                is_correct = "correct"
-                score = 100
-                feedback = "Correct Answer!"
-            else:
-                is_correct = "incorrect"
-                feedback = question.get("explanation", "")
+        if question_type == "mcq":
+            # Existing MCQ logic
+            correct_answer = question.get("answer")
+            if correct_answer:
+                user_ans = answer_data.user_answer.strip().lower()
+                correct_ans = correct_answer.strip().lower()
+                if user_ans == correct_ans:
+                    is_correct = "correct"
+                    score = 100
+                    feedback = "Correct Answer!"
+                else:
+                    is_correct = "incorrect"
+                    feedback = question.get("explanation", "")
     
-    elif question_type == "qa" or question_type == "open":
-        try:
-            # Get context from the session source
-            context = await get_session_context(session, db)
-            
-            # Grade using LLM
-            grading_result = await LLMGrader.grade_qa_answer(
-                question=question.get("question", ""),
-                user_answer=answer_data.user_answer,
-                context=context,
-                difficulty=session.difficulty_level
-            )
-            
-            score = grading_result["score"]
-            is_correct = grading_result["correctness_level"]
-            feedback = grading_result["feedback"]
-            detailed_feedback = {
-                "strengths": grading_result.get("strengths", []),
-                "improvements": grading_result.get("improvements", [])
-            }
-            
-        except Exception as e:
-            # Fallback if LLM grading fails
-            is_correct = "ungraded"
-            score = 0
-            feedback = f"Unable to grade automatically: {str(e)}"
-
-    # Record user response
-    response = UserResponse(
-        session_id=session_id,
-        question_index=answer_data.question_index,
-        question_text=answer_data.question_text,
-        question_type=answer_data.question_type,
-        user_answer=answer_data.user_answer,
-        is_correct=is_correct,
-        score=score,
-        feedback=feedback,
-        detailed_feedback=detailed_feedback,  # This should now work
-        time_taken=answer_data.time_taken,
-        created_at=datetime.now(timezone.utc)
-    )
+        elif question_type == "qa" or question_type == "open":
+            grading_mode = session.grading_mode or settings.qa_grading_mode
+            # Trivial answers are graded locally right away, whatever the mode
+            result = pre_grade_response(question, answer_data.user_answer)
+            if result is not None:
+                score = result["score"]
+                is_correct = result["is_correct"]
+                feedback = result["feedback"]
+                detailed_feedback = result["detailed_feedback"]
+            elif grading_mode == "background":
+                # Store now, grade on the worker pool and push the result later
+                is_correct = "pending"
+                score = None
+                feedback = "Your answer is being graded."
+            elif grading_mode == "batch":
+                # Graded together with the rest of the session once it is complete
+                is_correct = "pending"
+                score = None
+                feedback = "Your answer will be graded when you finish the session."
+            else:
+                with llm_deadline(request), track_llm_usage(user_id=current_user.id) as usage:
+                    result = await cancel_on_disconnect(
+                        request, grade_qa_response(
+                            session, question, answer_data.user_answer, db, pre_graded=True
+                        )
+                    )
+                session.llm_usage = usage.combined(session.llm_usage)
+                score = result["score"]
+                is_correct = result["is_correct"]
+                feedback = result["feedback"]
+                detailed_feedback = result["detailed_feedback"]
+
+        # Record user response
+        response = UserResponse(
+            session_id=session_id,
+            question_index=answer_data.question_index,
+            question_text=answer_data.question_text,
+            question_type=answer_data.question_type,
+            user_answer=answer_data.user_answer,
+            is_correct=is_correct,
+            score=score,
+            feedback=feedback,
+            detailed_feedback=detailed_feedback,  # This should now work
+            time_taken=answer_data.time_taken,
+            created_at=datetime.now(timezone.utc)
+        )
 
-    db.add(response)
+        db.add(response)
 
-    # Update session progress
-    session.answered_questions += 1
-    if answer_data.question_index >= session.current_question_index:
-        session.current_question_index = answer_data.question_index + 1
+        # Update session progress
+        session.answered_questions += 1
+        if answer_data.question_index >= session.current_question_index:
+            session.current_question_index = answer_data.question_index + 1
 
-    if session.answered_questions >= session.total_questions:
-        session.status = "completed"
-        session.completed_at = datetime.now(timezone.utc)
+        if session.answered_questions >= session.total_questions:
+            session.status = "completed"
+            session.completed_at = datetime.now(timezone.utc)
 
-    db.commit()
-    db.refresh(response)
-
-    return response
-
-# Helper function to get context for grading
-async def get_session_context(session: MockSession, db: Session) -> str:
-    """Get context information for LLM grading"""
-    try:
-        if session.source_type == "resume":
-            resume = db.query(Resume).filter(Resume.id == session.source_id).first()
-            if resume and resume.parsed_data:
-                return f"Resume context: {json.dumps(resume.parsed_data)}"
-        elif session.source_type == "job_description":
-            jd = db.query(JobDescription).filter(JobDescription.id == session.source_id).first()
-            if jd and jd.parsed_data:
-                return f"Job description context: {json.dumps(jd.parsed_data)}"
-        
-        return "No additional context available"
-    except Exception:
-        return "No additional context available"
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent submit for the same question won the unique constraint
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Answer for this question already submitted")
+        db.refresh(response)
+
+        if is_correct == "pending" and grading_mode == "background":
+            try:
+                grading_pool.submit(grade_pending_response, response.id)
+            except asyncio.QueueFull:
+                # Pool saturated: grade inline rather than dropping the answer
+                await grade_pending_response(response.id)
+                db.refresh(response)
+        elif (
+            question_type in ("qa", "open")
+            and grading_mode == "batch"
+            and session.status == "completed"
+        ):
+            # The last answer may have been pre-graded; earlier ones can still be pending
+            try:
+                grading_pool.submit(grade_session_batch, session_id)
+            except asyncio.QueueFull:
+                await grade_session_batch(session_id)
+                db.refresh(response)
+
+        return response
+
+    return await run_idempotent(
+        request, current_user.id, fingerprint, record_answer, UserResponseResponse
+    )
 
 @router.get("/{session_id}/responses", response_model=List[UserResponseResponse])
 async def get_responses_for_session(
@@ -326,6 +363,86 @@ async def get_responses_for_session(
     return session.responses
 
 
+@router.get("/{session_id}/responses/stream")
+async def stream_responses_for_session(
+    session_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Server-Sent Events stream of a session's responses: sends the current
+    responses, then each background grade as it completes. Ends with a `done`
+    event (carrying the count still pending) once nothing is being graded:
+    no answer is pending, the pending ones are batch answers of a session not
+    yet complete, no grade arrived for `grading_stream_idle_timeout`, or
+    the session was deleted.
+    """
+    session = db.query(MockSession).filter(
+        MockSession.id == session_id,
+        MockSession.user_id == current_user.id
+    ).first()
+
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    updates = grading_pool.subscribe(session_id)
+
+    def load_responses():
+        """The session's responses, how many are pending, and whether they are being graded"""
+        stream_db = SessionLocal()
+        try:
+            stream_session = stream_db.query(MockSession).filter(MockSession.id == session_id).first()
+            if stream_session is None:
+                # Deleted while streaming; its responses went with it
+                return [], 0, False
+            responses = stream_db.query(UserResponse).filter(
+                UserResponse.session_id == session_id
+            ).all()
+            pending = sum(r.is_correct == "pending" for r in responses)
+            # Batch answers wait for the session's last answer, not for this stream
+            batch = (stream_session.grading_mode or settings.qa_grading_mode) == "batch"
+            grading = pending > 0 and not (batch and stream_session.status != "completed")
+            return [
+                UserResponseResponse.model_validate(r).model_dump(mode="json")
+                for r in responses
+            ], pending, grading
+        finally:
+            stream_db.close()
+
+    async def events():
+        try:
+            responses, pending, grading = await run_in_threadpool(load_responses)
+            for payload in responses:
+                yield sse_event("response", payload)
+
+            loop = asyncio.get_running_loop()
+            last_progress = loop.time()
+            while grading:
+                try:
+                    payload = await asyncio.wait_for(updates.get(), timeout=15)
+                    yield sse_event("response", payload)
+                except asyncio.TimeoutError:
+                    # Grades finished by another worker process are picked up here
+                    yield ": keep-alive\n\n"
+                previous = pending
+                _, pending, grading = await run_in_threadpool(load_responses)
+                if pending < previous:
+                    last_progress = loop.time()
+                elif loop.time() - last_progress > settings.grading_stream_idle_timeout:
+                    # Grades may still land (e.g. an outage retry); the client can reconnect
+                    break
+
+            yield sse_event("done", {"session_id": str(session_id), "pending": pending})
+        finally:
+            grading_pool.unsubscribe(session_id, updates)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/active", response_model=Optional[MockSessionResponse])
 async def get_active_mock_session(
     db: Session = Depends(get_db),
@@ -1,19 +1,28 @@
 # app/routers/resumes.py
 from uuid import uuid4
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Request, status, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
 from app.database import get_db
 from app.models.user import User
 from app.models.resume import Resume
 from app.schemas.resume import ResumeResponse
 from app.models.mock_session import MockSession
 from app.core.auth import get_current_user
+from app.services.document_extractor import ExtractionLimitError
 from app.services.file_processor import FileProcessor
+from app.services.llm_grader import LLMGrader
+from app.services.idempotency import request_fingerprint, run_idempotent
+from app.services.llm_guard import cancel_on_disconnect, llm_deadline
+from app.services.llm_metrics import track_llm_usage
+from app.services.session_stream import stream_mock_session
+from app.services.uploads import SpooledUpload, spool_upload
 import json
 from datetime import datetime, timezone
 
-from app.schemas.mock_session import MockSessionResponse
+from app.schemas.mock_session import GRADING_MODES, MockSessionResponse
 
 router = APIRouter()
 
@@ -23,23 +32,10 @@ ALLOWED_FILE_TYPES = {
     "text/plain": "txt",
 }
 
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 
 
-@router.post(
-    "/upload", response_model=MockSessionResponse, status_code=status.HTTP_201_CREATED
-)
-async def upload_resume(
-    file: UploadFile = File(...),
-    mock_name: str = Form(...),
-    num_questions: str = Form(...),
-    difficulty: str = Form(...),
-    practice_mode: str = Form(...),
-    focus_areas: List[str] = Form(default=[]),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    """Upload and process resume file"""
+async def spool_resume_upload(file: UploadFile) -> SpooledUpload:
+    """Validate an uploaded resume's type and size and copy it to disk"""
 
     # Validate file type
     if file.content_type not in ALLOWED_FILE_TYPES:
@@ -48,29 +44,24 @@ async def upload_resume(
             detail=f"File type {file.content_type} not allowed. Allowed types: PDF, DOCX, TXT",
         )
 
-    # Read file content
-    content = await file.read()
-
-    # Validate file size
-    if len(content) > MAX_FILE_SIZE:
+    # Size is enforced while copying; the declared type must match the content
+    upload = await spool_upload(file)
+    if upload.file_type != ALLOWED_FILE_TYPES[file.content_type]:
+        upload.close()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"File size too large. Maximum size: {MAX_FILE_SIZE // 1024 // 1024}MB",
+            detail=f"File content does not match its type {file.content_type}",
         )
+    return upload
+
 
-    # Extract text based on file type
-    file_type = ALLOWED_FILE_TYPES[file.content_type]
+async def read_resume_upload(upload: SpooledUpload) -> Tuple[str, str]:
+    """Extract the text of a spooled resume upload: (file type, text)"""
+    file_type = upload.file_type
     try:
-        if file_type == "pdf":
-            text_content = FileProcessor.extract_text_from_pdf(content)
-        elif file_type == "docx":
-            text_content = FileProcessor.extract_text_from_docx(content)
-        elif file_type == "txt":
-            text_content = FileProcessor.extract_text_from_txt(content)
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported file type"
-            )
+        text_content = await FileProcessor.extract_text(file_type, upload.path)
+    except ExtractionLimitError:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -83,58 +74,244 @@ async def upload_resume(
             detail="File appears to be empty or unreadable",
         )
 
-    # Parse resume content
-    parsed_data = FileProcessor.parse_resume_with_llm(text_content)
+    return file_type, text_content
 
-    # Create resume record
+
+def save_resume(
+    upload: SpooledUpload,
+    file_type: str,
+    text_content: str,
+    parsed_data: Dict[str, Any],
+    db: Session,
+    current_user: User,
+) -> Resume:
+    """Create the resume record for a parsed upload"""
     db_resume = Resume(
         user_id=current_user.id,
-        filename=f"{current_user.id}_{file.filename}",
-        original_filename=file.filename,
+        filename=f"{current_user.id}_{upload.filename}",
+        original_filename=upload.filename,
         content=text_content,
         parsed_data=parsed_data,
+        parse_key=FileProcessor.resume_parse_key(text_content),
         file_type=file_type,
-        file_size=FileProcessor.get_file_size_string(len(content)),
+        file_size=FileProcessor.get_file_size_string(upload.size),
+        file_hash=upload.sha256,
     )
 
     db.add(db_resume)
     db.commit()
     db.refresh(db_resume)
 
-    # return db_resume
+    return db_resume
+
 
-    # ➕ Create mock session automatically
-    questions = await FileProcessor.generate_questions(
-        json.dumps(parsed_data), difficulty=difficulty, practice_mode=practice_mode, num_questions=num_questions, focus_areas=focus_areas
+def find_uploaded_resume(upload: SpooledUpload, db: Session, current_user: User) -> Optional[Resume]:
+    """The user's resume from an earlier upload of the same file, if any"""
+    return (
+        db.query(Resume)
+        .filter(Resume.user_id == current_user.id, Resume.file_hash == upload.sha256)
+        .order_by(Resume.created_at.desc())
+        .first()
+    )
+
+
+def update_resume_parse(
+    resume: Resume, parsed_data: Dict[str, Any], parse_key: str, db: Session
+) -> Resume:
+    """Keep a reused resume's parse current (it is redone after a prompt or model change)"""
+    if resume.parse_key != parse_key or resume.parsed_data is None:
+        resume.parsed_data = parsed_data
+        resume.parse_key = parse_key
+        db.commit()
+        db.refresh(resume)
+    return resume
+
+
+async def store_resume(upload: SpooledUpload, db: Session, current_user: User) -> Resume:
+    """Extract, parse and save an uploaded resume"""
+    # The same file uploaded again reuses its resume: no extraction, and no
+    # LLM call while its parse is current
+    existing = find_uploaded_resume(upload, db, current_user)
+    if existing is not None:
+        parsed_data, parse_key = await FileProcessor.parse_resume_cached(existing.content, db)
+        return update_resume_parse(existing, parsed_data, parse_key, db)
+
+    file_type, text_content = await read_resume_upload(upload)
+
+    # Parse resume content (reused when the same text was parsed before)
+    parsed_data, _ = await FileProcessor.parse_resume_cached(text_content, db)
+
+    return save_resume(upload, file_type, text_content, parsed_data, db, current_user)
+
+
+async def store_resume_with_questions(
+    upload: SpooledUpload, db: Session, current_user: User, **question_args: Any
+) -> Tuple[Resume, List[Dict[str, Any]]]:
+    """`store_resume` plus question generation, as one fused LLM call"""
+    existing = find_uploaded_resume(upload, db, current_user)
+    if existing is not None:
+        parsed_data, questions = await FileProcessor.parse_and_generate(
+            "resume", existing.content, db=db, **question_args
+        )
+        parse_key = FileProcessor.resume_parse_key(existing.content)
+        return update_resume_parse(existing, parsed_data, parse_key, db), questions
+
+    file_type, text_content = await read_resume_upload(upload)
+    parsed_data, questions = await FileProcessor.parse_and_generate(
+        "resume", text_content, db=db, **question_args
     )
+    db_resume = save_resume(upload, file_type, text_content, parsed_data, db, current_user)
+    return db_resume, questions
 
-    if not questions:
+
+@router.post(
+    "/upload", response_model=MockSessionResponse, status_code=status.HTTP_201_CREATED
+)
+async def upload_resume(
+    request: Request,
+    file: UploadFile = File(...),
+    mock_name: str = Form(...),
+    num_questions: str = Form(...),
+    difficulty: str = Form(...),
+    practice_mode: str = Form(...),
+    focus_areas: List[str] = Form(default=[]),
+    grading: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Upload and process resume file"""
+    if grading is not None and grading not in GRADING_MODES:
         raise HTTPException(
-            status_code=500, detail="Failed to generate mock questions."
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid grading mode. Allowed: {', '.join(GRADING_MODES)}",
+        )
+    upload = await spool_resume_upload(file)
+    # Repeats with the same Idempotency-Key replay the first response
+    fingerprint = request_fingerprint(
+        upload.sha256, file.filename, mock_name, num_questions, difficulty, practice_mode, focus_areas, grading
+    )
+
+    async def create_session() -> MockSession:
+        # LLM work is bounded by the request deadline and dropped if the client leaves
+        with llm_deadline(request), track_llm_usage(user_id=current_user.id) as usage:
+            if settings.fused_upload_pipeline:
+                db_resume, questions = await cancel_on_disconnect(request, store_resume_with_questions(
+                    upload, db, current_user, difficulty=difficulty, practice_mode=practice_mode, num_questions=num_questions, focus_areas=focus_areas
+                ))
+            else:
+                db_resume = await cancel_on_disconnect(request, store_resume(upload, db, current_user))
+                parsed_data = db_resume.parsed_data
+
+                # ➕ Create mock session automatically
+                questions = await cancel_on_disconnect(request, FileProcessor.generate_questions(
+                    json.dumps(parsed_data), difficulty=difficulty, practice_mode=practice_mode, num_questions=num_questions, focus_areas=focus_areas
+                ))
+
+        if not questions:
+            raise HTTPException(
+                status_code=500, detail="Failed to generate mock questions."
+            )
+
+        mock_session_id = uuid4()
+        session = MockSession(
+            id=mock_session_id,
+            user_id=current_user.id,
+            source_type="resume",
+            practice_mode=practice_mode,
+            source_id=db_resume.id,
+            session_name=mock_name,
+            questions=LLMGrader.attach_rubrics(questions),
+            total_questions=len(questions),
+            answered_questions=0,
+            status="ongoing",
+            difficulty_level=difficulty,
+            focus_areas=focus_areas,
+            grading_mode=grading,
+            llm_usage=usage.to_dict(),
+            created_at=datetime.now(timezone.utc),
+        )
+
+        db.add(session)
+        db.commit()
+        db.refresh(session)
+
+        return session
+
+    with upload:
+        return await run_idempotent(
+            request, current_user.id, fingerprint, create_session, MockSessionResponse, status.HTTP_201_CREATED
         )
 
-    mock_session_id = uuid4()
-    session = MockSession(
-        id=mock_session_id,
+
+@router.post("/upload/stream")
+async def upload_resume_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    mock_name: str = Form(...),
+    num_questions: str = Form(...),
+    difficulty: str = Form(...),
+    practice_mode: str = Form(...),
+    focus_areas: List[str] = Form(default=[]),
+    grading: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Upload a resume and stream the mock session back as Server-Sent Events.
+    The session is created with the first generated question; the rest follow
+    as `question` events.
+    """
+    if grading is not None and grading not in GRADING_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid grading mode. Allowed: {', '.join(GRADING_MODES)}",
+        )
+    # Only parsing is bounded here; the stream itself ends when the client disconnects
+    upload = await spool_resume_upload(file)
+    if settings.fused_upload_pipeline:
+        with upload:
+            db_resume = find_uploaded_resume(upload, db, current_user)
+            if db_resume is None:
+                file_type, text_content = await read_resume_upload(upload)
+            else:
+                text_content = db_resume.content
+        pipeline = FileProcessor.stream_parse_and_generate(
+            "resume", text_content, difficulty=difficulty, practice_mode=practice_mode, num_questions=num_questions, focus_areas=focus_areas
+        )
+        # The fused call is read up to its parsed_data section here, the questions while streaming
+        with llm_deadline(request), track_llm_usage(user_id=current_user.id) as usage:
+            _, parsed_data = await cancel_on_disconnect(request, anext(pipeline))
+        if db_resume is None:
+            db_resume = save_resume(upload, file_type, text_content, parsed_data, db, current_user)
+        else:
+            parse_key = FileProcessor.resume_parse_key(text_content)
+            db_resume = update_resume_parse(db_resume, parsed_data, parse_key, db)
+        questions = (question async for _, question in pipeline)
+    else:
+        with upload, llm_deadline(request), track_llm_usage(user_id=current_user.id) as usage:
+            db_resume = await cancel_on_disconnect(request, store_resume(upload, db, current_user))
+
+        questions = FileProcessor.stream_questions(
+            json.dumps(db_resume.parsed_data), difficulty=difficulty, practice_mode=practice_mode, num_questions=num_questions, focus_areas=focus_areas
+        )
+    events = stream_mock_session(
+        questions,
+        expected_questions=int(num_questions),
+        usage=usage,
         user_id=current_user.id,
         source_type="resume",
         practice_mode=practice_mode,
         source_id=db_resume.id,
         session_name=mock_name,
-        questions=questions,
-        total_questions=len(questions),
-        answered_questions=0,
-        status="ongoing",
         difficulty_level=difficulty,
         focus_areas=focus_areas,
-        created_at=datetime.now(timezone.utc),
+        grading_mode=grading,
+    )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-
-    db.add(session)
-    db.commit()
-    db.refresh(session)
-
-    return session
 
 
 @router.get("/", response_model=List[ResumeResponse])
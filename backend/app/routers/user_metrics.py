@@ -6,6 +6,7 @@ from app.core.auth import get_current_user
 from app.database import get_db
 from app.models.user import User
 from app.models.mock_session import MockSession, UserResponse
+from app.services.llm_metrics import LLMUsage, llm_metrics
 
 router = APIRouter()
 
@@ -101,3 +102,20 @@ def get_user_metrics(
         "resume_sessions_count": resume_sessions_count or 0,
         "job_description_sessions_count": job_description_sessions_count or 0,
     }
+
+
+@router.get("/llm-usage")
+def get_user_llm_usage(
+    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+):
+    """LLM calls, tokens and cost spent on the user's sessions"""
+    total = LLMUsage()
+    for (usage,) in db.query(MockSession.llm_usage).filter(
+        MockSession.user_id == current_user.id, MockSession.llm_usage.isnot(None)
+    ):
+        total.merge(usage)
+    return {
+        "sessions": total.to_dict(),
+        # Includes calls not tied to a session (e.g. JD updates) since the last restart
+        "recent": llm_metrics.user_stats(current_user.id),
+    }
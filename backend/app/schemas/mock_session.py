@@ -1,9 +1,11 @@
 # app/schemas/mock_session.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator, model_validator
 from typing import List, Dict, Any, Literal, Optional
 from datetime import datetime
 import uuid
 
+GRADING_MODES = ("inline", "background", "batch")
+
 class MockSessionCreate(BaseModel):
     source_type: str  # 'resume' or 'job_description'
     source_id: uuid.UUID
@@ -18,6 +20,59 @@ class Question(BaseModel):
     difficulty: str
     options: Optional[List[str]] = None  # For MCQ
 
+class QuestionRubric(BaseModel):
+    key_points: List[str] = []
+    expected_concepts: List[str] = []
+    scoring_anchors: Dict[str, str] = {}
+
+class GeneratedQAQuestion(BaseModel):
+    """A QA question as produced by the generation prompt"""
+    question: str = Field(min_length=1)
+    answer: str = Field(min_length=1)
+    explanation: str = ""
+    rubric: Optional[QuestionRubric] = None
+
+    class Config:
+        extra = "allow"
+
+class GeneratedMCQQuestion(BaseModel):
+    """An MCQ question as produced by the generation prompt"""
+    question: str = Field(min_length=1)
+    options: List[str] = Field(min_length=2)
+    correct_index: int
+    answer: str = ""
+    explanation: str = ""
+
+    class Config:
+        extra = "allow"
+
+    @model_validator(mode="after")
+    def check_answer(self):
+        # Submissions are compared against the answer text, so it must be one of the options
+        if self.answer in self.options:
+            self.correct_index = self.options.index(self.answer)
+        elif 0 <= self.correct_index < len(self.options):
+            self.answer = self.options[self.correct_index]
+        else:
+            raise ValueError("answer does not match any option")
+        return self
+
+class GradeResult(BaseModel):
+    """A grade as produced by the grading prompts"""
+    score: int = Field(ge=0, le=100)
+    correctness_level: Literal["excellent", "good", "average", "poor"]
+    feedback: str
+    strengths: List[str] = []
+    improvements: List[str] = []
+
+    class Config:
+        extra = "allow"
+
+    @field_validator("correctness_level", mode="before")
+    @classmethod
+    def lower_level(cls, value):
+        return value.strip().lower() if isinstance(value, str) else value
+
 class MockSessionResponse(BaseModel):
     id: uuid.UUID
     user_id: uuid.UUID
@@ -32,6 +87,8 @@ class MockSessionResponse(BaseModel):
     status: str
     difficulty_level: str
     focus_areas: Optional[List[str]] = []
+    grading_mode: Optional[str] = None
+    llm_usage: Optional[Dict[str, Any]] = None
     created_at: datetime
     completed_at: Optional[datetime]
     
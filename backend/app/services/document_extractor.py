@@ -0,0 +1,371 @@
+# app/services/document_extractor.py
+import asyncio
+import codecs
+import logging
+import multiprocessing
+import signal
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Union
+from app.core.config import settings
+
+try:
+    import resource
+except ImportError:  # Windows: no per-process limits, only the timeout
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionLimitError(Exception):
+    """A document took too long or too much memory to extract (mapped to HTTP 422)"""
+
+
+class _Deadline(BaseException):
+    """Raised in a worker by SIGALRM; a BaseException so library code can't swallow it"""
+
+
+# A document's bytes, or the path of a file holding them (read by the worker itself)
+Source = Union[bytes, str]
+
+
+def _open(source: Source) -> Union[BinaryIO, str]:
+    return BytesIO(source) if isinstance(source, bytes) else source
+
+
+def _truncate(parts: List[str], max_chars: Optional[int]) -> str:
+    text = "\n".join(parts).strip()
+    return text[:max_chars] if max_chars else text
+
+
+def extract_pdf_pages(
+    file_content: Source,
+    start: int = 0,
+    stop: Optional[int] = None,
+    max_chars: Optional[int] = None,
+    split_from: int = 0,
+) -> Tuple[str, int]:
+    """
+    Text of pages [start, stop) and the document's page count. Stops after
+    the page that reaches `max_chars`. A document of fewer than `split_from`
+    pages is read to the end whatever `stop` says.
+    """
+    import PyPDF2
+
+    try:
+        pdf_reader = PyPDF2.PdfReader(_open(file_content))
+        pages = pdf_reader.pages
+        if len(pages) < split_from:
+            stop = None
+        parts, size = [], 0
+        for index in range(start, min(stop if stop is not None else len(pages), len(pages))):
+            parts.append(pages[index].extract_text())
+            size += len(parts[-1]) + 1
+            if max_chars and size >= max_chars:
+                break
+        return "\n".join(parts), len(pages)
+    except MemoryError:
+        raise
+    except Exception as e:
+        raise Exception(f"Error reading PDF: {str(e)}")
+
+
+def extract_pdf_text(file_content: Source, max_chars: Optional[int] = None) -> str:
+    text, _ = extract_pdf_pages(file_content, max_chars=max_chars)
+    return _truncate([text], max_chars)
+
+
+def _table_lines(table) -> List[str]:
+    lines = []
+    for row in table.rows:
+        cells, seen = [], set()
+        for cell in row.cells:
+            # A merged cell is repeated for every grid column it spans
+            if cell._tc in seen:
+                continue
+            seen.add(cell._tc)
+            if cell.text.strip():
+                cells.append(cell.text.strip())
+        if cells:
+            lines.append(" | ".join(cells))
+    return lines
+
+
+def _block_lines(container) -> List[str]:
+    """Paragraphs and tables of a document body or header, in order"""
+    from docx.table import Table
+
+    lines = []
+    for block in container.iter_inner_content():
+        if isinstance(block, Table):
+            lines.extend(_table_lines(block))
+        else:
+            lines.append(block.text)
+    return lines
+
+
+def extract_docx_text(file_content: Source, max_chars: Optional[int] = None) -> str:
+    """Header, body paragraphs and tables of a DOCX, up to `max_chars`"""
+    import docx
+
+    try:
+        doc = docx.Document(_open(file_content))
+        parts, size = [], 0
+        for section in doc.sections:
+            for header in (section.first_page_header, section.header):
+                # Contact details often live in the header
+                if header.is_linked_to_previous:
+                    continue
+                for line in _block_lines(header):
+                    if line.strip() and line not in parts:
+                        parts.append(line)
+                        size += len(line) + 1
+        for line in _block_lines(doc):
+            if max_chars and size >= max_chars:
+                break
+            parts.append(line)
+            size += len(line) + 1
+        return _truncate(parts, max_chars)
+    except MemoryError:
+        raise
+    except Exception as e:
+        raise Exception(f"Error reading DOCX: {str(e)}")
+
+
+def extract_txt_text(file_content: bytes) -> str:
+    try:
+        if file_content.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return file_content.decode("utf-16").strip()
+        return file_content.decode("utf-8-sig").strip()
+    except UnicodeDecodeError:
+        try:
+            return file_content.decode("latin-1").strip()
+        except Exception as e:
+            raise Exception(f"Error reading TXT: {str(e)}")
+
+
+EXTRACTORS = {"pdf": extract_pdf_pages, "docx": extract_docx_text}
+
+
+def _init_worker(memory_mb: int) -> None:
+    """Process pool initializer: cap the worker's address space"""
+    if resource is not None and memory_mb > 0:
+        limit = memory_mb * 1024 * 1024
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        soft = limit if hard == resource.RLIM_INFINITY else min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+def _raise_deadline(signum, frame):
+    raise _Deadline()
+
+
+def _extract_in_worker(
+    extractor: Callable[..., Any], timeout: float, cpu_seconds: int, *args: Any
+) -> Any:
+    """
+    Runs `extractor(*args)` in a pool process. A SIGALRM interrupts it after
+    `timeout` seconds; RLIMIT_CPU kills the process if it is stuck in C code
+    instead.
+    """
+    if resource is not None and cpu_seconds > 0:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        used = int(usage.ru_utime + usage.ru_stime)
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        soft = used + cpu_seconds + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (soft if hard == resource.RLIM_INFINITY else min(soft, hard), hard))
+    alarm = hasattr(signal, "SIGALRM") and timeout > 0
+    if alarm:
+        signal.signal(signal.SIGALRM, _raise_deadline)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return extractor(*args)
+    except _Deadline:
+        raise ExtractionLimitError(f"Document took longer than {timeout:g}s to read")
+    except MemoryError:
+        raise ExtractionLimitError("Document needs too much memory to read")
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+class DocumentExtractorPool:
+    """
+    Extracts PDF / DOCX text in a bounded pool of worker processes, so large
+    or hostile documents neither block the event loop nor hang the API
+    worker. Each task gets a wall-clock timeout, a CPU-time limit and an
+    address-space cap; exceeding any raises ExtractionLimitError. A pool
+    whose worker died (killed by a limit) is replaced and the tasks that
+    were running on it are retried once. Tasks that only failed because
+    another document's timeout killed the pool are retried without using
+    up that attempt.
+
+    A PDF of at least `parallel_min_pages` pages is read in chunks of
+    `pages_per_task` pages spread over the workers, a wave at a time,
+    stopping once `max_chars` of text is in. Every chunk parses the whole
+    file again, so smaller PDFs, or all of them with a single worker or
+    `parallel_min_pages` 0, are read in one task.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        timeout: float,
+        cpu_seconds: int,
+        memory_mb: int,
+        pages_per_task: int = 8,
+        max_chars: Optional[int] = None,
+        parallel_min_pages: int = 0,
+    ):
+        self.workers = workers
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.pages_per_task = pages_per_task
+        self.max_chars = max_chars
+        self.parallel_min_pages = parallel_min_pages
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Tasks wait here for a free worker, so the watchdog below times only their run
+        self._slots = asyncio.Semaphore(workers)
+        # Pools killed over a timeout: the other tasks on them were collateral
+        self._killed: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+        self.counts: Dict[str, int] = {"extracted": 0, "failed": 0, "limit_exceeded": 0, "pool_restarts": 0}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # A fresh interpreter: forking the app would inherit its memory use
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.memory_mb,),
+            )
+        return self._pool
+
+    def _discard(self, pool: ProcessPoolExecutor, kill: bool = False) -> None:
+        """
+        Replace `pool`; with `kill`, kill its workers too (one is wedged).
+        A dead worker breaks the whole pool, so they all have to go.
+        """
+        if self._pool is not pool:
+            return
+        self._pool = None
+        self.counts["pool_restarts"] += 1
+        if kill:
+            self._killed.add(pool)
+            # No public API kills running workers before Python 3.14
+            for process in list(getattr(pool, "_processes", {}).values()):
+                process.kill()
+        # Queued tasks then fail with BrokenProcessPool, and are retried, instead of being cancelled
+        pool.shutdown(wait=False)
+
+    async def _run(self, extractor: Callable[..., Any], *args: Any) -> Any:
+        """`extractor(*args)` in a worker, under the limits"""
+        loop = asyncio.get_running_loop()
+        failures = collateral = 0
+        while True:
+            async with self._slots:
+                pool = self._get_pool()
+                future = loop.run_in_executor(
+                    pool, _extract_in_worker, extractor, self.timeout, self.cpu_seconds, *args
+                )
+                try:
+                    # The worker enforces the timeout itself; this only catches a wedged process
+                    return await asyncio.wait_for(future, self.timeout + 5)
+                except asyncio.TimeoutError:
+                    self._discard(pool, kill=True)
+                    raise ExtractionLimitError(f"Document took longer than {self.timeout:g}s to read")
+                except BrokenProcessPool:
+                    pass
+
+            if pool in self._killed and collateral < 2:
+                # Another document's timeout killed the workers, not this one
+                collateral += 1
+                continue
+            self._discard(pool)
+            failures += 1
+            if failures == 2:
+                raise ExtractionLimitError("Document exceeded the CPU or memory limit for reading")
+
+    async def _run_all(self, calls: List[Tuple[Any, ...]]) -> List[Any]:
+        """Run calls concurrently; on the first failure cancel the rest"""
+        tasks = [asyncio.ensure_future(self._run(*call)) for call in calls]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def _extract_pdf(self, file_content: Source) -> str:
+        if self.workers <= 1 or self.parallel_min_pages <= 0:
+            text, _ = await self._run(extract_pdf_pages, file_content, 0, None, self.max_chars)
+            return _truncate([text], self.max_chars)
+
+        # The first chunk also tells how many pages there are; a PDF too short
+        # to split is read whole by it
+        step = self.pages_per_task
+        text, page_count = await self._run(
+            extract_pdf_pages, file_content, 0, step, self.max_chars, self.parallel_min_pages
+        )
+        if page_count < self.parallel_min_pages:
+            return _truncate([text], self.max_chars)
+        parts, size = [text], len(text)
+        start = step
+        while start < page_count and not (self.max_chars and size >= self.max_chars):
+            wave = range(start, min(page_count, start + step * self.workers), step)
+            for chunk, _ in await self._run_all(
+                [(extract_pdf_pages, file_content, first, first + step, self.max_chars) for first in wave]
+            ):
+                parts.append(chunk)
+                size += len(chunk) + 1
+            start = wave[-1] + step
+        return _truncate(parts, self.max_chars)
+
+    async def extract(self, file_type: str, file_content: Source) -> str:
+        """
+        Text of a "pdf", "docx" or "txt" document, given as bytes or as the
+        path of a file (which spares sending the bytes to every worker)
+        """
+        if file_type == "txt":
+            if not isinstance(file_content, bytes):
+                with open(file_content, "rb") as f:
+                    file_content = f.read()
+            return _truncate([extract_txt_text(file_content)], self.max_chars)
+        if file_type not in EXTRACTORS:
+            raise Exception(f"Unsupported file type: {file_type}")
+
+        try:
+            if file_type == "pdf":
+                text = await self._extract_pdf(file_content)
+            else:
+                text = await self._run(extract_docx_text, file_content, self.max_chars)
+        except ExtractionLimitError:
+            self.counts["limit_exceeded"] += 1
+            raise
+        except Exception:
+            self.counts["failed"] += 1
+            raise
+        self.counts["extracted"] += 1
+        return text
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "running": self._pool is not None, **self.counts}
+
+
+document_extractor = DocumentExtractorPool(
+    workers=settings.extraction_workers,
+    timeout=settings.extraction_timeout,
+    cpu_seconds=settings.extraction_cpu_seconds,
+    memory_mb=settings.extraction_memory_mb,
+    pages_per_task=settings.extraction_pdf_pages_per_task,
+    max_chars=settings.extraction_max_chars,
+    parallel_min_pages=settings.extraction_pdf_parallel_min_pages,
+)
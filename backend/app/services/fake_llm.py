@@ -0,0 +1,437 @@
+# app/services/fake_llm.py
+"""
+Local stand-in for the Groq/OpenAI chat completions API, plus request recording.
+
+`create_app()` serves POST /openai/v1/chat/completions (streaming and
+non-streaming) with plausible answers for every prompt the backend sends
+(resume / JD parsing, question generation, single and batch grading), or
+with recorded answers when replaying. Latency follows a configurable
+distribution, and a share of calls can be turned into 429s or malformed
+JSON to exercise the client's failure handling.
+
+Select it with LLM_MODE (see Settings):
+    live    real provider
+    fake    in-process fake (no network)
+    record  real provider, every call appended to LLM_RECORD_PATH
+    replay  in-process fake answering from LLM_RECORD_PATH
+
+For load tests against a deployed backend, run it as a server and point
+LLM_BASE_URL at it:
+    python -m app.services.fake_llm --port 8765 --latency lognormal:0.8,0.4
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import random
+import re
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+import httpx
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Build a latency sampler from a spec such as "fixed:0.2", "uniform:0.1,0.5",
+    "normal:0.8,0.2" or "lognormal:0.8,0.4" (median seconds, sigma).
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+    if kind == "fixed":
+        return lambda rng: values[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def request_key(body: Dict[str, Any]) -> str:
+    """Match key for recordings: model and messages, ignoring sampling parameters"""
+    payload = json.dumps(
+        {"model": body.get("model"), "messages": body.get("messages")}, sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_recordings(path: str) -> Dict[str, Dict[str, Any]]:
+    recordings: Dict[str, Dict[str, Any]] = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    recordings[record["key"]] = record
+    except FileNotFoundError:
+        logger.warning("No LLM recordings at %s; replay falls back to synthetic answers", path)
+    return recordings
+
+
+# Synthetic answers, chosen by what the prompt asks for
+
+FAKE_TOPICS = [
+    "PostgreSQL connection pooling", "Redis cache invalidation", "JWT token refresh",
+    "background job retries", "REST pagination cursors", "Docker image layering",
+    "async request handlers", "database index design", "rate limiter buckets",
+    "message queue ordering", "schema migration rollouts", "file upload streaming",
+    "search relevance ranking", "websocket fan-out", "feature flag rollout",
+    "CI pipeline caching", "log aggregation pipeline", "read replica lag",
+    "payment webhook idempotency", "CDN edge caching", "GraphQL resolver batching",
+    "Kubernetes pod autoscaling", "S3 lifecycle policies", "OAuth scope design",
+    "React state management", "N+1 query detection", "blue-green deployments",
+    "circuit breaker tuning", "memory leak hunting", "time zone handling",
+]
+
+
+def _fake_questions(prompt: str) -> List[Dict[str, Any]]:
+    count = re.search(r"\*\*Number of Questions\*\*:\s*(\d+)", prompt)
+    mode = re.search(r"\*\*Practice Mode\*\*:\s*(\w+)", prompt)
+    # The fused parse-and-generate prompt asks to "write N <mode> questions" instead
+    fused = re.search(r"write (\d+) (\w+) questions", prompt)
+    count = int(count.group(1)) if count else int(fused.group(1)) if fused else 5
+    mode = mode.group(1) if mode else fused.group(2) if fused else None
+    # Different prompts (e.g. fan-out chunks) get different topics
+    topics = random.Random(prompt).sample(FAKE_TOPICS, k=min(count, len(FAKE_TOPICS)))
+    questions = []
+    for i in range(count):
+        topic = topics[i % len(topics)]
+        if mode == "mcq":
+            options = [f"Shard {topic} by key", f"Cache {topic}", f"Rewrite {topic}", f"Ignore {topic}"]
+            questions.append({
+                "question": f"Your service's {topic} is the bottleneck at 100x load. What do you change first?",
+                "options": options,
+                "correct_index": i % 4,
+                "answer": options[i % 4],
+                "explanation": f"Targeting {topic} directly removes the bottleneck; the other options do not.",
+            })
+        else:
+            questions.append({
+                "question": f"How would you scale {topic} of your project to 100x the traffic, and what breaks first?",
+                "answer": f"Profile {topic}, add caching and horizontal scaling, and watch database connections and queues.",
+                "explanation": "Strong answers name the bottleneck and the trade-offs of each fix.",
+                "rubric": {
+                    "key_points": [f"Identifies the bottleneck in {topic}", "Proposes caching or scaling"],
+                    "expected_concepts": ["caching", "horizontal scaling", "connection pool"],
+                    "scoring_anchors": {
+                        "excellent": "Bottleneck, fixes and trade-offs",
+                        "average": "Some fixes without trade-offs",
+                        "poor": "Vague or off-topic",
+                    },
+                },
+            })
+    return questions
+
+
+def _fake_grade(index: Optional[int] = None) -> Dict[str, Any]:
+    grade = {
+        "score": 80,
+        "correctness_level": "good",
+        "feedback": "Your answer covers the main trade-offs.",
+        "strengths": ["Clear structure"],
+        "improvements": ["Add a concrete example"],
+    }
+    return grade if index is None else {"index": index, **grade}
+
+
+def synthetic_content(prompt: str) -> str:
+    if '"grades": [' in prompt:
+        answers = len(re.findall(r"### Answer \d+", prompt)) or 1
+        return json.dumps({"grades": [_fake_grade(i) for i in range(answers)]})
+    if "correctness_level" in prompt:
+        return json.dumps(_fake_grade())
+    if '"parsed_data"' in prompt:
+        parsed = json.loads(synthetic_content(
+            "information from resumes" if "Resume:" in prompt else "information from job descriptions"
+        ))
+        return json.dumps({"parsed_data": parsed, "questions": _fake_questions(prompt)}, indent=2)
+    if "- raw_text: (include original text)" in prompt:
+        # Older parse prompts had the model echo the whole document back
+        parsed = json.loads(synthetic_content(prompt.replace("- raw_text: (include original text)", "")))
+        document = re.search(r"(?:Resume|Job Description):\n(.*)\n\nExtracted JSON:", prompt, re.S)
+        parsed["raw_text"] = document.group(1) if document else ""
+        return json.dumps(parsed)
+    if "information from resumes" in prompt:
+        return json.dumps({
+            "contact_info": {"name": "Sample Candidate", "email": "candidate@example.com", "phone": None},
+            "summary": "Backend engineer focused on Python services.",
+            "education": [{"degree": "B.Tech Computer Science"}],
+            "projects": [{"name": "Mock interview platform", "tech": ["FastAPI", "PostgreSQL"]}],
+            "experience": [{"role": "Software Engineer", "company": "Example Corp"}],
+            "skills": ["Python", "FastAPI", "PostgreSQL", "Redis", "Docker"],
+            "certifications": [],
+        })
+    if "information from job descriptions" in prompt:
+        return json.dumps({
+            "title": "Backend Engineer",
+            "company_info": "Example Corp",
+            "responsibilities": ["Build APIs", "Own services in production"],
+            "requirements": ["3+ years of Python"],
+            "qualifications": ["B.S. in Computer Science or equivalent"],
+            "skills": ["Python", "SQL", "AWS"],
+        })
+    if "**Number of Questions**" in prompt:
+        return json.dumps(_fake_questions(prompt), indent=2)
+    return json.dumps({"result": "ok"})
+
+
+def malform(content: str, rng: random.Random) -> str:
+    """Damage JSON the way models do: prose around it, code fences, truncation"""
+    choice = rng.randrange(3)
+    if choice == 0:
+        return f"Sure! Here is the JSON you asked for:\n{content}\nLet me know if you need anything else."
+    if choice == 1:
+        return f"```json\n{content}\n```"
+    return content[: max(1, int(len(content) * rng.uniform(0.5, 0.95)))]
+
+
+def create_app(
+    latency: Optional[str] = None,
+    seconds_per_kchar: Optional[float] = None,
+    tokens_per_second: Optional[float] = None,
+    rate_limit_rate: Optional[float] = None,
+    malformed_rate: Optional[float] = None,
+    recordings: Optional[Dict[str, Dict[str, Any]]] = None,
+    seed: Optional[int] = None,
+) -> Starlette:
+    """
+    Build the fake API. Arguments default to the FAKE_LLM_* Settings.
+
+    Args:
+        latency: Latency distribution spec (see `parse_latency`), or "recorded"
+            to reuse the latency captured with each recording
+        seconds_per_kchar: Extra latency per 1000 prompt characters
+        tokens_per_second: Generation speed (~4 characters per token); 0 means instant
+        rate_limit_rate: Share of calls answered with a 429
+        malformed_rate: Share of answers whose JSON is damaged
+        recordings: Recorded answers keyed by `request_key`; misses get synthetic answers
+    """
+    latency = latency or settings.fake_llm_latency
+    seconds_per_kchar = settings.fake_llm_seconds_per_kchar if seconds_per_kchar is None else seconds_per_kchar
+    tokens_per_second = settings.fake_llm_tokens_per_second if tokens_per_second is None else tokens_per_second
+    rate_limit_rate = settings.fake_llm_rate_limit_rate if rate_limit_rate is None else rate_limit_rate
+    malformed_rate = settings.fake_llm_malformed_rate if malformed_rate is None else malformed_rate
+    rng = random.Random(settings.fake_llm_seed if seed is None else seed)
+    sample_latency = None if latency == "recorded" else parse_latency(latency)
+    recordings = recordings or {}
+    stats = {"requests": 0, "rate_limited": 0, "malformed": 0, "replayed": 0, "synthetic": 0}
+
+    def rate_limit_headers(remaining: int) -> Dict[str, str]:
+        return {
+            "x-ratelimit-limit-requests": "1000",
+            "x-ratelimit-remaining-requests": str(remaining),
+            "x-ratelimit-reset-requests": "60ms",
+            "x-ratelimit-limit-tokens": "300000",
+            "x-ratelimit-remaining-tokens": "299000",
+            "x-ratelimit-reset-tokens": "200ms",
+        }
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        model = body.get("model", "fake")
+        prompt = "\n".join(str(m.get("content") or "") for m in body.get("messages", []))
+
+        if rng.random() < rate_limit_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after": "1", **rate_limit_headers(0)},
+            )
+
+        recorded = recordings.get(request_key(body))
+        if recorded is not None:
+            stats["replayed"] += 1
+            content = recorded["content"]
+        else:
+            stats["synthetic"] += 1
+            content = synthetic_content(prompt)
+        if rng.random() < malformed_rate:
+            stats["malformed"] += 1
+            content = malform(content, rng)
+
+        if sample_latency is not None:
+            delay = sample_latency(rng)
+        else:
+            delay = (recorded or {}).get("latency", 0.0)
+        delay += seconds_per_kchar * len(prompt) / 1000
+        generation = len(content) / 4 / tokens_per_second if tokens_per_second else 0.0
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        usage = {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        }
+        headers = rate_limit_headers(999)
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay + generation)
+            return JSONResponse(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": usage,
+                },
+                headers=headers,
+            )
+
+        async def events():
+            await asyncio.sleep(delay)
+            step = 64
+            for start in range(0, len(content), step):
+                piece = content[start:start + step]
+                if tokens_per_second:
+                    await asyncio.sleep(len(piece) / 4 / tokens_per_second)
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "x_groq": {"usage": usage},
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+    async def get_stats(request: Request):
+        return JSONResponse(stats)
+
+    return Starlette(routes=[
+        Route(COMPLETIONS_PATH, chat_completions, methods=["POST"]),
+        Route("/stats", get_stats, methods=["GET"]),
+    ])
+
+
+def _completion_content(body: bytes, stream: bool) -> str:
+    """Assistant text of a recorded response (a JSON body or an SSE stream)"""
+    text = body.decode("utf-8", errors="replace")
+    if not stream:
+        return json.loads(text)["choices"][0]["message"]["content"]
+    content = []
+    for line in text.splitlines():
+        if line.startswith("data: ") and line != "data: [DONE]":
+            for choice in json.loads(line[6:]).get("choices", []):
+                content.append(choice.get("delta", {}).get("content") or "")
+    return "".join(content)
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """
+    Forwards requests to the real provider and appends every successful chat
+    completion (request key, answer text, latency) to a JSON lines file that
+    `replay` mode can serve. Responses are buffered, so streams arrive at once.
+    """
+
+    def __init__(self, path: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.path = path
+        self.transport = transport or httpx.AsyncHTTPTransport(http2=settings.llm_http2)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.transport.handle_async_request(request)
+        body = await response.aread()
+        latency = time.perf_counter() - start
+        if request.url.path.endswith("/chat/completions") and response.status_code == 200:
+            try:
+                payload = json.loads(request.content)
+                record = {
+                    "key": request_key(payload),
+                    "model": payload.get("model"),
+                    "messages": payload.get("messages"),
+                    "content": _completion_content(body, bool(payload.get("stream"))),
+                    "latency": round(latency, 3),
+                }
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+            except (ValueError, KeyError, IndexError):
+                logger.warning("Could not record LLM response for %s", request.url)
+        # The body is already decoded, so drop the headers describing the wire format
+        headers = [
+            (name, value)
+            for name, value in response.headers.raw
+            if name.lower() not in (b"content-encoding", b"content-length", b"transfer-encoding")
+        ]
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=headers,
+            content=body,
+            request=request,
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def build_transport() -> Optional[httpx.AsyncBaseTransport]:
+    """Transport for the shared LLM HTTP client according to LLM_MODE (None means live)"""
+    mode = settings.llm_mode
+    if mode == "live":
+        return None
+    if mode == "fake":
+        return httpx.ASGITransport(app=create_app())
+    if mode == "replay":
+        return httpx.ASGITransport(app=create_app(recordings=load_recordings(settings.llm_record_path)))
+    if mode == "record":
+        return RecordingTransport(settings.llm_record_path)
+    raise ValueError(f"Unknown LLM_MODE: {mode}")
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake Groq/OpenAI chat completions server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default=None, help='e.g. "lognormal:0.8,0.4" or "recorded"')
+    parser.add_argument("--seconds-per-kchar", type=float, default=None)
+    parser.add_argument("--tokens-per-second", type=float, default=None)
+    parser.add_argument("--rate-limit-rate", type=float, default=None)
+    parser.add_argument("--malformed-rate", type=float, default=None)
+    parser.add_argument("--replay", metavar="PATH", help="answer from a recording file")
+    args = parser.parse_args()
+
+    app = create_app(
+        latency=args.latency,
+        seconds_per_kchar=args.seconds_per_kchar,
+        tokens_per_second=args.tokens_per_second,
+        rate_limit_rate=args.rate_limit_rate,
+        malformed_rate=args.malformed_rate,
+        recordings=load_recordings(args.replay) if args.replay else None,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
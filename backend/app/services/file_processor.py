@@ -1,13 +1,144 @@
 # app/services/file_processor.py
-import docx
-import PyPDF2
-from io import BytesIO
-from typing import Dict, Any, List, Optional
-from groq import Groq
+from typing import AsyncIterator, Dict, Any, List, Optional, Tuple, Union
+from sqlalchemy.orm import Session
+import asyncio
+import copy
+import hashlib
 import json
+import math
+import random
 import re
 import unicodedata
 from app.core.config import settings
+from app.database import SessionLocal
+from app.models.resume import Resume
+from app.services.cache import LRUCache, TTLCache
+from app.services.document_extractor import (
+    document_extractor,
+    extract_docx_text,
+    extract_pdf_text,
+    extract_txt_text,
+)
+from app.services.llm_router import GENERATION, llm_router
+from app.services.llm_scheduler import LLMPriority
+from app.services.llm_json import JSONArrayItemStream, JSONFieldStream, LLMJSONError, extract_json
+from app.services.llm_metrics import llm_operation
+from app.services.prompt_budget import compact_parsed_content, count_tokens, minify_instructions
+from app.schemas.mock_session import GeneratedMCQQuestion, GeneratedQAQuestion
+from pydantic import ValidationError
+
+# Bump whenever the resume parse prompt changes so cached results are not reused
+RESUME_PARSE_PROMPT_VERSION = "2"
+QUESTION_PROMPT_VERSION = "3"
+
+RESUME_FIELDS = (
+    "- contact_info: { email, phone, name (if available) }\n"
+    "- summary: (brief summary or objective if available)\n"
+    "- education: (list of education entries if available)\n"
+    "- projects: (list of projects entries if available)\n"
+    "- experience: (list of job experiences if available)\n"
+    "- skills: (list of technical and soft skills)\n"
+    "- certifications: (list if available)\n"
+)
+JOB_DESCRIPTION_FIELDS = (
+    "- title: position/role of the job\n"
+    "- company_info\n"
+    "- responsibilities (list)\n"
+    "- requirements (list)\n"
+    "- qualifications (list)\n"
+    "- skills: (list of technical and soft skills)\n"
+    "languages: [...], \n"
+    "data_science: [...]\n"
+    "full_stack: [...]\n"
+    "databases: [...]\n"
+    "technologies: [...]\n"
+)
+SOURCE_LABELS = {
+    "resume": ("resumes", "Resume", RESUME_FIELDS),
+    "job_description": ("job descriptions", "Job Description", JOB_DESCRIPTION_FIELDS),
+}
+# One generated question of each practice mode, as the prompts describe it
+MCQ_QUESTION_FORMAT = """{
+    "question": "[Detailed scenario-based question referencing specific skills/projects]",
+    "options": ["Option A", "Option B", "Option C", "Option D"],
+    "correct_index": [0-3, randomly distributed],
+    "answer": "[The correct option text]",
+    "explanation": "[Why this answer is correct AND why other options are wrong]"
+}"""
+QA_QUESTION_FORMAT = """{
+    "question": "[Complex, multi-part question requiring detailed explanation]",
+    "answer": "[Comprehensive answer covering multiple aspects]",
+    "explanation": "[Additional context, alternative approaches, or edge cases to consider]",
+    "rubric": {
+        "key_points": ["[Point a strong answer must make]", "..."],
+        "expected_concepts": ["[Term or concept]", "..."],
+        "scoring_anchors": {
+            "excellent": "[What a 90-100 answer contains]",
+            "average": "[What a 50-70 answer contains]",
+            "poor": "[What a 0-40 answer looks like]"
+        }
+    }
+}"""
+
+_resume_parse_cache = LRUCache(maxsize=settings.resume_parse_cache_size)
+_question_set_cache = TTLCache(
+    maxsize=settings.question_cache_size, ttl=settings.question_cache_ttl_seconds
+)
+
+
+# Job description normalization, compiled once. The steps are applied in
+# the order of the original step-by-step version, so the output is the same.
+_JD_SYMBOLS = {
+    # Dashes
+    "\u2013": "-",
+    "\u2014": "-",
+    # Bullet points
+    **dict.fromkeys("•◆■●►▪➤✔★▶→◦‣⁃", "* "),
+}
+# Control characters (newlines are handled separately)
+_JD_CONTROL = (
+    [chr(c) for c in range(0x00, 0x09)]
+    + ["\x0b", "\x0c"]
+    + [chr(c) for c in range(0x0E, 0x20)]
+    + [chr(c) for c in range(0x7F, 0xA0)]
+)
+# Zero-width and other invisible Unicode
+_JD_INVISIBLE = (
+    [chr(c) for c in range(0x200B, 0x2010)]
+    + [chr(c) for c in range(0x2028, 0x2030)]
+    + ["\u205f", "\u3000", "\ufeff"]
+)
+# ASCII text only needs its control characters, tabs and carriage returns
+# mapped: one str.translate pass. On other text str.translate is slower than
+# a regex, so deletions and symbols are regex substitutions there.
+_JD_ASCII_TRANSLATION = str.maketrans(
+    {**dict.fromkeys(c for c in _JD_CONTROL if c.isascii()), "\t": " ", "\r": " "}
+)
+_JD_DELETED = re.compile(f"[{re.escape(''.join(_JD_CONTROL + _JD_INVISIBLE))}]")
+_JD_SYMBOL = re.compile(f"[{''.join(_JD_SYMBOLS)}]")
+# The original quote "replacement" was a triple-quoted string literal, which
+# actually replaces this text with an apostrophe; kept for identical output
+_JD_QUOTE_ARTIFACT = ', "\'").replace('
+_JD_PARAGRAPH_BREAK = re.compile(r"\n\s*\n+")
+_JD_REPEATED_PUNCTUATION = re.compile(r"(?<=([!?;:,]))\1+")
+_JD_STRAY_SYMBOLS = re.compile(r"\s+[^\w\s.,!?;:()\-\'\"\/]+\s+")
+_JD_RULES = re.compile(r"[-_]{3,}")
+_JD_SPACE_BEFORE_PUNCTUATION = re.compile(r"\s+(?=[.,:;!?])")
+# Whitespace after punctuation or runs of it (two steps originally)
+_JD_SPACE_AFTER_PUNCTUATION_OR_RUNS = re.compile(r"(?<=[.,:;!?])\s+|\s{2,}")
+_JD_PIPE = re.compile(r"\s*\|\s*")
+_JD_PIPE_RUNS = re.compile(r"\|{2,}")
+# Whitespace other than a single plain space
+_JD_IRREGULAR_WHITESPACE = re.compile(r"\s{2,}|[^\S ]")
+
+
+def _strip_spaces_and_pipes(text: str) -> str:
+    start, end = 0, len(text)
+    while start < end and (text[start] == "|" or text[start].isspace()):
+        start += 1
+    while end > start and (text[end - 1] == "|" or text[end - 1].isspace()):
+        end -= 1
+    return text[start:end]
 
 
 class JobDescriptionNormalizer:
@@ -25,88 +156,42 @@ class JobDescriptionNormalizer:
         if not text or not isinstance(text, str):
             return ""
 
-        # Step 1: Replace smart quotes and curly apostrophes with standard ones
-        text = text.replace('"', '"').replace('"', '"')
-        text = text.replace(""", "'").replace(""", "'")
-        text = text.replace("–", "-").replace("—", "-")
-
-        # Step 2: Remove zero-width characters and other invisible Unicode
-        text = re.sub(r"[\u200b-\u200f\u2028-\u202f\u205f\u3000\ufeff]", "", text)
-
-        # Step 3: Remove control characters (except basic ones we'll handle)
-        text = re.sub(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f-\x9f]", "", text)
-
-        # Step 4: Replace common bullet points and special characters with standard equivalents
-        bullet_replacements = {
-            "•": "* ",
-            "◆": "* ",
-            "■": "* ",
-            "●": "* ",
-            "►": "* ",
-            "▪": "* ",
-            "➤": "* ",
-            "✔": "* ",
-            "★": "* ",
-            "▶": "* ",
-            "→": "* ",
-            "◦": "* ",
-            "‣": "* ",
-            "⁃": "* ",
-        }
-
-        for bullet, replacement in bullet_replacements.items():
-            text = text.replace(bullet, replacement)
-
-        # Step 5: Normalize Unicode characters (convert accented chars to ASCII equivalents)
-        text = unicodedata.normalize("NFKD", text)
-        text = "".join(c for c in text if not unicodedata.combining(c))
-
-        # Step 6: Remove or replace problematic characters that can break JSON
-        # Replace tabs with spaces
-        text = text.replace("\t", " ")
+        if _JD_QUOTE_ARTIFACT in text:
+            text = text.replace(_JD_QUOTE_ARTIFACT, "'")
 
-        # Replace carriage returns with spaces
-        text = text.replace("\r", " ")
+        if text.isascii():
+            text = text.translate(_JD_ASCII_TRANSLATION)
+        else:
+            # Dashes, bullets, invisible and control characters
+            text = _JD_DELETED.sub("", text)
+            text = _JD_SYMBOL.sub(lambda match: _JD_SYMBOLS[match.group()], text)
+            text = text.replace("\t", " ").replace("\r", " ")
 
-        # Step 7: Handle line breaks strategically
-        # First, identify section breaks (multiple newlines) and mark them
-        text = re.sub(r"\n\s*\n+", " | ", text)  # Replace paragraph breaks with |
+            # Convert accented characters to ASCII equivalents
+            text = unicodedata.normalize("NFKD", text)
+            marks = [c for c in set(text) if unicodedata.combining(c)]
+            if marks:
+                text = re.sub(f"[{''.join(marks)}]", "", text)
 
-        # Then convert remaining single newlines to spaces
+        # Paragraph breaks become " | ", remaining newlines spaces
+        text = _JD_PARAGRAPH_BREAK.sub(" | ", text)
         text = text.replace("\n", " ")
 
-        # Step 8: Clean up excessive punctuation and special characters
-        # Remove multiple consecutive punctuation marks (except periods for ellipsis)
-        text = re.sub(r"([!?;:,])\1+", r"\1", text)
-
-        # Remove standalone special characters that don't add meaning
-        text = re.sub(r"\s+[^\w\s.,!?;:()\-\'\"\/]+\s+", " ", text)
-
-        # Step 9: Handle common formatting issues
-        # Remove excessive dashes and underscores
-        text = re.sub(r"[-_]{3,}", " ", text)
-
-        # Clean up spacing around punctuation
-        text = re.sub(r"\s+([.,:;!?])", r"\1", text)
-        text = re.sub(r"([.,:;!?])\s+", r"\1 ", text)
-
-        # Step 10: Collapse multiple spaces and clean up
-        text = re.sub(r"\s{2,}", " ", text)
+        # Repeated punctuation, standalone symbols and ----- / _____ rules
+        text = _JD_REPEATED_PUNCTUATION.sub("", text)
+        text = _JD_STRAY_SYMBOLS.sub(" ", text)
+        text = _JD_RULES.sub(" ", text)
 
-        # Step 11: Clean up pipe separators (our paragraph markers)
-        text = re.sub(r"\s*\|\s*", " | ", text)
-        text = re.sub(r"\|{2,}", "|", text)
+        # Spacing around punctuation and pipes
+        text = _JD_SPACE_BEFORE_PUNCTUATION.sub("", text)
+        text = _JD_SPACE_AFTER_PUNCTUATION_OR_RUNS.sub(" ", text)
+        text = _JD_PIPE.sub(" | ", text)
+        if "||" in text:
+            text = _JD_PIPE_RUNS.sub("|", text)
 
-        # Step 12: Final cleanup
-        text = text.strip()
-
-        # Remove leading/trailing pipes
-        text = re.sub(r"^[\s|]+|[\s|]+$", "", text)
-
-        # Ensure no double spaces remain
-        text = re.sub(r"\s+", " ", text)
-
-        return text.strip()
+        # Trim surrounding whitespace and pipes, single spaces only
+        text = _strip_spaces_and_pipes(text)
+        return _JD_IRREGULAR_WHITESPACE.sub(" ", text)
 
     @staticmethod
     def validate_normalized_text(text: str) -> bool:
@@ -142,84 +227,123 @@ class JobDescriptionNormalizer:
 
 
 class FileProcessor:
+    @staticmethod
+    async def extract_text(file_type: str, file_content: Union[bytes, str]) -> str:
+        """
+        Extract text from a "pdf", "docx" or "txt" upload, given as bytes or
+        as the path of a spooled upload. PDF and DOCX are
+        read in the document extractor's process pool, under its time and
+        memory limits (ExtractionLimitError when exceeded).
+        """
+        return await document_extractor.extract(file_type, file_content)
+
     @staticmethod
     def extract_text_from_pdf(file_content: bytes) -> str:
-        """Extract text from PDF file"""
-        try:
-            pdf_reader = PyPDF2.PdfReader(BytesIO(file_content))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text.strip()
-        except Exception as e:
-            raise Exception(f"Error reading PDF: {str(e)}")
+        """Extract text from PDF file (in this process, without limits)"""
+        return extract_pdf_text(file_content)
 
     @staticmethod
     def extract_text_from_docx(file_content: bytes) -> str:
-        """Extract text from DOCX file"""
-        try:
-            doc = docx.Document(BytesIO(file_content))
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text.strip()
-        except Exception as e:
-            raise Exception(f"Error reading DOCX: {str(e)}")
+        """Extract text from DOCX file (in this process, without limits)"""
+        return extract_docx_text(file_content)
 
     @staticmethod
     def extract_text_from_txt(file_content: bytes) -> str:
         """Extract text from TXT file"""
-        try:
-            return file_content.decode("utf-8").strip()
-        except UnicodeDecodeError:
-            try:
-                return file_content.decode("latin-1").strip()
-            except Exception as e:
-                raise Exception(f"Error reading TXT: {str(e)}")
+        return extract_txt_text(file_content)
 
     @staticmethod
-    def _llm_extract(prompt: str) -> Dict[str, Any]:
-        client = Groq(api_key=settings.chatgroq_api_key)
-
-        response = client.chat.completions.create(
-            model="openai/gpt-oss-120b",
+    async def _llm_extract(prompt: str) -> Any:
+        content = await llm_router.complete(
+            GENERATION,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.3,
             max_tokens=8000,
+            priority=LLMPriority.BACKGROUND,
         )
 
         try:
-            return json.loads(response.choices[0].message.content)
-        except json.JSONDecodeError:
-            # Fallback: Extract JSON substring using regex
-            match = re.search(r"\{.*\}", response.choices[0].message.content, re.DOTALL)
-            if match:
-                try:
-                    return json.loads(match.group(0))
-                except json.JSONDecodeError:
-                    pass
+            return extract_json(content)
+        except LLMJSONError:
             raise Exception(
-                f"Failed to parse JSON from LLM output:\nPrompt:\n{prompt}\n\nLLM Output:\n{response.choices[0].message.content}"
+                f"Failed to parse JSON from LLM output:\nPrompt:\n{prompt}\n\nLLM Output:\n{content}"
             )
 
     @staticmethod
-    def parse_resume_with_llm(content: str) -> Dict[str, Any]:
+    def _parsed_fields(result: Any) -> Dict[str, Any]:
+        """
+        The extracted fields of a parse response. The original text is never
+        asked of the model (it is stored in `content`); a `raw_text` the model
+        adds anyway is dropped.
+        """
+        if not isinstance(result, dict):
+            raise Exception(f"Expected a JSON object from the parse prompt, got {type(result).__name__}")
+        result.pop("raw_text", None)
+        return result
+
+    @staticmethod
+    async def parse_resume_with_llm(content: str) -> Dict[str, Any]:
         prompt = (
             "You are a helpful assistant that extracts structured information from resumes.\n"
             "Given the following resume text, return a JSON object with these fields:\n"
-            "- contact_info: { email, phone, name (if available) }\n"
-            "- summary: (brief summary or objective if available)\n"
-            "- education: (list of education entries if available)\n"
-            "- projects: (list of projects entries if available)\n"
-            "- experience: (list of job experiences if available)\n"
-            "- skills: (list of technical and soft skills)\n"
-            "- certifications: (list if available)\n"
-            "- raw_text: (include original text)\n\n"
+            f"{RESUME_FIELDS}\n"
             "Respond ONLY with valid JSON and no extra text."
             f"Resume:\n{content}\n\n"
             "Extracted JSON:"
         )
-        return FileProcessor._llm_extract(prompt)
+        with llm_operation("parse_resume"):
+            return FileProcessor._parsed_fields(await FileProcessor._llm_extract(prompt))
+
+    @staticmethod
+    def resume_parse_key(content: str) -> str:
+        """Content-addressed cache key for a resume's extracted text"""
+        digest = hashlib.sha256()
+        digest.update(
+            f"{RESUME_PARSE_PROMPT_VERSION}:{llm_router.models(GENERATION)}:".encode("utf-8")
+        )
+        digest.update(content.encode("utf-8"))
+        return digest.hexdigest()
+
+    @staticmethod
+    async def parse_resume_cached(
+        content: str, db: Optional[Session] = None
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Parse a resume, reusing a previous result for identical text.
+
+        Looks in the in-process LRU first, then in the `resumes` table by
+        `parse_key`, and only calls the LLM on a miss in both.
+        Returns the parsed data together with its cache key.
+        """
+        key = FileProcessor.resume_parse_key(content)
+
+        cached = FileProcessor.cached_resume_parse(key, db)
+        if cached is not None:
+            return cached, key
+
+        parsed_data = await FileProcessor.parse_resume_with_llm(content)
+        _resume_parse_cache.set(key, parsed_data)
+        return copy.deepcopy(parsed_data), key
+
+    @staticmethod
+    def cached_resume_parse(
+        key: str, db: Optional[Session] = None
+    ) -> Optional[Dict[str, Any]]:
+        """A previous parse result for `key` from the LRU or the `resumes` table"""
+        cached = _resume_parse_cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        if db is not None:
+            existing = (
+                db.query(Resume.parsed_data)
+                .filter(Resume.parse_key == key, Resume.parsed_data.isnot(None))
+                .first()
+            )
+            if existing:
+                _resume_parse_cache.set(key, existing.parsed_data)
+                return copy.deepcopy(existing.parsed_data)
+        return None
 
     @staticmethod
     def normalize_job_description(text: str) -> str:
@@ -229,30 +353,24 @@ class FileProcessor:
         return JobDescriptionNormalizer.normalize_with_validation(text)
 
     @staticmethod
-    def parse_job_description_with_llm(content: str) -> Dict[str, Any]:
-
-        normalized_content = JobDescriptionNormalizer.normalize_job_description(content)
+    async def parse_job_description_with_llm(
+        content: str, normalized: bool = False
+    ) -> Dict[str, Any]:
+        """Parse a job description; pass `normalized=True` if it already is"""
+        normalized_content = (
+            content if normalized else JobDescriptionNormalizer.normalize_job_description(content)
+        )
 
         prompt = (
             "You are a helpful assistant that extracts structured information from job descriptions.\n"
             "Given the following job description text, return a JSON object with these fields:\n"
-            "- title: position/role of the job\n"
-            "- company_info\n"
-            "- responsibilities (list)\n"
-            "- requirements (list)\n"
-            "- qualifications (list)\n"
-            "- skills: (list of technical and soft skills)\n"
-            "languages: [...], \n"
-            "data_science: [...]\n"
-            "full_stack: [...]\n"
-            "databases: [...]\n"
-            "technologies: [...]\n"
-            "- raw_text: (include original text)\n\n"
+            f"{JOB_DESCRIPTION_FIELDS}\n"
             "Respond ONLY with valid JSON and no extra text."
             f"Job Description:\n{normalized_content}\n\n"
             "Extracted JSON:"
         )
-        return FileProcessor._llm_extract(prompt)
+        with llm_operation("parse_job_description"):
+            return FileProcessor._parsed_fields(await FileProcessor._llm_extract(prompt))
 
     @staticmethod
     async def generate_questions(
@@ -261,7 +379,7 @@ class FileProcessor:
         practice_mode: str,
         num_questions: str,
         focus_areas: Optional[List[str]] = None,
-    ) -> Dict[str, Any]:
+    ) -> List[Dict[str, Any]]:
         """
         Generate a refined prompt to instruct the LLM to create interview-style questions
         based on the provided resume or job description content.
@@ -274,16 +392,551 @@ class FileProcessor:
         """
         num_questions = int(num_questions)
 
-        focus_instruction = ""
+        cache_key = FileProcessor.question_set_key(
+            content, difficulty, practice_mode, num_questions, focus_areas
+        )
+        cached = _question_set_cache.get(cache_key)
+        if cached is not None:
+            return FileProcessor.reshuffle_questions(cached, num_questions)
+
+        with llm_operation("generate_questions"):
+            if num_questions > settings.question_chunk_size:
+                questions = await FileProcessor._generate_questions_fanout(
+                    content, difficulty, practice_mode, num_questions, focus_areas
+                )
+            else:
+                questions = await FileProcessor._generate_validated(
+                    content, difficulty, practice_mode, num_questions, focus_areas
+                )
+        if questions:
+            _question_set_cache.set(cache_key, copy.deepcopy(questions))
+        return questions
+
+    @staticmethod
+    async def _generate_questions_fanout(
+        content: str,
+        difficulty: str,
+        practice_mode: str,
+        num_questions: int,
+        focus_areas: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate a large question set as several smaller concurrent calls, each
+        covering a different slice of the focus areas / skill groups, then merge
+        and drop near-duplicate questions.
+        """
+        chunks = FileProcessor._plan_question_chunks(content, num_questions, focus_areas)
+        semaphore = asyncio.Semaphore(settings.question_fanout_concurrency)
+
+        async def generate_chunk(size: int, chunk_focus: List[str]):
+            async with semaphore:
+                return await FileProcessor._generate_validated(
+                    content, difficulty, practice_mode, size, chunk_focus or focus_areas
+                )
+
+        results = await asyncio.gather(
+            *(generate_chunk(size, chunk_focus) for size, chunk_focus in chunks),
+            return_exceptions=True,
+        )
+
+        questions = []
+        errors = []
+        for result in results:
+            if isinstance(result, Exception):
+                errors.append(result)
+            else:
+                questions.extend(result)
+        if not questions and errors:
+            raise errors[0]
+
+        return FileProcessor._dedupe_questions(questions)[:num_questions]
+
+    @staticmethod
+    async def _generate_validated(
+        content: str,
+        difficulty: str,
+        practice_mode: str,
+        num_questions: int,
+        focus_areas: Optional[List[str]] = None,
+        existing: Optional[List[Dict[str, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate questions, validating each item on its own. Items that fail
+        validation (or were lost to truncation) are re-requested, up to
+        `question_repair_attempts` times, instead of regenerating the whole set.
+        `existing` questions count towards the total and are not repeated.
+        """
+        existing = existing or []
+        questions = list(existing)
+        missing = num_questions
+        for attempt in range(settings.question_repair_attempts + 1):
+            prompt = FileProcessor._build_question_prompt(
+                content, difficulty, practice_mode, missing, focus_areas
+            )
+            try:
+                items = await FileProcessor._llm_extract(prompt)
+            except Exception:
+                if attempt == 0 and not existing:
+                    raise
+                break
+            valid, _ = FileProcessor._validate_questions(items, practice_mode)
+            questions = FileProcessor._dedupe_questions(questions + valid)
+            missing = num_questions - (len(questions) - len(existing))
+            if missing <= 0:
+                break
+        return questions[len(existing):][:num_questions]
+
+    @staticmethod
+    def _validate_questions(
+        items: Any, practice_mode: str
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """Validate generated questions one by one; returns the valid ones and the rejected count"""
+        model = GeneratedMCQQuestion if practice_mode == "mcq" else GeneratedQAQuestion
+        if isinstance(items, dict):
+            items = items.get("questions", [items])
+        if not isinstance(items, list):
+            return [], 1
+
+        valid = []
+        for item in items:
+            try:
+                valid.append(model.model_validate(item).model_dump(exclude_none=True))
+            except ValidationError:
+                continue
+        return valid, len(items) - len(valid)
+
+    @staticmethod
+    def _plan_question_chunks(
+        content: str, num_questions: int, focus_areas: Optional[List[str]] = None
+    ) -> List[Tuple[int, List[str]]]:
+        """
+        Split a request into (question count, focus areas) chunks of at most
+        `question_chunk_size` questions, spreading the focus areas (or the
+        skill groups found in the parsed content) across the chunks.
+        """
+        chunk_size = max(1, settings.question_chunk_size)
+        num_chunks = math.ceil(num_questions / chunk_size)
+        base, extra = divmod(num_questions, num_chunks)
+        sizes = [base + (1 if i < extra else 0) for i in range(num_chunks)]
+
+        groups = list(focus_areas or []) or FileProcessor._skill_groups(content, num_chunks)
+        if groups and len(groups) < num_chunks:
+            return [(size, [groups[i % len(groups)]]) for i, size in enumerate(sizes)]
+        return [(size, groups[i::num_chunks]) for i, size in enumerate(sizes)]
+
+    @staticmethod
+    def _skill_groups(content: str, num_groups: int) -> List[str]:
+        """Derive topic groups from parsed resume/JD JSON to partition generation by"""
+        try:
+            parsed = json.loads(content)
+        except (TypeError, ValueError):
+            return []
+        if not isinstance(parsed, dict):
+            return []
+
+        skills = parsed.get("skills")
+        if isinstance(skills, dict):
+            return [
+                f"{name}: {', '.join(map(str, values))}" if isinstance(values, list) else str(name)
+                for name, values in skills.items()
+                if values
+            ]
+        if isinstance(skills, list) and skills:
+            per_group = math.ceil(len(skills) / num_groups)
+            return [
+                ", ".join(map(str, skills[i:i + per_group]))
+                for i in range(0, len(skills), per_group)
+            ]
+        return [
+            section
+            for section in ("projects", "experience", "responsibilities", "requirements", "education")
+            if parsed.get(section)
+        ]
+
+    @staticmethod
+    def _dedupe_questions(questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop questions whose wording nearly matches an earlier one (token Jaccard)"""
+        threshold = settings.question_dedupe_threshold
+        kept = []
+        kept_tokens = []
+        for question in questions:
+            tokens = set(re.findall(r"[a-z0-9]+", str(question.get("question", "")).lower()))
+            if not tokens:
+                continue
+            if any(
+                len(tokens & other) / len(tokens | other) >= threshold
+                for other in kept_tokens
+            ):
+                continue
+            kept.append(question)
+            kept_tokens.append(tokens)
+        return kept
+
+    @staticmethod
+    async def stream_questions(
+        content: str,
+        difficulty: str,
+        practice_mode: str,
+        num_questions: str,
+        focus_areas: Optional[List[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of `generate_questions`: yields each question object
+        as soon as the model has finished writing it.
+        """
+        num_questions = int(num_questions)
+
+        cache_key = FileProcessor.question_set_key(
+            content, difficulty, practice_mode, num_questions, focus_areas
+        )
+        cached = _question_set_cache.get(cache_key)
+        if cached is not None:
+            for question in FileProcessor.reshuffle_questions(cached, num_questions):
+                yield question
+            return
+
+        prompt = FileProcessor._build_question_prompt(
+            content, difficulty, practice_mode, num_questions, focus_areas
+        )
+        parser = JSONArrayItemStream()
+        questions = []
+        with llm_operation("generate_questions"):
+            async for delta in llm_router.stream(
+                GENERATION,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.3,
+                max_tokens=8000,
+                priority=LLMPriority.BACKGROUND,
+            ):
+                valid, _ = FileProcessor._validate_questions(parser.feed(delta), practice_mode)
+                for item in FileProcessor._dedupe_questions(questions + valid)[len(questions):]:
+                    questions.append(item)
+                    yield item
+
+            # Re-request only what was invalid or cut off
+            if len(questions) < num_questions:
+                for item in await FileProcessor._generate_validated(
+                    content, difficulty, practice_mode, num_questions - len(questions), focus_areas, existing=questions
+                ):
+                    questions.append(item)
+                    yield item
+
+        if questions:
+            _question_set_cache.set(cache_key, copy.deepcopy(questions))
+
+    @staticmethod
+    async def parse_and_generate(
+        source_type: str,
+        content: str,
+        difficulty: str,
+        practice_mode: str,
+        num_questions: str,
+        focus_areas: Optional[List[str]] = None,
+        db: Optional[Session] = None,
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Parse an uploaded resume / job description and generate its questions
+        with a single LLM call instead of a parse call followed by a
+        `generate_questions` call.
+
+        The questions are validated like `generate_questions` output and any
+        that are missing are topped up from the parsed data. A cached resume
+        parse is reused, leaving only the questions to generate. If the
+        response has no usable `parsed_data` it falls back to the two calls.
+        Returns the parsed data and the questions.
+        """
+        parsed_data = FileProcessor._cached_parse(source_type, content, db)
+        if parsed_data is not None:
+            return parsed_data, await FileProcessor.generate_questions(
+                json.dumps(parsed_data), difficulty, practice_mode, num_questions, focus_areas
+            )
+
+        num_questions = int(num_questions)
+        prompt = FileProcessor._build_fused_prompt(
+            source_type, content, difficulty, practice_mode, num_questions, focus_areas
+        )
+        with llm_operation("parse_and_generate"):
+            result = await FileProcessor._llm_extract(prompt)
+
+        parsed_data = result.get("parsed_data") if isinstance(result, dict) else None
+        if isinstance(parsed_data, dict):
+            parsed_data.pop("raw_text", None)
+        if not isinstance(parsed_data, dict) or not parsed_data:
+            parsed_data = await FileProcessor._parse_source(source_type, content, db)
+            return parsed_data, await FileProcessor.generate_questions(
+                json.dumps(parsed_data), difficulty, practice_mode, num_questions, focus_areas
+            )
+
+        valid, _ = FileProcessor._validate_questions(result.get("questions", []), practice_mode)
+        questions = FileProcessor._dedupe_questions(valid)[:num_questions]
+        questions += await FileProcessor._finish_fused(
+            source_type, content, parsed_data, questions,
+            difficulty, practice_mode, num_questions, focus_areas,
+        )
+        return parsed_data, questions
+
+    @staticmethod
+    async def stream_parse_and_generate(
+        source_type: str,
+        content: str,
+        difficulty: str,
+        practice_mode: str,
+        num_questions: str,
+        focus_areas: Optional[List[str]] = None,
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Streaming variant of `parse_and_generate`: one streamed call whose
+        output has a `parsed_data` section followed by a `questions` section.
+        Yields ("parsed_data", data) as soon as that section is complete, then
+        ("question", question) for each question as it is finished.
+        Uses its own DB session for the parse cache lookup, because it
+        outlives the request handler.
+        """
+        db = SessionLocal()
+        try:
+            parsed_data = FileProcessor._cached_parse(source_type, content, db)
+        finally:
+            db.close()
+        if parsed_data is not None:
+            yield "parsed_data", parsed_data
+            async for question in FileProcessor.stream_questions(
+                json.dumps(parsed_data), difficulty, practice_mode, num_questions, focus_areas
+            ):
+                yield "question", question
+            return
+
+        num_questions = int(num_questions)
+        prompt = FileProcessor._build_fused_prompt(
+            source_type, content, difficulty, practice_mode, num_questions, focus_areas
+        )
+        deltas = FileProcessor._labelled_stream("parse_and_generate", llm_router.stream(
+            GENERATION,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            max_tokens=8000,
+            priority=LLMPriority.BACKGROUND,
+        ))
+        parser = JSONArrayItemStream()
+        fields = JSONFieldStream("parsed_data")
+        questions = []
+        sent = 0
+        async for delta in deltas:
+            valid, _ = FileProcessor._validate_questions(parser.feed(delta), practice_mode)
+            if valid:
+                questions = FileProcessor._dedupe_questions(questions + valid)[:num_questions]
+
+            if not fields.done:
+                parsed_data = fields.feed(delta)
+                if not isinstance(parsed_data, dict):
+                    parsed_data = None
+                else:
+                    parsed_data.pop("raw_text", None)
+                    yield "parsed_data", parsed_data
+            # Questions written before parsed_data are held back until it arrives
+            if parsed_data is not None:
+                for question in questions[sent:]:
+                    yield "question", question
+                sent = len(questions)
+
+        if parsed_data is None:
+            # The stored parses were already looked up above
+            parsed_data = await FileProcessor._parse_source(source_type, content)
+            yield "parsed_data", parsed_data
+            for question in questions:
+                yield "question", question
+
+        for question in await FileProcessor._finish_fused(
+            source_type, content, parsed_data, questions,
+            difficulty, practice_mode, num_questions, focus_areas,
+        ):
+            yield "question", question
+
+    @staticmethod
+    async def _labelled_stream(operation: str, deltas: AsyncIterator[str]) -> AsyncIterator[str]:
+        """
+        Label `deltas` with `operation` around each step only, so the stream
+        can be resumed from another task (the request handler reads the parsed
+        section, the StreamingResponse the questions).
+        """
+        while True:
+            with llm_operation(operation):
+                try:
+                    delta = await deltas.__anext__()
+                except StopAsyncIteration:
+                    return
+            yield delta
+
+    @staticmethod
+    def _cached_parse(
+        source_type: str, content: str, db: Optional[Session] = None
+    ) -> Optional[Dict[str, Any]]:
+        if source_type != "resume":
+            return None
+        return FileProcessor.cached_resume_parse(FileProcessor.resume_parse_key(content), db)
+
+    @staticmethod
+    async def _parse_source(
+        source_type: str, content: str, db: Optional[Session] = None
+    ) -> Dict[str, Any]:
+        if source_type == "resume":
+            parsed_data, _ = await FileProcessor.parse_resume_cached(content, db)
+            return parsed_data
+        # The job description routes normalize before the fused call
+        return await FileProcessor.parse_job_description_with_llm(content, normalized=True)
+
+    @staticmethod
+    async def _finish_fused(
+        source_type: str,
+        content: str,
+        parsed_data: Dict[str, Any],
+        questions: List[Dict[str, Any]],
+        difficulty: str,
+        practice_mode: str,
+        num_questions: int,
+        focus_areas: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Cache a fused result like the separate calls would have and return
+        the questions still needed to reach `num_questions`.
+        """
+        if source_type == "resume":
+            _resume_parse_cache.set(
+                FileProcessor.resume_parse_key(content), copy.deepcopy(parsed_data)
+            )
+        parsed_content = json.dumps(parsed_data)
+
+        extra = []
+        if len(questions) < num_questions:
+            with llm_operation("generate_questions"):
+                extra = await FileProcessor._generate_validated(
+                    parsed_content, difficulty, practice_mode,
+                    num_questions - len(questions), focus_areas, existing=questions,
+                )
+        if questions or extra:
+            _question_set_cache.set(
+                FileProcessor.question_set_key(
+                    parsed_content, difficulty, practice_mode, num_questions, focus_areas
+                ),
+                copy.deepcopy(questions + extra),
+            )
+        return extra
+
+    @staticmethod
+    def _build_fused_prompt(
+        source_type: str,
+        content: str,
+        difficulty: str,
+        practice_mode: str,
+        num_questions: int,
+        focus_areas: Optional[List[str]] = None,
+    ) -> str:
+        """
+        Parse prompt and question rules combined into one, answered as a
+        single JSON object. Only the rules of the question prompt are used:
+        its output format (a top-level array) and content section do not
+        apply here.
+        """
+        documents, label, fields = SOURCE_LABELS[source_type]
+        rules = minify_instructions(
+            FileProcessor._question_rules(difficulty) + FileProcessor._focus_instruction(focus_areas)
+        )
+        question_format = MCQ_QUESTION_FORMAT if practice_mode == "mcq" else QA_QUESTION_FORMAT
+        return (
+            f"You are a helpful assistant that extracts structured information from {documents} "
+            "and then writes interview questions from it.\n\n"
+            f"Step 1: from the {label.lower()} text at the end, extract these fields:\n"
+            f"{fields}\n"
+            f"Step 2: from the fields you extracted, write {num_questions} {practice_mode} "
+            "questions following these rules:\n"
+            f"{rules}\n\n"
+            "Respond ONLY with one valid JSON object and no extra text, writing parsed_data first:\n"
+            '{"parsed_data": {<fields from step 1>}, "questions": [<question>, ...]}\n'
+            f"where each question is:\n{minify_instructions(question_format)}\n\n"
+            f"{label}:\n{content}\n\n"
+            "JSON:"
+        )
+
+    @staticmethod
+    def _build_question_prompt(
+        content: str,
+        difficulty: str,
+        practice_mode: str,
+        num_questions: int,
+        focus_areas: Optional[List[str]] = None,
+    ) -> str:
+        """
+        Build the question generation prompt: minified instructions plus the
+        parsed content compacted (see `compact_parsed_content`) into what is
+        left of `question_prompt_token_budget`.
+        """
+        placeholder = "\x00content\x00"
+        instructions = minify_instructions(FileProcessor._question_prompt_text(
+            placeholder, difficulty, practice_mode, num_questions, focus_areas
+        ))
+        content_budget = max(
+            settings.question_prompt_token_budget - count_tokens(instructions.replace(placeholder, "")),
+            settings.question_prompt_min_content_tokens,
+        )
+        return instructions.replace(
+            placeholder, compact_parsed_content(content, focus_areas, content_budget)
+        )
 
-        if focus_areas:
-            joined_focus_areas = ", ".join(focus_areas)
-            focus_instruction = f"""
+    @staticmethod
+    def _question_prompt_text(
+        content: str,
+        difficulty: str,
+        practice_mode: str,
+        num_questions: int,
+        focus_areas: Optional[List[str]] = None,
+    ) -> str:
+        """The question generation prompt as written, before compaction"""
+        indent = "\n" + " " * 16
+        mcq_format = MCQ_QUESTION_FORMAT.replace("\n", indent)
+        qa_format = QA_QUESTION_FORMAT.replace("\n", indent)
+        rules = FileProcessor._question_rules(difficulty).strip()
+        prompt = f"""
+            {rules}
+
+                ### Enhanced Output Requirements:
+                **MCQ Format:**
+                [
+                {mcq_format}
+                ]
+
+                **QA Format:**
+                [
+                {qa_format}
+                ]
+
+                ### Content Analysis:
+                {content}
+
+                **Practice Mode**: {practice_mode}
+                **Number of Questions**: {num_questions}
+                **Focus Area**: {FileProcessor._focus_instruction(focus_areas)}
+
+                Generate questions that would make even senior engineers pause and think. Remember: randomize MCQ answer positions and create genuinely challenging distractors.
+                Return only the JSON output.
+                """
+        return prompt
+
+    @staticmethod
+    def _focus_instruction(focus_areas: Optional[List[str]] = None) -> str:
+        if not focus_areas:
+            return ""
+        joined_focus_areas = ", ".join(focus_areas)
+        return f"""
             • Focus Areas (Very Important): Prioritize topics related to **{joined_focus_areas}**.
             These should guide the direction of questions. If an area is not relevant to the parsed content, skip it.
             """
 
-        prompt = f"""
+    @staticmethod
+    def _question_rules(difficulty: str) -> str:
+        """
+        How to write the questions, without the output format or the content:
+        shared by the question prompt and the fused parse-and-generate prompt
+        """
+        return f"""
             You are a senior technical interviewer at a FAANG company with 10+ years of experience evaluating top-tier engineers. Your reputation depends on asking questions that separate exceptional candidates from average ones.
 
                 ### CRITICAL REQUIREMENTS:
@@ -325,40 +978,55 @@ class FileProcessor:
                 - MCQs where position A is always correct
                 - Options that are obviously wrong to anyone with basic knowledge
                 - Questions that don't require justification or reasoning
+            """
 
-                ### Enhanced Output Requirements:
-                **MCQ Format:**
-                [
-                {{
-                    "question": "[Detailed scenario-based question referencing specific skills/projects]",
-                    "options": ["Option A", "Option B", "Option C", "Option D"],
-                    "correct_index": [0-3, randomly distributed],
-                    "answer": "[The correct option text]",
-                    "explanation": "[Why this answer is correct AND why other options are wrong]"
-                }}
-                ]
-
-                **QA Format:**
-                [
-                {{
-                    "question": "[Complex, multi-part question requiring detailed explanation]",
-                    "answer": "[Comprehensive answer covering multiple aspects]",
-                    "explanation": "[Additional context, alternative approaches, or edge cases to consider]"
-                }}
-                ]
-
-                ### Content Analysis:
-                {content}
-
-                **Practice Mode**: {practice_mode}
-                **Number of Questions**: {num_questions}
-                **Focus Area**: {focus_instruction}
+    @staticmethod
+    def question_set_key(
+        content: str,
+        difficulty: str,
+        practice_mode: str,
+        num_questions: int,
+        focus_areas: Optional[List[str]] = None,
+    ) -> Tuple[str, ...]:
+        """Cache key for a generated question set"""
+        return (
+            hashlib.sha256(content.encode("utf-8")).hexdigest(),
+            difficulty,
+            practice_mode,
+            str(num_questions),
+            ",".join(sorted(focus_areas or [])),
+            QUESTION_PROMPT_VERSION,
+            llm_router.models(GENERATION),
+        )
 
-                Generate questions that would make even senior engineers pause and think. Remember: randomize MCQ answer positions and create genuinely challenging distractors.
-                Return only the JSON output.
-                """
+    @staticmethod
+    def reshuffle_questions(
+        questions: List[Dict[str, Any]], num_questions: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Return a freshly shuffled sample of a cached question set.
+        MCQ options are shuffled too, with `correct_index` kept pointing at the answer.
+        """
+        sample = random.sample(questions, k=min(num_questions, len(questions)))
+        shuffled = []
+        for question in copy.deepcopy(sample):
+            options = question.get("options")
+            correct_index = question.get("correct_index")
+            if isinstance(options, list) and isinstance(correct_index, int) and 0 <= correct_index < len(options):
+                order = list(range(len(options)))
+                random.shuffle(order)
+                question["options"] = [options[i] for i in order]
+                question["correct_index"] = order.index(correct_index)
+            shuffled.append(question)
+        return shuffled
 
-        return FileProcessor._llm_extract(prompt)
+    @staticmethod
+    def cache_stats() -> Dict[str, Any]:
+        """Hit/miss counters for the parse and question-set caches"""
+        return {
+            "resume_parse": _resume_parse_cache.stats(),
+            "question_sets": _question_set_cache.stats(),
+        }
 
     @staticmethod
     def get_file_size_string(size_bytes: int) -> str:
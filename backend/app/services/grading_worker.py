@@ -0,0 +1,96 @@
+# app/services/grading_worker.py
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class GradingWorkerPool:
+    """
+    Bounded pool of asyncio workers for grading that should not hold up the
+    HTTP request, plus a small in-process pub/sub so finished grades can be
+    pushed to listeners (e.g. an SSE stream) keyed by session id.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._delayed: Set[asyncio.Task] = set()
+        self._subscribers: Dict[Hashable, Set[asyncio.Queue]] = defaultdict(set)
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        tasks = self._tasks + list(self._delayed)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._delayed.clear()
+        self._queue = None
+
+    def submit(self, job: Callable[..., Awaitable[Any]], *args: Any) -> None:
+        """
+        Queue `job(*args)` for a worker.
+        Raises asyncio.QueueFull when the pool is saturated.
+        """
+        self.start()
+        self._queue.put_nowait((job, args))
+
+    def submit_later(self, delay: float, job: Callable[..., Awaitable[Any]], *args: Any) -> None:
+        """Queue `job(*args)` after `delay` seconds (e.g. to retry after an outage)"""
+
+        async def resubmit():
+            await asyncio.sleep(delay)
+            try:
+                self.submit(job, *args)
+            except asyncio.QueueFull:
+                logger.warning("Grading queue full, running a delayed job inline")
+                await job(*args)
+
+        task = asyncio.create_task(resubmit())
+        self._delayed.add(task)
+        task.add_done_callback(self._delayed.discard)
+
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    async def _worker(self) -> None:
+        while True:
+            job, args = await self._queue.get()
+            try:
+                await job(*args)
+            except Exception:
+                logger.exception("Background grading job failed")
+            finally:
+                self._queue.task_done()
+
+    def subscribe(self, key: Hashable) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers[key].add(queue)
+        return queue
+
+    def unsubscribe(self, key: Hashable, queue: asyncio.Queue) -> None:
+        self._subscribers[key].discard(queue)
+        if not self._subscribers[key]:
+            del self._subscribers[key]
+
+    def publish(self, key: Hashable, payload: Any) -> None:
+        for queue in self._subscribers.get(key, ()):
+            queue.put_nowait(payload)
+
+
+grading_pool = GradingWorkerPool(
+    workers=settings.grading_workers, queue_size=settings.grading_queue_size
+)
@@ -0,0 +1,204 @@
+# app/services/idempotency.py
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Optional, Type
+from uuid import UUID
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.idempotency_key import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+def request_fingerprint(*parts: Any) -> str:
+    """sha256 of the request payload an Idempotency-Key is bound to"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, bytes):
+            part = json.dumps(part, sort_keys=True, default=str).encode("utf-8")
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _claim(user_id: UUID, endpoint: str, key: str, fingerprint: str) -> Optional[UUID]:
+    """
+    Insert an in-progress record for the key. Returns its id, or None when
+    another request already holds the key. A claim left in progress for
+    longer than `idempotency_lock_timeout` (its worker died) is taken over.
+    """
+    now = datetime.now(timezone.utc)
+    db = SessionLocal()
+    try:
+        # Expired keys of this user can be reused
+        db.query(IdempotencyKey).filter(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.created_at < now - timedelta(seconds=settings.idempotency_ttl_seconds),
+        ).delete(synchronize_session=False)
+        record = IdempotencyKey(
+            user_id=user_id,
+            endpoint=endpoint,
+            key=key,
+            fingerprint=fingerprint,
+            status="in_progress",
+            created_at=now,
+        )
+        db.add(record)
+        try:
+            db.commit()
+            return record.id
+        except IntegrityError:
+            db.rollback()
+
+        stale = db.query(IdempotencyKey).filter(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.endpoint == endpoint,
+            IdempotencyKey.key == key,
+            IdempotencyKey.status == "in_progress",
+            IdempotencyKey.created_at < now - timedelta(seconds=settings.idempotency_lock_timeout),
+        ).first()
+        if stale is None or stale.fingerprint != fingerprint:
+            return None
+        taken = db.query(IdempotencyKey).filter(
+            IdempotencyKey.id == stale.id, IdempotencyKey.created_at == stale.created_at
+        ).update({"created_at": now}, synchronize_session=False)
+        db.commit()
+        return stale.id if taken else None
+    finally:
+        db.close()
+
+
+def _find(user_id: UUID, endpoint: str, key: str) -> Optional[IdempotencyKey]:
+    db = SessionLocal()
+    try:
+        return db.query(IdempotencyKey).filter(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.endpoint == endpoint,
+            IdempotencyKey.key == key,
+        ).first()
+    finally:
+        db.close()
+
+
+def _complete(record_id: UUID, status_code: int, body: Any) -> None:
+    db = SessionLocal()
+    try:
+        db.query(IdempotencyKey).filter(IdempotencyKey.id == record_id).update(
+            {
+                "status": "completed",
+                "status_code": status_code,
+                "response_body": body,
+                "completed_at": datetime.now(timezone.utc),
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _release(record_id: UUID) -> None:
+    """Drop the claim of a request that failed, so a retry runs it again"""
+    db = SessionLocal()
+    try:
+        db.query(IdempotencyKey).filter(IdempotencyKey.id == record_id).delete(
+            synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+async def _await_result(
+    user_id: UUID, endpoint: str, key: str, fingerprint: str
+) -> Optional[IdempotencyKey]:
+    """
+    Wait for the request holding the key to finish. Returns its completed
+    record, or None if it failed and released the key.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.idempotency_wait_timeout
+    while True:
+        record = _find(user_id, endpoint, key)
+        if record is None:
+            return None
+        if record.fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"{IDEMPOTENCY_HEADER} was already used for a different request",
+            )
+        if record.status == "completed":
+            return record
+        if loop.time() >= deadline:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"A request with this {IDEMPOTENCY_HEADER} is still in progress",
+            )
+        await asyncio.sleep(settings.idempotency_poll_interval)
+
+
+async def run_idempotent(
+    request: Request,
+    user_id: UUID,
+    fingerprint: str,
+    handler: Callable[[], Awaitable[Any]],
+    response_model: Type[BaseModel],
+    status_code: int = status.HTTP_200_OK,
+) -> Any:
+    """
+    Run `handler` at most once per `Idempotency-Key` header value (per user
+    and endpoint).
+
+    The first request with a key runs the handler and stores its response
+    (serialized with `response_model`), or its HTTP error if it was a 4xx.
+    Repeats get the stored response back; repeats arriving while the first
+    request is still running wait for it instead of running the handler
+    again. A key reused with a different payload is rejected with 422.
+    Requests without the header run the handler as usual.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key:
+        return await handler()
+    if len(key) > 255:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{IDEMPOTENCY_HEADER} must be at most 255 characters",
+        )
+
+    endpoint = request.url.path
+    while True:
+        record_id = _claim(user_id, endpoint, key, fingerprint)
+        if record_id is not None:
+            break
+        record = await _await_result(user_id, endpoint, key, fingerprint)
+        if record is None:
+            continue  # the first request failed; run it here instead
+        if record.status_code >= 400:
+            raise HTTPException(status_code=record.status_code, detail=record.response_body.get("detail"))
+        return record.response_body
+
+    try:
+        result = await handler()
+    except HTTPException as e:
+        # Client errors are a deterministic answer to this payload; anything
+        # else (LLM outages, deadlines, disconnects) may succeed on retry
+        if e.status_code < 500 and e.status_code not in (408, 409, 429, 499):
+            _complete(record_id, e.status_code, {"detail": e.detail})
+        else:
+            _release(record_id)
+        raise
+    except BaseException:
+        _release(record_id)
+        raise
+
+    _complete(
+        record_id,
+        status_code,
+        response_model.model_validate(result).model_dump(mode="json"),
+    )
+    return result
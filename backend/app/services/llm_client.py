@@ -0,0 +1,192 @@
+# app/services/llm_client.py
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import time
+import httpx
+from groq import APIStatusError, AsyncGroq
+from app.core.config import settings
+from app.services.fake_llm import build_transport
+from app.services.llm_metrics import classify_outcome, llm_metrics, retries_from_error
+from app.services.llm_scheduler import LLMPriority, llm_scheduler
+
+_http_client: Optional[httpx.AsyncClient] = None
+_clients: Dict[Tuple[Optional[str], Optional[str]], AsyncGroq] = {}
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package; fall back to HTTP/1.1 without it"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide HTTP connection pool shared by all LLM clients.
+
+    It is created lazily on first use and keeps keep-alive connections, so
+    grading/parsing/generation calls reuse the same TLS connections instead
+    of reconnecting on every request. With LLM_MODE other than "live" the
+    requests go to the fake LLM or through the recorder instead.
+    """
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            http2=settings.llm_http2 and _http2_available(),
+            limits=httpx.Limits(
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_keepalive_connections,
+                keepalive_expiry=settings.llm_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                settings.llm_timeout, connect=settings.llm_connect_timeout
+            ),
+            transport=build_transport(),
+        )
+    return _http_client
+
+
+def get_llm_client(
+    api_key: Optional[str] = None, base_url: Optional[str] = None
+) -> AsyncGroq:
+    """Return the async LLM client for an API key / endpoint (defaults from Settings)"""
+    key = (api_key or settings.chatgroq_api_key, base_url or settings.llm_base_url)
+    if key not in _clients:
+        _clients[key] = AsyncGroq(
+            api_key=key[0],
+            base_url=key[1],
+            max_retries=settings.llm_max_retries,
+            http_client=get_http_client(),
+        )
+    return _clients[key]
+
+
+async def close_llm_client() -> None:
+    """Close the shared connection pool (called on shutdown)"""
+    global _http_client
+    _clients.clear()
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+def estimate_prompt_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Cheap prompt size estimate (~4 characters per token) used for rate limiting"""
+    return sum(len(m.get("content") or "") for m in messages) // 4 + 1
+
+
+async def _create(
+    client: AsyncGroq, limit_key: str, model: str, **kwargs: Any
+) -> Tuple[Any, int]:
+    """
+    Issue the request and report the provider's rate-limit headers to the
+    scheduler. Returns the parsed response and the number of SDK retries.
+    """
+    try:
+        raw = await client.chat.completions.with_raw_response.create(model=model, **kwargs)
+    except APIStatusError as e:
+        llm_scheduler.observe_headers(limit_key, e.response.headers, e.status_code)
+        raise
+    llm_scheduler.observe_headers(limit_key, raw.headers)
+    return await raw.parse(), raw.retries_taken
+
+
+async def chat_completion(
+    model: str,
+    messages: List[Dict[str, Any]],
+    temperature: float,
+    max_tokens: int,
+    priority: LLMPriority = LLMPriority.INTERACTIVE,
+    client: Optional[AsyncGroq] = None,
+    limit_key: Optional[str] = None,
+) -> str:
+    """
+    Run a chat completion and return the message text. `client` defaults to
+    the Settings key/endpoint; `limit_key` names the rate limit the call
+    counts against (defaults to the model).
+    """
+    client = client or get_llm_client()
+    limit_key = limit_key or model
+    estimated = estimate_prompt_tokens(messages)
+    async with llm_scheduler.slot(limit_key, priority, estimated):
+        start = time.perf_counter()
+        try:
+            response, retries = await _create(
+                client,
+                limit_key,
+                model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+        except BaseException as e:
+            llm_metrics.record(
+                model, time.perf_counter() - start,
+                retries=retries_from_error(e), outcome=classify_outcome(e),
+            )
+            raise
+        latency = time.perf_counter() - start
+    usage = getattr(response, "usage", None)
+    llm_scheduler.record_usage(limit_key, estimated, usage.total_tokens if usage else None)
+    llm_metrics.record(
+        model,
+        latency,
+        prompt_tokens=usage.prompt_tokens if usage else estimated,
+        completion_tokens=usage.completion_tokens if usage else 0,
+        retries=retries,
+    )
+    return response.choices[0].message.content
+
+
+async def stream_chat_completion(
+    model: str,
+    messages: List[Dict[str, Any]],
+    temperature: float,
+    max_tokens: int,
+    priority: LLMPriority = LLMPriority.INTERACTIVE,
+    client: Optional[AsyncGroq] = None,
+    limit_key: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """Run a streaming chat completion and yield the text deltas as they arrive"""
+    client = client or get_llm_client()
+    limit_key = limit_key or model
+    estimated = estimate_prompt_tokens(messages)
+    generated = 0
+    usage = None
+    retries = 0
+    error: Optional[BaseException] = None
+    async with llm_scheduler.slot(limit_key, priority, estimated):
+        start = time.perf_counter()
+        try:
+            stream, retries = await _create(
+                client,
+                limit_key,
+                model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True,
+            )
+            async for chunk in stream:
+                # Groq reports usage on the last chunk
+                x_groq = getattr(chunk, "x_groq", None)
+                usage = getattr(x_groq, "usage", None) or getattr(chunk, "usage", None) or usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    generated += len(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            llm_metrics.record(
+                model,
+                time.perf_counter() - start,
+                prompt_tokens=usage.prompt_tokens if usage else estimated,
+                completion_tokens=usage.completion_tokens if usage else generated // 4,
+                retries=retries or retries_from_error(error),
+                outcome=classify_outcome(error),
+            )
+    llm_scheduler.record_usage(
+        limit_key, estimated, usage.total_tokens if usage else estimated + generated // 4
+    )
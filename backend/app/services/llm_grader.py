@@ -1,42 +1,116 @@
 # app/services/llm_grader.py
 import json
 import re
-from typing import Dict, Any
-from groq import Groq
-import openai  # or your preferred LLM client
-from app.core.config import settings
+from typing import Dict, Any, List, Optional
+from pydantic import ValidationError
+from app.schemas.mock_session import GradeResult
+from app.services.llm_json import LLMJSONError, extract_json
+from app.services.llm_metrics import llm_operation
+from app.services.llm_router import GRADING, llm_router
+from app.services.llm_scheduler import LLMPriority
+
+RUBRIC_MAX_POINTS = 5
+RUBRIC_POINT_CHARS = 200
+RUBRIC_MAX_CONCEPTS = 8
+RUBRIC_STOPWORDS = {
+    "about", "adds", "also", "and", "are", "because", "been", "being", "both",
+    "but", "can", "could", "does", "each", "for", "from", "gives", "has", "have",
+    "however", "include", "includes", "into", "its", "like", "make", "makes",
+    "many", "more", "most", "much", "must", "need", "needs", "not", "only",
+    "other", "should", "some", "such", "than", "that", "the", "their", "them",
+    "then", "there", "these", "they", "this", "those", "through", "use", "used",
+    "uses", "using", "very", "was", "well", "were", "what", "when", "where",
+    "which", "while", "will", "with", "would", "you", "your",
+}
 
 
 class LLMGrader:
 
     @staticmethod
-    def _llm_extract(prompt: str) -> Dict[str, Any]:
-        client = Groq(api_key=settings.chatgroq_api_key)
-
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
+    async def _llm_extract(
+        prompt: str,
+        max_tokens: int = 2000,
+        priority: LLMPriority = LLMPriority.INTERACTIVE,
+    ) -> Dict[str, Any]:
+        content = await llm_router.complete(
+            GRADING,
             messages=[{"role": "user", "content": prompt}],
             temperature=0.4,
-            max_tokens=2000,
+            max_tokens=max_tokens,
+            priority=priority,
+            # Someone is waiting on interactive grades: race a slow call
+            hedge=priority == LLMPriority.INTERACTIVE,
         )
 
         try:
-            return json.loads(response.choices[0].message.content)
-        except json.JSONDecodeError:
-            # Fallback: Extract JSON substring using regex
-            match = re.search(r"\{.*\}", response.choices[0].message.content, re.DOTALL)
-            if match:
-                try:
-                    return json.loads(match.group(0))
-                except json.JSONDecodeError:
-                    pass
+            return extract_json(content)
+        except LLMJSONError:
             raise Exception(
-                f"Failed to parse JSON from LLM output:\nPrompt:\n{prompt}\n\nLLM Output:\n{response.choices[0].message.content}"
+                f"Failed to parse JSON from LLM output:\nPrompt:\n{prompt}\n\nLLM Output:\n{content}"
             )
 
+    @staticmethod
+    def build_rubric(question: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Derive a compact grading rubric from a generated question's reference
+        `answer` and `explanation`, for questions the model returned without one.
+        """
+        answer = str(question.get("answer") or "")
+        explanation = str(question.get("explanation") or "")
+
+        sentences = [
+            s.strip() for s in re.split(r"(?<=[.;!?])\s+|\n+", answer) if len(s.strip()) > 3
+        ]
+        key_points = [s[:RUBRIC_POINT_CHARS] for s in sentences[:RUBRIC_MAX_POINTS]]
+
+        # Rank terms by frequency, boosting ones that look technical
+        # (mid-sentence capitals, acronyms, digits, C++/C#-style names)
+        text = f"{answer} {explanation}"
+        weights: Dict[str, int] = {}
+        for match in re.finditer(r"[A-Za-z][A-Za-z0-9+#.\-]{2,}", text):
+            raw = match.group(0).rstrip(".")
+            word = raw.lower()
+            if word in RUBRIC_STOPWORDS or len(word) < 3:
+                continue
+            before = text[:match.start()].rstrip()
+            mid_sentence = bool(before) and before[-1] not in ".!?;:"
+            technical = (
+                any(c.isupper() for c in raw[1:])
+                or any(c.isdigit() or c in "+#" for c in raw)
+                or (raw[0].isupper() and mid_sentence)
+            )
+            weights[word] = weights.get(word, 0) + (3 if technical else 1)
+        concepts = sorted(weights, key=lambda w: (-weights[w], w))[:RUBRIC_MAX_CONCEPTS]
+
+        return {
+            "key_points": key_points,
+            "expected_concepts": concepts,
+            "scoring_anchors": {
+                "excellent": "Covers every key point with specifics and trade-offs",
+                "average": "Covers some key points, partly or without depth",
+                "poor": "Misses most key points, is off-topic or empty",
+            },
+        }
+
+    @staticmethod
+    def attach_rubrics(questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Make sure every QA question carries a rubric (computed once, at session creation)"""
+        for question in questions:
+            if isinstance(question, dict) and "options" not in question and not question.get("rubric"):
+                question["rubric"] = LLMGrader.build_rubric(question)
+        return questions
+
+    @staticmethod
+    def _reference_section(context: str, rubric: Optional[Dict[str, Any]]) -> str:
+        """Prompt section the answer is graded against: the rubric if present, else the source context"""
+        if rubric:
+            return f"**Grading Rubric:** {json.dumps(rubric, separators=(',', ':'))}"
+        return f"**Context:** {context if context else 'No additional context provided'}"
+
     @staticmethod
     async def grade_qa_answer(
-        question: str, user_answer: str, context: str , difficulty: str 
+        question: str, user_answer: str, context: str , difficulty: str,
+        rubric: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         """
         Grade a Q/A answer using LLM
@@ -46,9 +120,11 @@ class LLMGrader:
             user_answer: User's answer to grade
             context: Additional context (resume data, job description)
             difficulty: Question difficulty level
+            rubric: Compact per-question rubric; when given it replaces the context
 
         Returns:
-            Dict containing score, feedback, and correctness level
+            Dict containing score, feedback, and correctness level.
+            Raises if the answer could not be graded; there is no fallback score.
         """
 
         prompt = f"""
@@ -58,7 +134,7 @@ class LLMGrader:
 
                     **Your Answer:** {user_answer}
 
-                    **Context:** {context if context else 'No additional context provided'}
+                    {LLMGrader._reference_section(context, rubric)}
 
                     **Difficulty Level:** {difficulty}
 
@@ -86,15 +162,84 @@ class LLMGrader:
 
                     Make sure your response is valid JSON only, no additional text.
                     """
-        try:
-            return LLMGrader._llm_extract(prompt)
-
-        except Exception as e:
-            # Fallback response if LLM fails
-            return {
-                "score": 50,
-                "correctness_level": "average",
-                "feedback": f"Unable to grade automatically. Please review manually. Error: {str(e)}",
-                "strengths": [],
-                "improvements": ["Answer could not be automatically evaluated"],
-            }
+        # Re-ask once if the grade does not validate
+        for attempt in range(2):
+            try:
+                with llm_operation("grade_qa_answer"):
+                    result = await LLMGrader._llm_extract(prompt)
+                return GradeResult.model_validate(result).model_dump()
+            except ValidationError:
+                if attempt:
+                    raise
+
+    @staticmethod
+    async def grade_qa_batch(
+        answers: List[Dict[str, str]], context: str, difficulty: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Grade several Q/A answers from one session in a single LLM call,
+        sending the shared context only once.
+
+        Args:
+            answers: List of {"question": ..., "user_answer": ..., "rubric": optional}
+            context: Additional context (resume data, job description); may be
+                empty when every answer carries a rubric
+            difficulty: Question difficulty level
+
+        Returns:
+            One grade dict (same fields as `grade_qa_answer`) per answer, in order,
+            with None for answers the model skipped. Raises if the output cannot be parsed.
+        """
+        numbered = "\n\n".join(
+            f"### Answer {i}\n**My Question:** {a['question']}\n**Your Answer:** {a['user_answer']}"
+            + (f"\n{LLMGrader._reference_section('', a['rubric'])}" if a.get("rubric") else "")
+            for i, a in enumerate(answers)
+        )
+        context_section = f"**Context:** {context}" if context else ""
+
+        prompt = f"""
+                    You have just finished a live interview and are now reviewing all of the candidate's answers. Evaluate each answer and provide direct feedback as if you're speaking to them face-to-face.
+
+                    {context_section}
+
+                    **Difficulty Level:** {difficulty}
+
+                    {numbered}
+
+                    For each answer, evaluate it based on:
+                    1. Accuracy and correctness
+                    2. Completeness of the response
+                    3. Clarity and communication
+                    4. Relevance to the question
+                    5. Technical depth (if applicable)
+
+                    Provide your evaluation in the following JSON format, with exactly one entry per answer, speaking directly to the candidate:
+                    {{
+                        "grades": [
+                            {{
+                                "index": <answer number>,
+                                "score": <integer between 0-100>,
+                                "correctness_level": "<excellent|good|average|poor>",
+                                "feedback": "<direct feedback as if speaking to the candidate, using 'you' and 'your'>",
+                                "strengths": ["<what you did well - direct praise>", "<another strength>"],
+                                "improvements": ["<what you should work on - direct advice>", "<another improvement area>"]
+                            }}
+                        ]
+                    }}
+
+                    Make sure your response is valid JSON only, no additional text.
+                    """
+        # Nobody is waiting on a batch, so it yields to interactive grading
+        with llm_operation("grade_qa_batch"):
+            result = await LLMGrader._llm_extract(
+                prompt, max_tokens=500 * len(answers) + 500, priority=LLMPriority.BACKGROUND
+            )
+
+        grades = result.get("grades", []) if isinstance(result, dict) else result
+        by_index = {}
+        for grade in grades if isinstance(grades, list) else []:
+            try:
+                by_index[grade.get("index")] = GradeResult.model_validate(grade).model_dump()
+            except (AttributeError, ValidationError):
+                continue
+        return [by_index.get(i) for i in range(len(answers))]
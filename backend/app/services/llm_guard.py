@@ -0,0 +1,144 @@
+# app/services/llm_guard.py
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, Iterator, Optional, TypeVar
+from fastapi import HTTPException, Request
+from groq import APIConnectionError, APIStatusError
+from app.core.config import settings
+
+T = TypeVar("T")
+
+# Absolute (monotonic) time by which the current request's LLM work must finish
+_deadline: ContextVar[Optional[float]] = ContextVar("llm_deadline", default=None)
+
+
+class LLMUnavailableError(Exception):
+    """The LLM service cannot serve this call right now (outage, open circuit)"""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMDeadlineExceeded(LLMUnavailableError):
+    """The request's time budget ran out before the LLM answered"""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `cooldown` seconds. After the cooldown calls are let through again
+    (half-open): a success closes the circuit, a single failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if self.retry_after() == 0 else "open"
+
+    def allow(self) -> bool:
+        return self.state != "open"
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                self.trips += 1
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "retry_after": round(self.retry_after(), 1),
+        }
+
+
+def is_outage(exc: BaseException) -> bool:
+    """Whether an LLM call failure says something about the backend's health"""
+    if isinstance(exc, (asyncio.TimeoutError, APIConnectionError)):
+        return True
+    if isinstance(exc, APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return False
+
+
+def time_remaining() -> Optional[float]:
+    """Seconds left in the current request's LLM budget (None when unbounded)"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def call_timeout() -> float:
+    """Timeout for the next LLM call: the per-call cap, shortened by the request deadline"""
+    remaining = time_remaining()
+    if remaining is None:
+        return settings.llm_call_timeout
+    if remaining <= 0:
+        raise LLMDeadlineExceeded("The request ran out of time waiting for the LLM")
+    return min(settings.llm_call_timeout, remaining)
+
+
+@contextmanager
+def llm_deadline(request: Optional[Request] = None) -> Iterator[None]:
+    """
+    Bound all LLM work inside the block by the request's time budget:
+    `llm_request_deadline`, or less when the client sends `X-Request-Timeout`
+    (seconds). Nested blocks can only shorten an outer deadline.
+    """
+    seconds = settings.llm_request_deadline
+    header = request.headers.get("x-request-timeout") if request is not None else None
+    if header:
+        try:
+            seconds = min(seconds, max(0.0, float(header)))
+        except ValueError:
+            pass
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    Await `awaitable`, cancelling it (and the LLM calls under it) if the HTTP
+    client goes away first. Raises a 499 the client will never see.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=settings.disconnect_poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
@@ -0,0 +1,265 @@
+# app/services/llm_json.py
+import json
+import re
+from typing import Any, List, Optional
+
+
+class JSONArrayItemStream:
+    """
+    Incrementally pull complete items out of a JSON array as text arrives.
+
+    Feed it chunks of a model's token stream; every time an element of the
+    top-level array is closed it is decoded and returned. Text before the
+    array (prose, code fences) is ignored, as is a wrapping object such as
+    {"questions": [...]}.
+    """
+
+    def __init__(self):
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escaped = False
+        self._root_depth = None
+        self._item: List[str] = []
+        self.done = False
+
+    def feed(self, chunk: str) -> List[Any]:
+        items = []
+        for char in chunk:
+            if self.done:
+                break
+            capturing = self._root_depth is not None and len(self._stack) > self._root_depth
+            if capturing:
+                self._item.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                if self._root_depth is None and char == "[" and len(self._stack) <= 1:
+                    self._root_depth = len(self._stack) + 1
+                elif self._root_depth is not None and len(self._stack) == self._root_depth:
+                    self._item = [char]
+                self._stack.append(char)
+            elif char in "]}":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if self._root_depth is None:
+                    continue
+                if len(self._stack) == self._root_depth:
+                    item = self._decode("".join(self._item))
+                    if item is not None:
+                        items.append(item)
+                    self._item = []
+                elif len(self._stack) < self._root_depth:
+                    self.done = True
+        return items
+
+    @staticmethod
+    def _decode(text: str) -> Any:
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return None
+
+
+class JSONFieldStream:
+    """
+    Incrementally pull the value of the top-level `"name": ...` member out of
+    a JSON object as text arrives. Every character is scanned once and the
+    value is decoded once, when it is complete, so a long stream is read in
+    linear time.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string: Optional[List[str]] = None  # top-level string being read
+        self._key: Optional[str] = None  # last top-level string, until a colon follows
+        self._value: Optional[List[str]] = None  # text of the value once it started
+        self._value_depth = 0
+        self.done = False
+
+    def feed(self, chunk: str) -> Any:
+        """The decoded value once it is complete (only once), None otherwise"""
+        for char in chunk:
+            if self.done:
+                break
+            if self._value is not None:
+                if self._feed_value(char):
+                    self.done = True
+                    return self._decode("".join(self._value))
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._string is not None:
+                        self._key, self._string = "".join(self._string), None
+                    continue
+                if self._string is not None:
+                    self._string.append(char)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string = [] if self._depth == 1 else None
+            elif char == ":" and self._depth == 1 and self._key == self.name:
+                self._value = []
+            elif char in "[{":
+                self._depth += 1
+            elif char in "]}":
+                self._depth -= 1
+            if not char.isspace() and char != '"':
+                self._key = None
+        return None
+
+    def _feed_value(self, char: str) -> bool:
+        """Add `char` to the value; True once the value is complete"""
+        if self._in_string:
+            self._value.append(char)
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+                return self._value_depth == 0
+            return False
+
+        if char in "[{":
+            self._value_depth += 1
+        elif char in "]}":
+            if self._value_depth == 0:
+                # Closes the enclosing object: the end of a number or literal
+                return True
+            self._value_depth -= 1
+            self._value.append(char)
+            return self._value_depth == 0
+        elif char == '"':
+            self._in_string = True
+        elif char == "," or char.isspace():
+            if self._value_depth == 0:
+                # Whitespace before the value is skipped; after a number or literal it ends it
+                return bool(self._value)
+        self._value.append(char)
+        return False
+
+    @staticmethod
+    def _decode(text: str) -> Any:
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return None
+
+
+class LLMJSONError(ValueError):
+    """Raised when no usable JSON can be recovered from model output"""
+
+
+_FENCE = re.compile(r"```[a-zA-Z]*\s*\n?")
+
+
+def _strip_code_fences(text: str) -> str:
+    """Return the body of the first fenced block (tolerating a missing closing fence)"""
+    match = _FENCE.search(text)
+    if not match:
+        return text
+    body = text[match.end():]
+    end = body.find("```")
+    return body if end == -1 else body[:end]
+
+
+def _close_truncated(text: str) -> Any:
+    """
+    Recover a truncated JSON document by cutting it back to the last complete
+    value and closing whatever brackets are still open.
+    """
+    stack: List[str] = []
+    in_string = False
+    escaped = False
+    cuts = []  # (cut position, open brackets at that point)
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+        if char == '"':
+            in_string = True
+        elif char in "[{":
+            stack.append(char)
+        elif char in "]}":
+            if not stack:
+                break
+            stack.pop()
+            cuts.append((i + 1, list(stack)))
+            if not stack:
+                break
+        elif char == ",":
+            cuts.append((i, list(stack)))
+
+    closers = {"[": "]", "{": "}"}
+    for position, open_brackets in reversed(cuts):
+        candidate = text[:position] + "".join(closers[b] for b in reversed(open_brackets))
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    raise LLMJSONError("Could not repair truncated JSON")
+
+
+def extract_json(text: str) -> Any:
+    """
+    Tolerantly extract a JSON object or array from LLM output.
+
+    Handles code fences, prose before the JSON, trailing garbage and
+    truncated output. For arrays, every complete and well-formed item is
+    salvaged even if other items are malformed.
+    """
+    if not text:
+        raise LLMJSONError("Empty LLM output")
+
+    body = _strip_code_fences(text).strip()
+    try:
+        return json.loads(body)
+    except json.JSONDecodeError:
+        pass
+
+    starts = [i for i in (body.find("["), body.find("{")) if i != -1]
+    if not starts:
+        raise LLMJSONError("No JSON found in LLM output")
+    start = min(starts)
+    body = body[start:]
+
+    # Valid JSON followed by trailing text
+    try:
+        value, _ = json.JSONDecoder().raw_decode(body)
+        return value
+    except json.JSONDecodeError:
+        pass
+
+    # Array (possibly wrapped): keep every complete item
+    if body.startswith("[") or re.match(r'\{\s*"[^"]*"\s*:\s*\[', body):
+        items = JSONArrayItemStream().feed(body)
+        if items:
+            return items
+
+    return _close_truncated(body)
@@ -0,0 +1,261 @@
+# app/services/llm_metrics.py
+import asyncio
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from groq import APIConnectionError, APIStatusError, APITimeoutError
+from app.core.config import settings
+from app.services.cache import LRUCache
+
+LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60]
+TOKEN_BUCKETS = [100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000]
+
+# What the current LLM calls are for, who they are for, and where to tally them
+_operation: ContextVar[str] = ContextVar("llm_operation", default="other")
+_user: ContextVar[Optional[str]] = ContextVar("llm_user", default=None)
+_usage: ContextVar[Optional["LLMUsage"]] = ContextVar("llm_usage", default=None)
+
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus-style upper bounds plus +Inf)"""
+
+    def __init__(self, bounds: List[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None for +Inf or no data)"""
+        n = sum(self.counts)
+        if not n:
+            return None
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= q * n:
+                return self.bounds[i] if i < len(self.bounds) else None
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "buckets": {
+                **{str(b): c for b, c in zip(self.bounds, self.counts)},
+                "+Inf": self.counts[-1],
+            },
+            "sum": round(self.total, 3),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+
+class _Series:
+    def __init__(self):
+        self.calls = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.tokens = Histogram(TOKEN_BUCKETS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "latency_seconds": self.latency.to_dict(),
+            "total_tokens": self.tokens.to_dict(),
+        }
+
+
+class LLMUsage:
+    """Running totals of the LLM calls made for one mock session"""
+
+    def __init__(self, initial: Optional[Dict[str, Any]] = None):
+        self.data: Dict[str, Any] = {
+            "calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "cost_usd": 0.0, "latency_seconds": 0.0, "by_operation": {},
+        }
+        if initial:
+            self.merge(initial)
+
+    def _add(self, target: Dict[str, Any], values: Dict[str, Any]) -> None:
+        for field in ("calls", "prompt_tokens", "completion_tokens", "cost_usd", "latency_seconds"):
+            target[field] = round(target.get(field, 0) + values.get(field, 0), 6)
+
+    def add(self, operation: str, latency: float, prompt_tokens: int, completion_tokens: int, cost: float) -> None:
+        values = {
+            "calls": 1, "prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "cost_usd": cost, "latency_seconds": latency,
+        }
+        self._add(self.data, values)
+        self._add(self.data["by_operation"].setdefault(operation, {}), values)
+
+    def merge(self, other: Dict[str, Any]) -> None:
+        self._add(self.data, other)
+        for operation, values in (other.get("by_operation") or {}).items():
+            self._add(self.data["by_operation"].setdefault(operation, {}), values)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self.data, "by_operation": {k: dict(v) for k, v in self.data["by_operation"].items()}}
+
+    def combined(self, existing: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """`existing` stored totals plus these calls, as a new dict (for JSONB columns)"""
+        total = LLMUsage(existing)
+        total.merge(self.data)
+        return total.to_dict()
+
+
+def current_operation() -> str:
+    """Label of the LLM calls being made in this context"""
+    return _operation.get()
+
+
+@contextmanager
+def llm_operation(name: str) -> Iterator[None]:
+    """Label the LLM calls made inside the block (e.g. "parse_resume")"""
+    token = _operation.set(name)
+    try:
+        yield
+    finally:
+        _operation.reset(token)
+
+
+@contextmanager
+def track_llm_usage(
+    usage: Optional[LLMUsage] = None, user_id: Any = None
+) -> Iterator[LLMUsage]:
+    """Tally the LLM calls made inside the block into `usage` (new if omitted), per user"""
+    usage = usage or LLMUsage()
+    usage_token = _usage.set(usage)
+    user_token = _user.set(str(user_id) if user_id is not None else _user.get())
+    try:
+        yield usage
+    finally:
+        _user.reset(user_token)
+        _usage.reset(usage_token)
+
+
+def classify_outcome(exc: Optional[BaseException]) -> str:
+    if exc is None:
+        return "ok"
+    if isinstance(exc, (asyncio.CancelledError, GeneratorExit)):
+        return "cancelled"
+    if isinstance(exc, (asyncio.TimeoutError, APITimeoutError)):
+        return "timeout"
+    if isinstance(exc, APIConnectionError):
+        return "connection_error"
+    if isinstance(exc, APIStatusError):
+        return "rate_limited" if exc.status_code == 429 else f"http_{exc.status_code // 100}xx"
+    return type(exc).__name__
+
+
+def retries_from_error(exc: Optional[BaseException]) -> int:
+    """Retries the SDK made before giving up, from the last request it sent"""
+    response = getattr(exc, "response", None)
+    request = getattr(response, "request", None) if response is not None else None
+    try:
+        return int(request.headers.get("x-stainless-retry-count", 0)) if request is not None else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+class LLMMetrics:
+    """
+    Per-call LLM instrumentation aggregated by (operation, model, outcome):
+    call and retry counts, latency and token histograms, token totals and
+    cost (from `llm_pricing`). Also keeps totals per user and adds every
+    call to the active `LLMUsage` so it can be stored on the session.
+    """
+
+    def __init__(self):
+        self._series: Dict[Tuple[str, str, str], _Series] = {}
+        self._users = LRUCache(maxsize=settings.llm_metrics_max_users)
+
+    @staticmethod
+    def cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        prices = settings.llm_pricing.get(model)
+        if not prices:
+            return 0.0
+        return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+    def record(
+        self,
+        model: str,
+        latency: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        retries: int = 0,
+        outcome: str = "ok",
+    ) -> None:
+        operation = _operation.get()
+        cost = self.cost(model, prompt_tokens, completion_tokens)
+
+        key = (operation, model, outcome)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series()
+        series.calls += 1
+        series.retries += retries
+        series.prompt_tokens += prompt_tokens
+        series.completion_tokens += completion_tokens
+        series.cost_usd += cost
+        series.latency.observe(latency)
+        if outcome == "ok":
+            series.tokens.observe(prompt_tokens + completion_tokens)
+
+        user = _user.get()
+        if user is not None:
+            totals = self._users.get(user) or {"calls": 0, "tokens": 0, "cost_usd": 0.0}
+            totals["calls"] += 1
+            totals["tokens"] += prompt_tokens + completion_tokens
+            totals["cost_usd"] = round(totals["cost_usd"] + cost, 6)
+            self._users.set(user, totals)
+
+        usage = _usage.get()
+        if usage is not None:
+            usage.add(operation, latency, prompt_tokens, completion_tokens, cost)
+
+    def credit(self, usage: LLMUsage) -> None:
+        """
+        Charge calls tallied in another context (a call shared by coalesced
+        requests) to this context's user and `LLMUsage` as well. The series
+        are not touched: the calls were recorded there once already.
+        """
+        data = usage.data
+        if not data["calls"]:
+            return
+        user = _user.get()
+        if user is not None:
+            totals = self._users.get(user) or {"calls": 0, "tokens": 0, "cost_usd": 0.0}
+            totals["calls"] += data["calls"]
+            totals["tokens"] += data["prompt_tokens"] + data["completion_tokens"]
+            totals["cost_usd"] = round(totals["cost_usd"] + data["cost_usd"], 6)
+            self._users.set(user, totals)
+
+        current = _usage.get()
+        if current is not None:
+            current.merge(data)
+
+    def user_stats(self, user_id: Any) -> Optional[Dict[str, Any]]:
+        return self._users.get(str(user_id))
+
+    def stats(self) -> Dict[str, Any]:
+        by_operation: Dict[str, Dict[str, Any]] = {}
+        for (operation, model, outcome), series in sorted(self._series.items()):
+            by_operation.setdefault(operation, {}).setdefault(model, {})[outcome] = series.to_dict()
+        return {
+            "calls": sum(s.calls for s in self._series.values()),
+            "cost_usd": round(sum(s.cost_usd for s in self._series.values()), 6),
+            "by_operation": by_operation,
+        }
+
+
+llm_metrics = LLMMetrics()
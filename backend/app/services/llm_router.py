@@ -0,0 +1,334 @@
+# app/services/llm_router.py
+import asyncio
+import itertools
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+from groq import AsyncGroq
+from app.core.config import LLMBackend, settings
+from app.services.llm_client import chat_completion, get_llm_client, stream_chat_completion
+from app.services.llm_guard import (
+    CircuitBreaker,
+    LLMDeadlineExceeded,
+    LLMUnavailableError,
+    call_timeout,
+    is_outage,
+)
+from app.services.llm_scheduler import LLMPriority
+from app.services.llm_singleflight import llm_single_flight, request_key
+
+GRADING = "grading"
+GENERATION = "generation"
+
+
+class RoutedBackend:
+    """A configured backend plus its rolling latency / error statistics"""
+
+    def __init__(self, config: LLMBackend):
+        self.config = config
+        self.latencies: Deque[float] = deque(maxlen=settings.llm_latency_window)
+        self.outcomes: Deque[bool] = deque(maxlen=settings.llm_latency_window)
+        self.breaker = CircuitBreaker(
+            settings.llm_breaker_failures, settings.llm_breaker_cooldown
+        )
+        self.in_flight = 0
+        self.calls = 0
+        self.errors = 0
+
+    @property
+    def name(self) -> str:
+        return self.config.name
+
+    @property
+    def client(self) -> AsyncGroq:
+        return get_llm_client(self.config.api_key, self.config.base_url)
+
+    def p95(self) -> Optional[float]:
+        if not self.latencies:
+            return None
+        values = sorted(self.latencies)
+        return values[min(len(values) - 1, int(len(values) * 0.95))]
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def score(self) -> float:
+        """Lower is better: tail latency, inflated by load and recent errors"""
+        p95 = self.p95()
+        if p95 is None:
+            # Untried backends go first; ones that have only failed are assumed slow
+            p95 = settings.llm_hedge_after if self.outcomes else 0.0
+        return p95 * (1 + self.in_flight) * (1 + 4 * self.error_rate())
+
+    def record(self, latency: float, ok: bool) -> None:
+        self.calls += 1
+        self.outcomes.append(ok)
+        if ok:
+            self.latencies.append(latency)
+            self.breaker.record_success()
+        else:
+            self.errors += 1
+            self.breaker.record_failure()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model": self.config.model,
+            "pools": self.config.pools,
+            "calls": self.calls,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "p95_seconds": self.p95(),
+            "error_rate": round(self.error_rate(), 3),
+            "circuit": self.breaker.stats(),
+        }
+
+
+class LLMRouter:
+    """
+    Routes LLM calls for a pool ("grading" or "generation") across the
+    configured (model, key) backends: picks the backend with the best rolling
+    p95 latency / error rate, spreads load across equivalent keys, fails over
+    on errors and can hedge a slow call to a second backend.
+    """
+
+    def __init__(self):
+        self._backends: Optional[List[RoutedBackend]] = None
+        self._rotation = itertools.count()
+        self.hedges = 0
+        self.hedges_won = 0
+        self.failovers = 0
+
+    def _all(self) -> List[RoutedBackend]:
+        if self._backends is None:
+            configs = settings.llm_backends or [
+                LLMBackend(name="grading-default", model=settings.llm_grading_model, pools=[GRADING]),
+                LLMBackend(name="generation-default", model=settings.llm_generation_model, pools=[GENERATION]),
+            ]
+            self._backends = [RoutedBackend(config) for config in configs]
+        return self._backends
+
+    def backends(self, pool: str) -> List[RoutedBackend]:
+        backends = [b for b in self._all() if pool in b.config.pools]
+        if not backends:
+            raise ValueError(f"No LLM backend configured for pool '{pool}'")
+        return backends
+
+    def models(self, pool: str) -> str:
+        """Stable description of the models a pool can use (for cache keys)"""
+        return ",".join(sorted({b.config.model for b in self.backends(pool)}))
+
+    def rank(self, pool: str) -> List[RoutedBackend]:
+        """
+        Backends of a pool whose circuit is not open, best first; ties rotate
+        so equal keys share the load. Raises LLMUnavailableError right away
+        when every circuit is open.
+        """
+        backends = self.backends(pool)
+        offset = next(self._rotation) % len(backends)
+        rotated = [b for b in backends[offset:] + backends[:offset] if b.breaker.allow()]
+        if not rotated:
+            raise LLMUnavailableError(
+                f"The {pool} LLM service is temporarily unavailable",
+                retry_after=min(b.breaker.retry_after() for b in backends),
+            )
+        return sorted(rotated, key=lambda b: b.score())
+
+    async def _call(self, backend: RoutedBackend, **kwargs: Any) -> str:
+        timeout = call_timeout()
+        backend.in_flight += 1
+        start = time.perf_counter()
+        # None: the attempt says nothing about the backend and is not recorded
+        ok: Optional[bool] = None
+        try:
+            result = await asyncio.wait_for(
+                chat_completion(
+                    model=backend.config.model,
+                    client=backend.client,
+                    limit_key=backend.name,
+                    **kwargs,
+                ),
+                timeout,
+            )
+            ok = True
+            return result
+        except asyncio.CancelledError:
+            # Lost a hedge race or the client left: no answer, so neither a
+            # success for the breaker nor a latency sample
+            raise
+        except asyncio.TimeoutError:
+            if timeout < settings.llm_call_timeout:
+                # The request's budget ran out, not the backend's patience
+                raise LLMDeadlineExceeded("The request ran out of time waiting for the LLM")
+            ok = False
+            raise
+        except Exception as e:
+            # Only failures that reflect the backend's health count against it
+            ok = not is_outage(e)
+            raise
+        finally:
+            backend.in_flight -= 1
+            if ok is not None:
+                backend.record(time.perf_counter() - start, ok)
+
+    def _hedge_delay(self, backend: RoutedBackend) -> float:
+        p95 = backend.p95()
+        if p95 is None or len(backend.latencies) < 10:
+            return settings.llm_hedge_after
+        return min(settings.llm_hedge_after, p95)
+
+    async def complete(
+        self,
+        pool: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_tokens: int,
+        priority: LLMPriority = LLMPriority.INTERACTIVE,
+        hedge: bool = False,
+    ) -> str:
+        """
+        Run a chat completion on the best backend of `pool`. On error the next
+        backend is tried; with `hedge`, a call still running after the hedge
+        delay is raced against a second backend and the first answer wins.
+        Every attempt is bounded by the request deadline; if all attempts fail
+        on outages, LLMUnavailableError is raised.
+
+        Identical requests already in flight in this worker (same pool,
+        parameters and normalized messages) share that call's result.
+        """
+        if not settings.llm_coalesce_requests:
+            return await self._complete(pool, messages, temperature, max_tokens, priority, hedge)
+        key = request_key(pool, messages, temperature=temperature, max_tokens=max_tokens)
+        return await llm_single_flight.do(
+            key, lambda: self._complete(pool, messages, temperature, max_tokens, priority, hedge)
+        )
+
+    async def _complete(
+        self,
+        pool: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_tokens: int,
+        priority: LLMPriority,
+        hedge: bool,
+    ) -> str:
+        candidates = self.rank(pool)[:max(1, settings.llm_max_attempts)]
+        kwargs = dict(
+            messages=messages, temperature=temperature, max_tokens=max_tokens, priority=priority
+        )
+
+        def launch(index: int) -> asyncio.Task:
+            task = asyncio.create_task(self._call(candidates[index], **kwargs))
+            task.backend_index = index
+            return task
+
+        pending = {launch(0)}
+        launched = 1
+        hedged = False
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                can_hedge = hedge and not hedged and launched < len(candidates)
+                timeout = self._hedge_delay(candidates[0]) if can_hedge else None
+                done, pending = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # Primary is slow: race it against the next backend
+                    self.hedges += 1
+                    hedged = True
+                    pending.add(launch(launched))
+                    launched += 1
+                    continue
+
+                for task in done:
+                    if task.exception() is None:
+                        if task.backend_index > 0 and hedged:
+                            self.hedges_won += 1
+                        return task.result()
+                    last_error = task.exception()
+
+                if not pending and launched < len(candidates):
+                    self.failovers += 1
+                    pending.add(launch(launched))
+                    launched += 1
+            if isinstance(last_error, LLMUnavailableError) or not is_outage(last_error):
+                raise last_error
+            raise LLMUnavailableError(
+                f"The {pool} LLM service is temporarily unavailable"
+            ) from last_error
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def stream(
+        self,
+        pool: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_tokens: int,
+        priority: LLMPriority = LLMPriority.INTERACTIVE,
+    ) -> AsyncIterator[str]:
+        """
+        Streaming completion on the best backend. The first token must arrive
+        within the call timeout; failover happens only before it.
+        """
+        candidates = self.rank(pool)[:max(1, settings.llm_max_attempts)]
+        for index, backend in enumerate(candidates):
+            deltas = stream_chat_completion(
+                model=backend.config.model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                priority=priority,
+                client=backend.client,
+                limit_key=backend.name,
+            )
+            timeout = call_timeout()
+            backend.in_flight += 1
+            start = time.perf_counter()
+            try:
+                try:
+                    first = await asyncio.wait_for(deltas.__anext__(), timeout)
+                except StopAsyncIteration:
+                    first = None
+                except Exception as e:
+                    if isinstance(e, asyncio.TimeoutError) and timeout < settings.llm_call_timeout:
+                        raise LLMDeadlineExceeded(
+                            "The request ran out of time waiting for the LLM"
+                        ) from e
+                    backend.record(time.perf_counter() - start, not is_outage(e))
+                    if index == len(candidates) - 1:
+                        if is_outage(e) and not isinstance(e, LLMUnavailableError):
+                            raise LLMUnavailableError(
+                                f"The {pool} LLM service is temporarily unavailable"
+                            ) from e
+                        raise
+                    self.failovers += 1
+                    continue
+
+                # Time to first token is what matters for routing streams
+                backend.record(time.perf_counter() - start, True)
+                if first is None:
+                    return
+                yield first
+                async for delta in deltas:
+                    yield delta
+                return
+            finally:
+                backend.in_flight -= 1
+                await deltas.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hedges": self.hedges,
+            "hedges_won": self.hedges_won,
+            "failovers": self.failovers,
+            "backends": {b.name: b.stats() for b in self._all()},
+        }
+
+
+llm_router = LLMRouter()
@@ -0,0 +1,253 @@
+# app/services/llm_scheduler.py
+import asyncio
+import heapq
+import itertools
+import re
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, AsyncIterator, Deque, Dict, List, Mapping, Optional, Tuple
+from app.core.config import settings
+
+
+class LLMPriority(IntEnum):
+    """Lower value is served first"""
+    INTERACTIVE = 0  # a user is waiting on the result (QA grading)
+    BACKGROUND = 1  # parsing, question generation, batch grading
+
+
+class LLMQueueFullError(Exception):
+    """Raised when too many LLM calls are already waiting for a model"""
+
+    def __init__(self, model: str, retry_after: float = 1.0):
+        super().__init__(f"Too many pending LLM requests for {model}")
+        self.model = model
+        self.retry_after = retry_after
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """Parse provider reset values such as '7.66s', '2m59.56s' or '120ms' into seconds"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+class TokenBucket:
+    """Classic token bucket; may go negative when actual usage exceeds the reservation"""
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)"""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        if self.refill_per_second <= 0:
+            return 1.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def take(self, amount: float) -> None:
+        self._refill(time.monotonic())
+        self.tokens -= amount
+
+    def sync(self, limit: Optional[float], remaining: Optional[float], reset: Optional[float]) -> None:
+        """Adopt the provider's view of this limit from rate-limit headers"""
+        self._refill(time.monotonic())
+        if limit:
+            self.capacity = limit
+        if remaining is not None:
+            self.tokens = min(self.tokens, remaining)
+        if reset and remaining is not None and self.capacity > remaining:
+            # The provider refills to capacity by the reset time
+            self.refill_per_second = (self.capacity - remaining) / reset
+
+    def block_for(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class _ModelQueue:
+    def __init__(self, model: str):
+        self.model = model
+        self.requests = TokenBucket(
+            settings.llm_requests_per_minute, settings.llm_requests_per_minute / 60
+        )
+        self.tokens = TokenBucket(
+            settings.llm_tokens_per_minute, settings.llm_tokens_per_minute / 60
+        )
+        self.waiters: List[Tuple[int, int, float, asyncio.Future]] = []
+        self.in_flight = 0
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class LLMScheduler:
+    """
+    Central admission control for LLM calls.
+
+    Each model gets request and token buckets (seeded from Settings and then
+    kept in sync with the provider's x-ratelimit-* headers), a concurrency
+    cap and a bounded priority queue, so interactive grading is served ahead
+    of background parsing/generation and bursts wait locally instead of
+    tripping provider 429s.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, _ModelQueue] = {}
+        self._sequence = itertools.count()
+        self._queue_times: Dict[LLMPriority, Deque[float]] = {
+            p: deque(maxlen=1000) for p in LLMPriority
+        }
+        self._served: Dict[LLMPriority, int] = {p: 0 for p in LLMPriority}
+        self._rejected = 0
+        self._rate_limited = 0
+
+    def _queue(self, model: str) -> _ModelQueue:
+        if model not in self._models:
+            self._models[model] = _ModelQueue(model)
+        return self._models[model]
+
+    @asynccontextmanager
+    async def slot(
+        self, model: str, priority: LLMPriority, estimated_tokens: int
+    ) -> AsyncIterator[None]:
+        """Wait for admission to call `model`, then hold a concurrency slot"""
+        queue = self._queue(model)
+        if len(queue.waiters) >= settings.llm_max_queue:
+            self._rejected += 1
+            raise LLMQueueFullError(model)
+
+        future = asyncio.get_running_loop().create_future()
+        enqueued = time.monotonic()
+        heapq.heappush(
+            queue.waiters, (int(priority), next(self._sequence), estimated_tokens, future)
+        )
+        self._dispatch(queue)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as we were cancelled: give the slot back
+                queue.in_flight -= 1
+                self._dispatch(queue)
+            else:
+                queue.waiters = [w for w in queue.waiters if w[3] is not future]
+                heapq.heapify(queue.waiters)
+            raise
+
+        self._queue_times[priority].append(time.monotonic() - enqueued)
+        self._served[priority] += 1
+        try:
+            yield
+        finally:
+            queue.in_flight -= 1
+            self._dispatch(queue)
+
+    def _dispatch(self, queue: _ModelQueue) -> None:
+        while queue.waiters and queue.in_flight < settings.llm_max_concurrency:
+            _, _, estimated_tokens, future = queue.waiters[0]
+            if future.done():
+                heapq.heappop(queue.waiters)
+                continue
+            wait = max(queue.requests.wait_time(1), queue.tokens.wait_time(estimated_tokens))
+            if wait > 0:
+                if queue.timer is None:
+                    loop = asyncio.get_running_loop()
+                    queue.timer = loop.call_later(wait, self._on_timer, queue)
+                return
+            heapq.heappop(queue.waiters)
+            queue.requests.take(1)
+            queue.tokens.take(estimated_tokens)
+            queue.in_flight += 1
+            future.set_result(None)
+
+    def _on_timer(self, queue: _ModelQueue) -> None:
+        queue.timer = None
+        self._dispatch(queue)
+
+    def record_usage(self, model: str, reserved_tokens: int, used_tokens: Optional[int]) -> None:
+        """Charge the difference between the reserved estimate and actual usage"""
+        if used_tokens is not None:
+            self._queue(model).tokens.take(used_tokens - reserved_tokens)
+
+    def observe_headers(self, model: str, headers: Mapping[str, str], status_code: int = 200) -> None:
+        """Sync buckets with x-ratelimit-* headers; back off on 429"""
+        queue = self._queue(model)
+
+        def number(name: str) -> Optional[float]:
+            try:
+                return float(headers.get(name))
+            except (TypeError, ValueError):
+                return None
+
+        queue.requests.sync(
+            number("x-ratelimit-limit-requests"),
+            number("x-ratelimit-remaining-requests"),
+            parse_reset_duration(headers.get("x-ratelimit-reset-requests")),
+        )
+        queue.tokens.sync(
+            number("x-ratelimit-limit-tokens"),
+            number("x-ratelimit-remaining-tokens"),
+            parse_reset_duration(headers.get("x-ratelimit-reset-tokens")),
+        )
+        if status_code == 429:
+            self._rate_limited += 1
+            retry_after = parse_reset_duration(headers.get("retry-after")) or 1.0
+            queue.requests.block_for(retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        def percentile(values: List[float], q: float) -> float:
+            if not values:
+                return 0.0
+            values = sorted(values)
+            return values[min(len(values) - 1, int(len(values) * q))]
+
+        return {
+            "rejected": self._rejected,
+            "rate_limited": self._rate_limited,
+            "queue_time_seconds": {
+                p.name.lower(): {
+                    "served": self._served[p],
+                    "p50": percentile(list(self._queue_times[p]), 0.5),
+                    "p95": percentile(list(self._queue_times[p]), 0.95),
+                    "max": max(self._queue_times[p], default=0.0),
+                }
+                for p in LLMPriority
+            },
+            "models": {
+                model: {
+                    "waiting": len(q.waiters),
+                    "in_flight": q.in_flight,
+                    "request_tokens": round(q.requests.tokens, 1),
+                    "token_budget": round(q.tokens.tokens, 1),
+                }
+                for model, q in self._models.items()
+            },
+        }
+
+
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,113 @@
+# app/services/llm_singleflight.py
+import asyncio
+import contextvars
+import hashlib
+import json
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, TypeVar
+from app.services.llm_guard import LLMDeadlineExceeded, time_remaining
+from app.services.llm_metrics import (
+    LLMUsage,
+    current_operation,
+    llm_metrics,
+    llm_operation,
+    track_llm_usage,
+)
+
+T = TypeVar("T")
+
+
+def request_key(pool: str, messages: List[Dict[str, Any]], **params: Any) -> str:
+    """Key of an LLM request: its pool, parameters and whitespace-normalized messages"""
+    normalized = [
+        {**message, "content": " ".join(str(message.get("content") or "").split())}
+        for message in messages
+    ]
+    payload = json.dumps([pool, normalized, params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self, work: Callable[[], Awaitable[Any]]):
+        self.usage = LLMUsage()
+        self.waiters = 0
+        # A fresh context: no caller's deadline, user or usage applies to the
+        # shared call; only the operation label is carried over
+        self.task = asyncio.create_task(
+            self._run(work, current_operation()), context=contextvars.Context()
+        )
+
+    async def _run(self, work: Callable[[], Awaitable[Any]], operation: str) -> Any:
+        with llm_operation(operation), track_llm_usage(self.usage):
+            return await work()
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent requests in this worker: the first caller
+    for a key starts the work as a task, and callers arriving while it is in
+    flight await the same task instead of starting their own.
+
+    The shared task runs outside every caller's request context. Each caller
+    waits on it only until its own deadline, and is charged the usage of the
+    shared calls once they finish. The task is only cancelled when every
+    caller waiting on it has left (cancelled or out of time), so one client
+    disconnecting does not fail the others.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.coalesced: Counter = Counter()
+
+    async def do(self, key: str, work: Callable[[], Awaitable[T]]) -> T:
+        remaining = time_remaining()
+        if remaining is not None and remaining <= 0:
+            raise LLMDeadlineExceeded("The request ran out of time waiting for the LLM")
+
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(work)
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.leaders += 1
+        else:
+            self.coalesced[current_operation()] += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(flight.task), remaining)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        except asyncio.TimeoutError:
+            if flight.task.done():
+                # The shared call's own error
+                raise
+            # This caller's deadline, not the call's
+            if flight.waiters == 1:
+                flight.task.cancel()
+            raise LLMDeadlineExceeded("The request ran out of time waiting for the LLM")
+        finally:
+            flight.waiters -= 1
+            if flight.task.done():
+                llm_metrics.credit(flight.usage)
+
+    def _forget(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        coalesced = sum(self.coalesced.values())
+        total = self.leaders + coalesced
+        return {
+            "calls": self.leaders,
+            "coalesced": coalesced,
+            "coalesced_rate": coalesced / total if total else 0.0,
+            "coalesced_by_operation": dict(self.coalesced),
+            "in_flight": len(self._flights),
+        }
+
+
+llm_single_flight = SingleFlight()
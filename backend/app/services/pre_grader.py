@@ -0,0 +1,194 @@
+# app/services/pre_grader.py
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.services.llm_grader import RUBRIC_STOPWORDS
+
+# Similarity / coverage thresholds for grading without the LLM. Anything
+# between them is ambiguous and escalated.
+VERBATIM_SIMILARITY = 0.85
+VERBATIM_COVERAGE = 0.6
+ECHO_SIMILARITY = 0.8
+ECHO_MAX_REFERENCE_SIMILARITY = 0.3
+OFF_TOPIC_SIMILARITY = 0.1
+SHORT_ANSWER_TERMS = 3
+
+NON_ANSWERS = {
+    "", "idk", "i dont know", "i don't know", "i do not know", "dont know",
+    "don't know", "no idea", "not sure", "pass", "skip", "na", "n/a", "none",
+    "nothing", "?", "...", "-", "test", "asdf",
+}
+
+_TOKEN = re.compile(r"[a-z][a-z0-9+#\-]*")
+
+
+def _terms(text: str) -> List[str]:
+    terms = []
+    for word in _TOKEN.findall(text.lower()):
+        word = word.rstrip("-")
+        if len(word) < 2 or word in RUBRIC_STOPWORDS:
+            continue
+        # Cheap plural folding so "indexes"/"index" and "caches"/"cache" match
+        if len(word) > 4 and word.endswith("es") and word[-3] in "sxz":
+            word = word[:-2]
+        elif len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "is", "us")):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+class PreGrader:
+    """
+    Local, LLM-free grading for trivial QA answers: empty or non-answers,
+    short off-topic replies, echoes of the question and near-verbatim copies
+    of the reference answer. Answers are compared with TF-IDF vectors (IDF
+    over the sentences of the question's reference material) plus coverage of
+    the rubric's expected concepts; anything not clearly trivial returns None
+    and goes to `LLMGrader`.
+    """
+
+    counts: Counter = Counter()
+
+    @staticmethod
+    def _vectors(
+        documents: List[List[str]], targets: List[List[str]]
+    ) -> np.ndarray:
+        """TF-IDF rows for `targets`, with IDF fitted on `documents`"""
+        vocabulary = {
+            term: i
+            for i, term in enumerate(dict.fromkeys(t for doc in documents + targets for t in doc))
+        }
+        size = len(vocabulary)
+        df = np.zeros(size)
+        for doc in documents:
+            df[[vocabulary[t] for t in set(doc)]] += 1
+        idf = np.log((1 + len(documents)) / (1 + df)) + 1
+        tf = np.stack([
+            np.bincount([vocabulary[t] for t in doc], minlength=size).astype(float)
+            for doc in targets
+        ])
+        return tf * idf
+
+    @staticmethod
+    def _cosine(a: np.ndarray, b: np.ndarray) -> float:
+        norm = np.linalg.norm(a) * np.linalg.norm(b)
+        return float(a @ b / norm) if norm else 0.0
+
+    @staticmethod
+    def features(question: Dict[str, Any], user_answer: str) -> Dict[str, float]:
+        """Similarity of the answer to the reference answer and question, and concept coverage"""
+        reference = str(question.get("answer") or "")
+        explanation = str(question.get("explanation") or "")
+        question_text = str(question.get("question") or "")
+
+        answer_terms = _terms(user_answer)
+        reference_terms = _terms(reference)
+        question_terms = _terms(question_text)
+        sentences = [
+            _terms(s) for s in re.split(r"(?<=[.;!?])\s+|\n+", f"{reference}\n{explanation}")
+        ]
+        documents = [s for s in sentences if s] + [question_terms]
+
+        answer_vec, reference_vec, question_vec = PreGrader._vectors(
+            documents, [answer_terms, reference_terms, question_terms]
+        )
+
+        rubric = question.get("rubric") or {}
+        concepts = {
+            term for concept in rubric.get("expected_concepts", []) for term in _terms(concept)
+        } or set(reference_terms)
+        answer_set = set(answer_terms)
+        coverage = len(concepts & answer_set) / len(concepts) if concepts else 0.0
+
+        return {
+            "terms": len(answer_terms),
+            "reference_similarity": PreGrader._cosine(answer_vec, reference_vec),
+            "question_similarity": PreGrader._cosine(answer_vec, question_vec),
+            "coverage": coverage,
+        }
+
+    @staticmethod
+    def grade(question: Dict[str, Any], user_answer: str) -> Optional[Dict[str, Any]]:
+        """
+        Grade `user_answer` locally when the case is clear-cut.
+
+        Returns:
+            A grade dict with the same fields as `LLMGrader.grade_qa_answer`,
+            or None when the answer needs the LLM
+        """
+        decision, result = PreGrader.decide(question, user_answer)
+        PreGrader.counts[decision] += 1
+        return result
+
+    @staticmethod
+    def decide(question: Dict[str, Any], user_answer: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """The pre-grading decision ("escalated" or the reason it was graded) and the grade"""
+        normalized = " ".join(user_answer.lower().split()).strip(" .!")
+        if normalized in NON_ANSWERS or not _terms(user_answer):
+            return "non_answer", PreGrader._result(
+                0, "poor",
+                "You didn't give an answer to this question.",
+                ["Even a partial answer that explains your reasoning earns credit"],
+            )
+
+        # Without a reference answer there is nothing to measure against
+        if not _terms(str(question.get("answer") or "")):
+            return "escalated", None
+
+        f = PreGrader.features(question, user_answer)
+
+        if f["reference_similarity"] >= VERBATIM_SIMILARITY and f["coverage"] >= VERBATIM_COVERAGE:
+            return "verbatim", PreGrader._result(
+                90, "excellent",
+                "Your answer covers all the key points of the expected answer.",
+                ["Add a concrete example from your own experience to stand out"],
+                strengths=["Covers every key point", "Accurate terminology"],
+            )
+
+        if (
+            f["question_similarity"] >= ECHO_SIMILARITY
+            and f["reference_similarity"] < ECHO_MAX_REFERENCE_SIMILARITY
+        ):
+            return "echo", PreGrader._result(
+                5, "poor",
+                "Your answer restates the question without answering it.",
+                ["Explain the concept the question asks about in your own words"],
+            )
+
+        if (
+            f["terms"] <= SHORT_ANSWER_TERMS
+            and f["reference_similarity"] < OFF_TOPIC_SIMILARITY
+            and f["coverage"] == 0
+        ):
+            return "off_topic", PreGrader._result(
+                5, "poor",
+                "Your answer is too short and doesn't address the question.",
+                ["Give a complete answer that covers the main concepts involved"],
+            )
+
+        return "escalated", None
+
+    @staticmethod
+    def _result(
+        score: int,
+        level: str,
+        feedback: str,
+        improvements: List[str],
+        strengths: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        return {
+            "score": score,
+            "correctness_level": level,
+            "feedback": feedback,
+            "strengths": strengths or [],
+            "improvements": improvements,
+        }
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        total = sum(PreGrader.counts.values())
+        return {
+            "decisions": dict(PreGrader.counts),
+            "escalation_rate": PreGrader.counts["escalated"] / total if total else 0.0,
+        }
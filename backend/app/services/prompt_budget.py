@@ -0,0 +1,160 @@
+# app/services/prompt_budget.py
+import json
+import math
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+# Parsed sections in the order they are given up when a prompt is over budget
+# (last first). Sections not listed go before all of these.
+SECTION_PRIORITY = [
+    "skills", "title", "summary", "experience", "projects", "responsibilities",
+    "requirements", "qualifications", "technologies", "certifications",
+    "education", "company_info",
+]
+# Never useful for writing questions; the raw text duplicates everything else
+DROPPED_FIELDS = {"raw_text", "contact_info"}
+# Always kept when projecting onto focus areas
+CORE_SECTIONS = {"skills", "title", "summary"}
+
+# GPT-style pre-tokenization: contractions, words, 1-3 digit runs, punctuation, whitespace
+_PIECES = re.compile(r"'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+(?!\S)|\s+")
+_WORD = re.compile(r"[a-z0-9+#]{3,}")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """tiktoken's o200k encoding when it is installed and its files are available"""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Token count of `text`. Uses tiktoken when available, otherwise a local
+    estimate from BPE-style pre-tokenization (long words and whitespace runs
+    count as several tokens), which lands within ~10% for English prompts.
+    """
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    tokens = 0
+    for piece in _PIECES.findall(text):
+        stripped = piece.strip()
+        if not stripped:
+            tokens += math.ceil(len(piece) / 4)
+        else:
+            tokens += math.ceil(len(stripped) / 8)
+    return tokens
+
+
+def minify_instructions(text: str) -> str:
+    """Strip indentation and blank lines from a prompt template"""
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def _prune(value: Any) -> Any:
+    """Drop empty values (None, "", [], {}) recursively"""
+    if isinstance(value, dict):
+        pruned = {k: _prune(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        pruned = [_prune(v) for v in value]
+        return [v for v in pruned if v not in (None, "", [], {})]
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def _project(parsed: Dict[str, Any], focus_areas: List[str]) -> Dict[str, Any]:
+    """
+    Keep the core sections plus the items of other sections that mention a
+    focus area. Returns `parsed` unchanged when nothing mentions one (e.g. a
+    focus area like "behavioral").
+    """
+    terms = {word for area in focus_areas for word in _WORD.findall(area.lower())}
+    if not terms:
+        return parsed
+
+    def mentions(value: Any) -> bool:
+        return bool(terms & set(_WORD.findall(json.dumps(value).lower())))
+
+    projected = {}
+    matched = False
+    for key, value in parsed.items():
+        if key in CORE_SECTIONS:
+            projected[key] = value
+        elif isinstance(value, list):
+            items = [item for item in value if mentions(item)]
+            if items:
+                projected[key] = items
+                matched = True
+        elif mentions(value):
+            projected[key] = value
+            matched = True
+    return projected if matched else parsed
+
+
+def _dump(parsed: Dict[str, Any]) -> str:
+    return json.dumps(parsed, ensure_ascii=False, separators=(",", ":"))
+
+
+def _trim_to_budget(parsed: Dict[str, Any], budget: int) -> Dict[str, Any]:
+    """
+    Deterministically shrink `parsed` until it fits `budget` tokens: drop the
+    last item of the lowest-priority list section, then whole sections.
+    """
+    rank = {key: i for i, key in enumerate(SECTION_PRIORITY)}
+    parsed = dict(parsed)
+    while len(parsed) > 1 and count_tokens(_dump(parsed)) > budget:
+        order = sorted(parsed, key=lambda key: rank.get(key, len(rank)), reverse=True)
+        shortenable = [key for key in order if isinstance(parsed[key], list) and len(parsed[key]) > 1]
+        if shortenable:
+            key = shortenable[0]
+            parsed[key] = parsed[key][:-1]
+        else:
+            del parsed[order[0]]
+    return parsed
+
+
+def truncate_to_budget(text: str, budget: int) -> str:
+    """Cut `text` to at most `budget` tokens"""
+    if count_tokens(text) <= budget:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return text[:low]
+
+
+def compact_parsed_content(
+    content: str, focus_areas: Optional[List[str]] = None, budget: Optional[int] = None
+) -> str:
+    """
+    Compact `json.dumps(parsed_data)` for a prompt: drop the echoed raw text,
+    contact details and empty fields, keep only the sections relevant to the
+    focus areas, minify the JSON and fit it into `budget` tokens.
+    Content that is not a JSON object is only cut to the budget.
+    """
+    try:
+        parsed = json.loads(content)
+    except (TypeError, ValueError):
+        parsed = None
+    if not isinstance(parsed, dict):
+        return truncate_to_budget(content, budget) if budget else content
+
+    parsed = _prune({k: v for k, v in parsed.items() if k not in DROPPED_FIELDS})
+    if focus_areas:
+        parsed = _project(parsed, focus_areas)
+    if budget:
+        parsed = _trim_to_budget(parsed, budget)
+        return truncate_to_budget(_dump(parsed), budget)
+    return _dump(parsed)
@@ -0,0 +1,280 @@
+# app/services/qa_grading.py
+from typing import Any, Dict, Optional
+from uuid import UUID
+import asyncio
+import json
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.job_description import JobDescription
+from app.models.mock_session import MockSession, UserResponse
+from app.models.resume import Resume
+from app.schemas.mock_session import UserResponseResponse
+from app.services.grading_worker import grading_pool
+from app.services.llm_grader import LLMGrader
+from app.services.llm_guard import LLMUnavailableError
+from app.services.llm_metrics import track_llm_usage
+from app.services.pre_grader import PreGrader
+
+
+# Helper function to get context for grading
+async def get_session_context(session: MockSession, db: Session) -> str:
+    """Get context information for LLM grading"""
+    try:
+        if session.source_type == "resume":
+            resume = db.query(Resume).filter(Resume.id == session.source_id).first()
+            if resume and resume.parsed_data:
+                return f"Resume context: {json.dumps(resume.parsed_data)}"
+        elif session.source_type == "job_description":
+            jd = db.query(JobDescription).filter(JobDescription.id == session.source_id).first()
+            if jd and jd.parsed_data:
+                return f"Job description context: {json.dumps(jd.parsed_data)}"
+
+        return "No additional context available"
+    except Exception:
+        return "No additional context available"
+
+
+def _response_fields(grading_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Map an LLM grade onto `UserResponse` columns"""
+    return {
+        "score": grading_result["score"],
+        "is_correct": grading_result["correctness_level"],
+        "feedback": grading_result["feedback"],
+        "detailed_feedback": {
+            "strengths": grading_result.get("strengths", []),
+            "improvements": grading_result.get("improvements", [])
+        },
+    }
+
+
+def pre_grade_response(question: Dict[str, Any], user_answer: str) -> Optional[Dict[str, Any]]:
+    """`UserResponse` fields for a trivial answer graded locally, or None if it needs the LLM"""
+    if not settings.pre_grader_enabled:
+        return None
+    result = PreGrader.grade(question, user_answer)
+    return _response_fields(result) if result is not None else None
+
+
+def _ungraded_fields(reason: str) -> Dict[str, Any]:
+    # No score: a grading failure must not count as a zero in averages
+    return {
+        "score": None,
+        "is_correct": "ungraded",
+        "feedback": f"Unable to grade automatically: {reason}",
+        "detailed_feedback": None,
+    }
+
+
+async def grade_qa_response(
+    session: MockSession,
+    question: Dict[str, Any],
+    user_answer: str,
+    db: Session,
+    pre_graded: bool = False,
+) -> Dict[str, Any]:
+    """
+    Grade a QA answer and return the `UserResponse` fields to store.
+    `pre_graded` means the pre-grader already escalated this answer (at
+    submit), so it is not run again. LLMUnavailableError is raised rather
+    than stored so callers can retry or shed the request.
+    """
+    if not pre_graded:
+        fields = pre_grade_response(question, user_answer)
+        if fields is not None:
+            return fields
+
+    try:
+        # Questions carry a rubric from session creation; older sessions fall
+        # back to the full source context
+        rubric = question.get("rubric")
+        context = "" if rubric else await get_session_context(session, db)
+
+        # Grade using LLM
+        grading_result = await LLMGrader.grade_qa_answer(
+            question=question.get("question", ""),
+            user_answer=user_answer,
+            context=context,
+            difficulty=session.difficulty_level,
+            rubric=rubric,
+        )
+
+        return _response_fields(grading_result)
+
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        # The model answered but its grade was unusable
+        return _ungraded_fields(str(e))
+
+
+def _retry_delay(attempt: int, error: LLMUnavailableError) -> Optional[float]:
+    """Seconds before retrying a grade that hit an LLM outage, None once out of retries"""
+    if attempt >= settings.grading_max_retries:
+        return None
+    return max(settings.grading_retry_backoff * 2 ** attempt, error.retry_after or 0)
+
+
+async def grade_pending_response(response_id: UUID, attempt: int = 0) -> None:
+    """
+    Grade a stored `pending` response, write the result back and publish it to
+    listeners of its session. Runs on the background grading pool. On an LLM
+    outage the response stays pending and is retried with backoff; only after
+    `grading_max_retries` is it stored as ungraded.
+    """
+    db = SessionLocal()
+    try:
+        response = db.query(UserResponse).filter(UserResponse.id == response_id).first()
+        if not response or response.is_correct != "pending":
+            return
+
+        session = response.session
+        question = session.questions[response.question_index]
+        with track_llm_usage(user_id=session.user_id) as usage:
+            try:
+                # Pending answers were pre-graded (and escalated) at submit
+                result = await grade_qa_response(
+                    session, question, response.user_answer, db, pre_graded=True
+                )
+            except LLMUnavailableError as e:
+                delay = _retry_delay(attempt, e)
+                if delay is None:
+                    result = _ungraded_fields(str(e))
+                else:
+                    result = None
+                    grading_pool.submit_later(delay, grade_pending_response, response_id, attempt + 1)
+
+        session.llm_usage = usage.combined(session.llm_usage)
+        if result is None:
+            db.commit()
+            return
+        for field, value in result.items():
+            setattr(response, field, value)
+        db.commit()
+        db.refresh(response)
+
+        grading_pool.publish(
+            response.session_id,
+            UserResponseResponse.model_validate(response).model_dump(mode="json"),
+        )
+    finally:
+        db.close()
+
+
+async def grade_session_batch(session_id: UUID, attempt: int = 0) -> None:
+    """
+    Grade every pending answer of a finished batch-graded session in a few
+    packed LLM calls that share the session context, then fan the grades back
+    into the `user_responses` rows. Answers the batch call could not grade are
+    graded individually; those that hit an LLM outage stay pending and the
+    batch is retried with backoff, up to `grading_max_retries`.
+    """
+    db = SessionLocal()
+    try:
+        session = db.query(MockSession).filter(MockSession.id == session_id).first()
+        if not session:
+            return
+        pending = (
+            db.query(UserResponse)
+            .filter(UserResponse.session_id == session_id, UserResponse.is_correct == "pending")
+            .order_by(UserResponse.question_index)
+            .all()
+        )
+        if not pending:
+            return
+
+        has_rubrics = all(
+            session.questions[r.question_index].get("rubric") for r in pending
+        )
+        context = "" if has_rubrics else await get_session_context(session, db)
+        size = max(1, settings.batch_grading_max_answers)
+        packs = [pending[i:i + size] for i in range(0, len(pending), size)]
+
+        async def grade_pack(pack):
+            answers = [
+                {
+                    "question": session.questions[r.question_index].get("question", ""),
+                    "user_answer": r.user_answer,
+                    "rubric": session.questions[r.question_index].get("rubric"),
+                }
+                for r in pack
+            ]
+            try:
+                return await LLMGrader.grade_qa_batch(answers, context, session.difficulty_level)
+            except Exception:
+                return [None] * len(pack)
+
+        graded = []
+        retry_delay: Optional[float] = None
+        with track_llm_usage(user_id=session.user_id) as usage:
+            results = await asyncio.gather(*(grade_pack(pack) for pack in packs))
+
+            for pack, grades in zip(packs, results):
+                for response, grade in zip(pack, grades):
+                    if grade is not None:
+                        fields = _response_fields(grade)
+                    else:
+                        question = session.questions[response.question_index]
+                        try:
+                            fields = await grade_qa_response(
+                                session, question, response.user_answer, db, pre_graded=True
+                            )
+                        except LLMUnavailableError as e:
+                            delay = _retry_delay(attempt, e)
+                            if delay is not None:
+                                # Left pending for the retry
+                                retry_delay = max(retry_delay or 0, delay)
+                                continue
+                            fields = _ungraded_fields(str(e))
+                    for field, value in fields.items():
+                        setattr(response, field, value)
+                    graded.append(response)
+        session.llm_usage = usage.combined(session.llm_usage)
+        db.commit()
+        if retry_delay is not None:
+            grading_pool.submit_later(retry_delay, grade_session_batch, session_id, attempt + 1)
+
+        for response in graded:
+            db.refresh(response)
+            grading_pool.publish(
+                session_id,
+                UserResponseResponse.model_validate(response).model_dump(mode="json"),
+            )
+    finally:
+        db.close()
+
+
+def requeue_pending_grades() -> int:
+    """
+    Queue the grading of answers left `pending` by a restart, since queued
+    and delayed grading jobs only live in memory. Background answers are
+    graded one by one; batch sessions once they are complete (the others are
+    picked up when their last answer arrives). Returns the jobs queued.
+    """
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(UserResponse.id, MockSession.id, MockSession.grading_mode, MockSession.status)
+            .join(MockSession, UserResponse.session_id == MockSession.id)
+            .filter(UserResponse.is_correct == "pending")
+            .all()
+        )
+    finally:
+        db.close()
+
+    jobs = []
+    batch_sessions = set()
+    for response_id, session_id, grading_mode, session_status in rows:
+        if (grading_mode or settings.qa_grading_mode) != "batch":
+            jobs.append((grade_pending_response, response_id))
+        elif session_status == "completed" and session_id not in batch_sessions:
+            batch_sessions.add(session_id)
+            jobs.append((grade_session_batch, session_id))
+
+    for job, key in jobs:
+        try:
+            grading_pool.submit(job, key)
+        except asyncio.QueueFull:
+            # Runs as soon as the queue has room (or inline if it stays full)
+            grading_pool.submit_later(0, job, key)
+    return len(jobs)
@@ -0,0 +1,86 @@
+# app/services/session_stream.py
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Optional
+from uuid import uuid4
+import json
+from app.database import SessionLocal
+from app.models.mock_session import MockSession
+from app.schemas.mock_session import MockSessionResponse
+from app.services.llm_grader import LLMGrader
+from app.services.llm_metrics import LLMUsage, track_llm_usage
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format a single Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def stream_mock_session(
+    questions: AsyncIterator[Dict[str, Any]],
+    expected_questions: int,
+    usage: Optional[LLMUsage] = None,
+    **session_fields: Any,
+) -> AsyncIterator[str]:
+    """
+    Persist a mock session while its questions are still being generated.
+
+    The `MockSession` row is created as soon as the first question arrives
+    (a `session` event carries it to the client) and every later question is
+    appended to it and sent as a `question` event. A final `done` event
+    reports the real question count. Uses its own DB session because it
+    outlives the request handler. LLM usage is added to `usage` (e.g. the
+    parse calls made before streaming) and stored on the session.
+    """
+    db = SessionLocal()
+    session = None
+    with track_llm_usage(usage, user_id=session_fields.get("user_id")) as usage:
+        try:
+            async for question in questions:
+                LLMGrader.attach_rubrics([question])
+                if session is None:
+                    session = MockSession(
+                        id=uuid4(),
+                        questions=[question],
+                        total_questions=expected_questions,
+                        answered_questions=0,
+                        status="ongoing",
+                        llm_usage=usage.to_dict(),
+                        created_at=datetime.now(timezone.utc),
+                        **session_fields,
+                    )
+                    db.add(session)
+                    db.commit()
+                    db.refresh(session)
+                    yield sse_event(
+                        "session",
+                        MockSessionResponse.model_validate(session).model_dump(mode="json"),
+                    )
+                else:
+                    session.questions = session.questions + [question]
+                    db.commit()
+
+                yield sse_event(
+                    "question",
+                    {"index": len(session.questions) - 1, "question": question},
+                )
+
+            if session is None:
+                yield sse_event("error", {"detail": "Failed to generate mock questions."})
+                return
+
+            session.total_questions = len(session.questions)
+            db.commit()
+            yield sse_event(
+                "done",
+                {"session_id": str(session.id), "total_questions": session.total_questions},
+            )
+        except Exception as e:
+            db.rollback()
+            yield sse_event("error", {"detail": f"Question generation failed: {str(e)}"})
+        finally:
+            if session is not None:
+                # Keep the stored count truthful if generation stopped early
+                session.total_questions = len(session.questions)
+                session.llm_usage = usage.to_dict()
+                db.commit()
+            db.close()
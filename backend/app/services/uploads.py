@@ -0,0 +1,139 @@
+# app/services/uploads.py
+import codecs
+import hashlib
+import os
+import zipfile
+from tempfile import NamedTemporaryFile
+from typing import BinaryIO, Optional, Tuple
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from app.core.config import settings
+
+MAX_UPLOAD_BYTES = settings.max_upload_size_mb * 1024 * 1024
+# Room for the multipart envelope and the form fields sent with a file
+REQUEST_OVERHEAD_BYTES = 256 * 1024
+CHUNK_SIZE = 64 * 1024
+SNIFF_BYTES = 8 * 1024
+# UTF-16 text is full of NUL bytes; its byte order mark says it is text
+TEXT_BOMS = (codecs.BOM_UTF8, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File size too large. Maximum size: {settings.max_upload_size_mb}MB",
+    )
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject request bodies larger than `max_bytes` with 413: up front when
+    Content-Length says so, otherwise as soon as the bytes received pass the
+    limit, before the body is buffered any further.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        length = Headers(scope=scope).get("content-length", "")
+        if length.isdigit() and int(length) > self.max_bytes:
+            error = _too_large()
+            response = JSONResponse({"detail": error.detail}, status_code=error.status_code)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Raised inside body parsing, so FastAPI turns it into the 413 response
+                    raise _too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def sniff_file_type(head: bytes, path: str) -> Optional[str]:
+    """"pdf", "docx" or "txt" from a file's leading bytes, None if it is none of them"""
+    if b"%PDF-" in head[:1024]:
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        # Any zip archive starts like this; a DOCX has the Word document part
+        try:
+            with zipfile.ZipFile(path) as archive:
+                return "docx" if "word/document.xml" in archive.namelist() else None
+        except zipfile.BadZipFile:
+            return None
+    if head.startswith(TEXT_BOMS) or b"\x00" not in head:
+        return "txt"
+    return None
+
+
+class SpooledUpload:
+    """
+    An uploaded file copied to a named temporary file, so extraction workers
+    can read it from disk. Deleted on close / when leaving a `with` block.
+    """
+
+    def __init__(
+        self, filename: str, content_type: Optional[str], path: str, size: int, sha256: str, file_type: Optional[str]
+    ):
+        self.filename = filename
+        self.content_type = content_type
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.file_type = file_type
+
+    def close(self) -> None:
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _copy_upload(source: BinaryIO, max_bytes: int) -> Tuple[str, int, str, Optional[str]]:
+    source.seek(0)
+    digest, size, head = hashlib.sha256(), 0, b""
+    with NamedTemporaryFile(prefix="upload-", delete=False) as target:
+        try:
+            while chunk := source.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise _too_large()
+                digest.update(chunk)
+                target.write(chunk)
+                if len(head) < SNIFF_BYTES:
+                    head += chunk[:SNIFF_BYTES - len(head)]
+        except BaseException:
+            target.close()
+            os.unlink(target.name)
+            raise
+    return target.name, size, digest.hexdigest(), sniff_file_type(head, target.name)
+
+
+async def spool_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> SpooledUpload:
+    """
+    Copy an upload to disk in chunks, enforcing `max_bytes` (413) while
+    hashing it and sniffing its type from its magic bytes.
+    """
+    path, size, sha256, file_type = await run_in_threadpool(_copy_upload, file.file, max_bytes)
+    return SpooledUpload(file.filename, file.content_type, path, size, sha256, file_type)
@@ -0,0 +1,43 @@
+# benchmarks/fake_llm.py
+"""
+Run the app's fake chat completions API (app.services.fake_llm) on a local
+port for benchmarks.
+
+Every request sleeps for a fixed latency (plus an optional per-1000-prompt-
+characters cost, to mimic prompt processing time) and answers like the
+real model would for that prompt, which is enough to exercise the client
+code paths without the network.
+"""
+import threading
+import time
+import uvicorn
+from starlette.applications import Starlette
+from app.services import fake_llm
+
+
+def create_app(latency: float, latency_per_kchar: float = 0.0) -> Starlette:
+    return fake_llm.create_app(
+        latency=f"fixed:{latency}",
+        seconds_per_kchar=latency_per_kchar,
+        tokens_per_second=0,
+        rate_limit_rate=0,
+        malformed_rate=0,
+    )
+
+
+def start_in_thread(
+    port: int, latency: float, latency_per_kchar: float = 0.0
+) -> uvicorn.Server:
+    """Run the fake endpoint on 127.0.0.1:<port> in a daemon thread"""
+    config = uvicorn.Config(
+        create_app(latency, latency_per_kchar),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+    )
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
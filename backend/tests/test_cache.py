@@ -0,0 +1,40 @@
+# tests/test_cache.py
+from app.services import cache
+from app.services.cache import LRUCache, TTLCache
+
+
+def test_lru_cache_evicts_the_least_recently_used():
+    lru = LRUCache(maxsize=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert (lru.get("a"), lru.get("c")) == (1, 3)
+    assert lru.stats() == {"size": 2, "maxsize": 2, "hits": 3, "misses": 1}
+
+
+def test_lru_cache_of_size_zero_stores_nothing():
+    lru = LRUCache(maxsize=0)
+    lru.set("a", 1)
+    assert lru.get("a") is None and len(lru) == 0
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    ttl = TTLCache(maxsize=4, ttl=60)
+    ttl.set("a", {"questions": []})
+    now[0] += 59
+    assert ttl.get("a") == {"questions": []}
+    now[0] += 1
+    assert ttl.get("a") is None
+    assert len(ttl) == 0
+    assert ttl.stats()["expired"] == 1 and ttl.stats()["misses"] == 1
+
+
+def test_ttl_cache_is_also_bounded_by_size():
+    ttl = TTLCache(maxsize=1, ttl=60)
+    ttl.set("a", 1)
+    ttl.set("b", 2)
+    assert ttl.get("a") is None and ttl.get("b") == 2
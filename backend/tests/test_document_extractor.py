@@ -0,0 +1,62 @@
+# tests/test_document_extractor.py
+import asyncio
+import signal
+import time
+import pytest
+from benchmarks.bench_extraction import make_pdf
+from app.services.document_extractor import DocumentExtractorPool, ExtractionLimitError, extract_pdf_text
+
+
+def inline_pool(monkeypatch, **options) -> tuple:
+    """A pool that runs its tasks in this process, recording the page ranges asked for"""
+    pool = DocumentExtractorPool(timeout=10.0, cpu_seconds=10, memory_mb=0, pages_per_task=2, **options)
+    tasks = []
+
+    async def run(extractor, file_content, start=0, stop=None, *args):
+        tasks.append((start, stop))
+        return extractor(file_content, start, stop, *args)
+
+    monkeypatch.setattr(pool, "_run", run)
+    return pool, tasks
+
+
+@pytest.mark.parametrize("options, pages", [
+    ({"workers": 1, "parallel_min_pages": 1}, 7),
+    ({"workers": 4, "parallel_min_pages": 0}, 7),
+    ({"workers": 4, "parallel_min_pages": 10}, 7),
+])
+async def test_pdf_is_read_in_one_task_unless_splitting_pays(monkeypatch, options, pages):
+    pool, tasks = inline_pool(monkeypatch, **options)
+    content = make_pdf(pages)
+    assert await pool.extract("pdf", content) == extract_pdf_text(content)
+    assert len(tasks) == 1
+
+
+async def test_long_pdf_is_split_across_workers(monkeypatch):
+    pool, tasks = inline_pool(monkeypatch, workers=2, parallel_min_pages=5)
+    content = make_pdf(7)
+    assert await pool.extract("pdf", content) == extract_pdf_text(content)
+    assert tasks == [(0, 2), (2, 4), (4, 6), (6, 8)]
+
+
+def wedged(_):
+    # Blocks the alarm, as C code stuck in a parser would
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGALRM})
+    time.sleep(60)
+
+
+def quick(text):
+    return text
+
+
+async def test_timeout_does_not_fail_other_documents():
+    pool = DocumentExtractorPool(workers=1, timeout=0.5, cpu_seconds=10, memory_mb=0)
+    try:
+        # Queued behind the wedged document on the only worker
+        results = await asyncio.gather(
+            pool._run(wedged, None), pool._run(quick, "other document"), return_exceptions=True
+        )
+        assert isinstance(results[0], ExtractionLimitError)
+        assert results[1] == "other document"
+    finally:
+        pool.shutdown()
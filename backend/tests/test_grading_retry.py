@@ -0,0 +1,54 @@
+# tests/test_grading_retry.py
+import asyncio
+import pytest
+from app.core.config import settings
+from app.services import qa_grading
+from app.services.grading_worker import GradingWorkerPool
+from app.services.llm_guard import LLMUnavailableError
+
+
+@pytest.fixture(autouse=True)
+def retry_settings(monkeypatch):
+    monkeypatch.setattr(settings, "grading_max_retries", 3)
+    monkeypatch.setattr(settings, "grading_retry_backoff", 10.0)
+
+
+def test_ungraded_answer_has_no_score():
+    fields = qa_grading._ungraded_fields("down")
+    assert fields["score"] is None
+    assert fields["is_correct"] == "ungraded"
+
+
+def test_retry_delay_backs_off_then_gives_up():
+    error = LLMUnavailableError("down", retry_after=0)
+    assert [qa_grading._retry_delay(attempt, error) for attempt in range(4)] == [10.0, 20.0, 40.0, None]
+
+
+def test_retry_delay_honours_retry_after():
+    assert qa_grading._retry_delay(0, LLMUnavailableError("down", retry_after=25.0)) == 25.0
+
+
+async def test_submit_later_queues_the_job_after_the_delay():
+    pool = GradingWorkerPool(workers=1, queue_size=10)
+    ran = asyncio.Event()
+
+    async def job(value):
+        assert value == "response"
+        ran.set()
+
+    pool.submit_later(0.01, job, "response")
+    assert not ran.is_set()
+    await asyncio.wait_for(ran.wait(), 1.0)
+    await pool.stop()
+
+
+async def test_stop_cancels_delayed_jobs():
+    pool = GradingWorkerPool(workers=1, queue_size=10)
+    ran = []
+
+    async def job():
+        ran.append(True)
+
+    pool.submit_later(60, job)
+    await pool.stop()
+    assert not ran and not pool._delayed
@@ -0,0 +1,184 @@
+# tests/test_idempotency.py
+import asyncio
+import uuid
+from types import SimpleNamespace
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from starlette.requests import Request
+from app.core.config import settings
+from app.models.mock_session import MockSession
+from app.routers.mock_sessions import submit_answer
+from app.schemas.mock_session import AnswerSubmission
+from app.services import idempotency
+from app.services.idempotency import request_fingerprint, run_idempotent
+
+USER = uuid.uuid4()
+
+
+class Answer(BaseModel):
+    value: int
+
+
+@pytest.fixture(autouse=True)
+def keys(monkeypatch):
+    """The idempotency_keys table, kept in a dict keyed by (user, endpoint, key)"""
+    rows = {}
+
+    def claim(user_id, endpoint, key, fingerprint):
+        if (user_id, endpoint, key) in rows:
+            return None
+        record_id = uuid.uuid4()
+        rows[user_id, endpoint, key] = SimpleNamespace(
+            id=record_id, fingerprint=fingerprint, status="in_progress", status_code=None, response_body=None
+        )
+        return record_id
+
+    def by_id(record_id):
+        return next(k for k, record in rows.items() if record.id == record_id)
+
+    def complete(record_id, status_code, body):
+        record = rows[by_id(record_id)]
+        record.status, record.status_code, record.response_body = "completed", status_code, body
+
+    monkeypatch.setattr(idempotency, "_claim", claim)
+    monkeypatch.setattr(idempotency, "_find", lambda *k: rows.get(k))
+    monkeypatch.setattr(idempotency, "_complete", complete)
+    monkeypatch.setattr(idempotency, "_release", lambda record_id: rows.pop(by_id(record_id)))
+    monkeypatch.setattr(settings, "idempotency_poll_interval", 0.01)
+    return rows
+
+
+def make_request(key=None, path="/api/mock-sessions/1/submit") -> Request:
+    headers = [(b"idempotency-key", key.encode())] if key else []
+    return Request({"type": "http", "method": "POST", "path": path, "headers": headers, "query_string": b""})
+
+
+def counting_handler(*outcomes):
+    """A handler returning (or raising) the given outcomes in turn, counting its runs"""
+    runs = []
+
+    async def handler():
+        outcome = outcomes[len(runs)]
+        runs.append(outcome)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return Answer(value=outcome)
+
+    return handler, runs
+
+
+async def test_first_request_runs_and_repeats_replay_its_response(keys):
+    handler, runs = counting_handler(1, 2)
+    fingerprint = request_fingerprint("payload")
+    first = await run_idempotent(make_request("k"), USER, fingerprint, handler, Answer)
+    repeat = await run_idempotent(make_request("k"), USER, fingerprint, handler, Answer)
+    assert first == Answer(value=1)
+    assert repeat == {"value": 1}
+    assert len(runs) == 1
+    assert list(keys.values())[0].status == "completed"
+
+
+async def test_requests_without_a_key_always_run():
+    handler, runs = counting_handler(1, 2)
+    for _ in range(2):
+        await run_idempotent(make_request(), USER, "fp", handler, Answer)
+    assert len(runs) == 2
+
+
+async def test_key_reused_for_another_payload_is_rejected():
+    handler, runs = counting_handler(1, 2)
+    await run_idempotent(make_request("k"), USER, request_fingerprint("a"), handler, Answer)
+    with pytest.raises(HTTPException) as error:
+        await run_idempotent(make_request("k"), USER, request_fingerprint("b"), handler, Answer)
+    assert error.value.status_code == 422
+    assert len(runs) == 1
+
+
+async def test_repeat_gets_409_while_the_first_request_is_running(monkeypatch):
+    monkeypatch.setattr(settings, "idempotency_wait_timeout", 0.05)
+    release = asyncio.Event()
+
+    async def slow():
+        await release.wait()
+        return Answer(value=1)
+
+    first = asyncio.create_task(run_idempotent(make_request("k"), USER, "fp", slow, Answer))
+    await asyncio.sleep(0)
+    with pytest.raises(HTTPException) as error:
+        await run_idempotent(make_request("k"), USER, "fp", slow, Answer)
+    assert error.value.status_code == 409
+    release.set()
+    assert await first == Answer(value=1)
+
+
+async def test_repeat_waits_for_the_first_request_and_gets_its_response():
+    release = asyncio.Event()
+    handler, runs = counting_handler(1, 2)
+
+    async def slow():
+        await release.wait()
+        return await handler()
+
+    first = asyncio.create_task(run_idempotent(make_request("k"), USER, "fp", slow, Answer))
+    await asyncio.sleep(0)
+    repeat = asyncio.create_task(run_idempotent(make_request("k"), USER, "fp", slow, Answer))
+    await asyncio.sleep(0.02)
+    release.set()
+    assert await first == Answer(value=1)
+    assert await repeat == {"value": 1}
+    assert len(runs) == 1
+
+
+async def test_key_is_released_after_a_server_error(keys):
+    handler, runs = counting_handler(HTTPException(status_code=503, detail="LLM down"), 2)
+    with pytest.raises(HTTPException):
+        await run_idempotent(make_request("k"), USER, "fp", handler, Answer)
+    assert not keys
+    assert await run_idempotent(make_request("k"), USER, "fp", handler, Answer) == Answer(value=2)
+    assert len(runs) == 2
+
+
+async def test_client_error_is_stored_and_replayed():
+    handler, runs = counting_handler(HTTPException(status_code=400, detail="bad"), 2)
+    for _ in range(2):
+        with pytest.raises(HTTPException) as error:
+            await run_idempotent(make_request("k"), USER, "fp", handler, Answer)
+        assert (error.value.status_code, error.value.detail) == (400, "bad")
+    assert len(runs) == 1
+
+
+class RacedSubmitDB:
+    """A session whose commit loses the unique constraint to a concurrent submit"""
+
+    def __init__(self, mock_session):
+        self.mock_session = mock_session
+        self.rolled_back = False
+
+    def query(self, model):
+        found = self.mock_session if model is MockSession else None
+        return SimpleNamespace(filter=lambda *criteria: SimpleNamespace(first=lambda: found))
+
+    def add(self, row):
+        pass
+
+    def commit(self):
+        raise IntegrityError("INSERT INTO user_responses", {}, Exception("uq_user_responses_session_question"))
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+async def test_duplicate_submit_is_a_client_error():
+    mock_session = SimpleNamespace(
+        status="ongoing", practice_mode="mcq", questions=[{"answer": "B"}],
+        answered_questions=0, total_questions=1, current_question_index=0,
+    )
+    db = RacedSubmitDB(mock_session)
+    answer = AnswerSubmission(question_index=0, question_text="Q", question_type="mcq", user_answer="B")
+    with pytest.raises(HTTPException) as error:
+        await submit_answer(make_request("k"), uuid.uuid4(), answer, db, SimpleNamespace(id=USER))
+    assert error.value.status_code == 400
+    assert error.value.detail == "Answer for this question already submitted"
+    assert db.rolled_back
@@ -0,0 +1,18 @@
+# tests/test_jd_normalizer.py
+import pytest
+from benchmarks.bench_jd_normalizer import fuzz, golden_corpus, legacy_normalize
+from app.services.file_processor import JobDescriptionNormalizer
+
+
+@pytest.mark.parametrize("name, text", golden_corpus())
+def test_matches_the_original_normalizer(name, text):
+    assert JobDescriptionNormalizer.normalize_job_description(text) == legacy_normalize(text)
+
+
+def test_matches_the_original_normalizer_on_random_strings():
+    assert fuzz(20_000) == 0
+
+
+@pytest.mark.parametrize("value", [None, "", 42])
+def test_non_text_normalizes_to_empty(value):
+    assert JobDescriptionNormalizer.normalize_job_description(value) == ""
@@ -0,0 +1,71 @@
+# tests/test_llm_json.py
+import json
+import pytest
+from app.services.llm_json import JSONArrayItemStream, JSONFieldStream, LLMJSONError, extract_json
+
+QUESTIONS = [
+    {"question": "Why use {braces} in \"quotes\"?", "options": ["A", "B"], "correct_index": 1},
+    {"question": "Second", "rubric": {"key_points": ["x", "y"]}},
+]
+FUSED = json.dumps({"parsed_data": {"name": "Ada", "skills": ["Go", "SQL"]}, "questions": QUESTIONS}, indent=2)
+
+
+def chunks(text: str, size: int):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("text", [
+    json.dumps(QUESTIONS),
+    "```json\n" + json.dumps(QUESTIONS) + "\n```",
+    "Here are your questions:\n" + json.dumps(QUESTIONS) + "\nGood luck!",
+])
+def test_extract_json_tolerates_fences_and_prose(text):
+    assert extract_json(text) == QUESTIONS
+
+
+def test_extract_json_salvages_complete_items_of_a_truncated_array():
+    text = json.dumps(QUESTIONS)[:-20]
+    assert extract_json(text) == QUESTIONS[:1]
+
+
+def test_extract_json_closes_a_truncated_object():
+    assert extract_json('{"score": 80, "feedback": "Good", "strengths": ["a", "b') == {
+        "score": 80, "feedback": "Good", "strengths": ["a"],
+    }
+
+
+def test_extract_json_without_json_raises():
+    with pytest.raises(LLMJSONError):
+        extract_json("no json here")
+
+
+@pytest.mark.parametrize("size", [1, 3, 64])
+def test_array_item_stream_yields_items_as_they_close(size):
+    for text in (json.dumps(QUESTIONS), json.dumps({"questions": QUESTIONS}), FUSED):
+        stream = JSONArrayItemStream()
+        items = [item for chunk in chunks(text, size) for item in stream.feed(chunk)]
+        assert items == QUESTIONS
+
+
+@pytest.mark.parametrize("size", [1, 3, 64])
+def test_field_stream_returns_the_value_once_it_is_complete(size):
+    stream = JSONFieldStream("parsed_data")
+    values = [value for chunk in chunks(FUSED, size) if (value := stream.feed(chunk)) is not None]
+    assert values == [{"name": "Ada", "skills": ["Go", "SQL"]}]
+    assert stream.done
+
+
+def test_field_stream_waits_for_the_whole_value():
+    stream = JSONFieldStream("parsed_data")
+    assert stream.feed('{"parsed_data": {"name": "A}"') is None
+    assert not stream.done
+    assert stream.feed(', "n": 1}, "questions": []}') == {"name": "A}", "n": 1}
+
+
+@pytest.mark.parametrize("text, value", [
+    ('{"parsed_data": 42, "questions": []}', 42),
+    ('{"parsed_data": "a \\" b"}', 'a " b'),
+    ('{"other": {"parsed_data": 1}, "note": "parsed_data", "parsed_data": [1]}', [1]),
+])
+def test_field_stream_reads_only_the_top_level_member(text, value):
+    assert JSONFieldStream("parsed_data").feed(text) == value
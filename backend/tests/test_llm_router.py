@@ -0,0 +1,116 @@
+# tests/test_llm_router.py
+import asyncio
+import pytest
+from app.core.config import LLMBackend
+from app.services import llm_router as router_module
+from app.services.llm_guard import LLMDeadlineExceeded, llm_deadline
+from app.services.llm_router import LLMRouter, RoutedBackend
+
+
+def make_router(monkeypatch, behaviours):
+    """A router over one backend per entry of `behaviours` (model name -> async fn)"""
+    router = LLMRouter()
+    router._backends = [
+        RoutedBackend(LLMBackend(name=name, model=name, pools=["grading"])) for name in behaviours
+    ]
+
+    async def fake_chat_completion(model, **kwargs):
+        return await behaviours[model]()
+
+    monkeypatch.setattr(router_module, "chat_completion", fake_chat_completion)
+    monkeypatch.setattr(router_module.settings, "llm_coalesce_requests", False)
+    return router
+
+
+async def hang():
+    await asyncio.sleep(3600)
+
+
+async def answer():
+    return "ok"
+
+
+async def outage():
+    raise asyncio.TimeoutError()
+
+
+async def call(router, **kwargs):
+    return await router.complete(
+        "grading", [{"role": "user", "content": "hi"}], temperature=0, max_tokens=10, **kwargs
+    )
+
+
+async def test_cancelled_attempt_is_not_recorded(monkeypatch):
+    router = make_router(monkeypatch, {"slow": hang})
+    backend = router._backends[0]
+    task = asyncio.create_task(call(router))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert backend.calls == 0
+    assert not backend.latencies
+    assert backend.in_flight == 0
+
+
+async def test_hedge_loser_is_not_recorded(monkeypatch):
+    router = make_router(monkeypatch, {"primary": hang, "secondary": answer})
+    monkeypatch.setattr(router_module.settings, "llm_hedge_after", 0.05)
+    monkeypatch.setattr(router, "rank", lambda pool: list(router._backends))
+
+    assert await call(router, hedge=True) == "ok"
+    primary, secondary = router._backends
+    assert router.hedges == 1 and router.hedges_won == 1
+    assert primary.calls == 0 and not primary.latencies
+    assert secondary.calls == 1 and secondary.outcomes[-1] is True
+
+
+async def test_cancelled_attempt_does_not_close_half_open_breaker(monkeypatch):
+    router = make_router(monkeypatch, {"slow": hang})
+    backend = router._backends[0]
+    backend.breaker.opened_at = 0.0  # cooldown long over: half-open
+    assert backend.breaker.state == "half_open"
+
+    task = asyncio.create_task(call(router))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert backend.breaker.state == "half_open"
+
+
+async def test_outages_trip_the_breaker(monkeypatch):
+    router = make_router(monkeypatch, {"down": outage})
+    monkeypatch.setattr(router_module.settings, "llm_max_attempts", 1)
+    backend = router._backends[0]
+
+    for _ in range(backend.breaker.failure_threshold):
+        with pytest.raises(Exception):
+            await call(router)
+
+    assert backend.errors == backend.breaker.failure_threshold
+    assert backend.breaker.state == "open"
+
+
+async def test_request_deadline_is_not_held_against_the_backend(monkeypatch):
+    router = make_router(monkeypatch, {"slow": hang})
+    backend = router._backends[0]
+    monkeypatch.setattr(router_module.settings, "llm_request_deadline", 0.05)
+
+    with llm_deadline():
+        with pytest.raises(LLMDeadlineExceeded):
+            await call(router)
+
+    assert backend.calls == 0
+    assert backend.breaker.failures == 0
+
+
+async def test_success_is_recorded(monkeypatch):
+    router = make_router(monkeypatch, {"fast": answer})
+    backend = router._backends[0]
+    backend.breaker.opened_at = 0.0
+
+    assert await call(router) == "ok"
+    assert backend.calls == 1 and len(backend.latencies) == 1
+    assert backend.breaker.state == "closed"
@@ -0,0 +1,136 @@
+# tests/test_llm_scheduler.py
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.core.config import settings
+from app.services import llm_scheduler as scheduler_module
+from app.services.llm_scheduler import LLMPriority, LLMQueueFullError, LLMScheduler, TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A monotonic clock that only moves when the test advances it"""
+    now = [1000.0]
+    monkeypatch.setattr(scheduler_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+
+    def advance(seconds):
+        now[0] += seconds
+
+    return advance
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_concurrency", 1)
+    monkeypatch.setattr(settings, "llm_max_queue", 10)
+    monkeypatch.setattr(settings, "llm_requests_per_minute", 1000)
+    monkeypatch.setattr(settings, "llm_tokens_per_minute", 1_000_000)
+
+
+def test_bucket_refills_over_time(clock):
+    bucket = TokenBucket(capacity=60, refill_per_second=1)
+    bucket.take(60)
+    assert bucket.wait_time(10) == 10
+    clock(4)
+    assert bucket.wait_time(10) == 6
+    clock(600)
+    assert bucket.wait_time(60) == 0
+    assert bucket.tokens == 60
+
+
+def test_bucket_never_waits_for_more_than_its_capacity(clock):
+    bucket = TokenBucket(capacity=10, refill_per_second=2)
+    bucket.take(10)
+    assert bucket.wait_time(1000) == 5
+
+
+def test_headers_sync_the_buckets(clock, limits):
+    scheduler = LLMScheduler()
+    scheduler.observe_headers("model", {
+        "x-ratelimit-limit-tokens": "6000",
+        "x-ratelimit-remaining-tokens": "3000",
+        "x-ratelimit-reset-tokens": "30s",
+        "x-ratelimit-limit-requests": "100",
+        "x-ratelimit-remaining-requests": "40",
+        "x-ratelimit-reset-requests": "1m",
+    })
+    queue = scheduler._models["model"]
+    assert (queue.tokens.capacity, queue.tokens.tokens, queue.tokens.refill_per_second) == (6000, 3000, 100)
+    assert (queue.requests.capacity, queue.requests.tokens, queue.requests.refill_per_second) == (100, 40, 1)
+    assert queue.tokens.wait_time(4000) == 10
+
+
+def test_429_blocks_the_model_for_retry_after(clock, limits):
+    scheduler = LLMScheduler()
+    scheduler.observe_headers("model", {"retry-after": "2"}, status_code=429)
+    assert scheduler._models["model"].requests.wait_time(1) == 2
+    assert scheduler.stats()["rate_limited"] == 1
+
+
+async def hold(scheduler, release, priority=LLMPriority.BACKGROUND, admitted=None, name=None):
+    async with scheduler.slot("model", priority, estimated_tokens=10):
+        if admitted is not None:
+            admitted.append(name)
+        await release.wait()
+
+
+async def test_interactive_calls_are_admitted_before_background_ones(limits):
+    scheduler, release, admitted = LLMScheduler(), asyncio.Event(), []
+    holder = asyncio.create_task(hold(scheduler, release))
+    await asyncio.sleep(0)
+    waiters = [
+        asyncio.create_task(hold(scheduler, release, priority, admitted, name))
+        for name, priority in [
+            ("parse", LLMPriority.BACKGROUND), ("grade", LLMPriority.INTERACTIVE), ("generate", LLMPriority.BACKGROUND),
+        ]
+    ]
+    await asyncio.sleep(0)
+    assert scheduler.stats()["models"]["model"]["waiting"] == 3
+    release.set()
+    await asyncio.gather(holder, *waiters)
+    assert admitted == ["grade", "parse", "generate"]
+
+
+async def test_full_queue_rejects_new_calls(limits, monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_queue", 1)
+    scheduler, release = LLMScheduler(), asyncio.Event()
+    tasks = [asyncio.create_task(hold(scheduler, release)) for _ in range(2)]
+    await asyncio.sleep(0)
+    with pytest.raises(LLMQueueFullError):
+        async with scheduler.slot("model", LLMPriority.INTERACTIVE, estimated_tokens=10):
+            pass
+    assert scheduler.stats()["rejected"] == 1
+    release.set()
+    await asyncio.gather(*tasks)
+
+
+async def test_cancelled_waiter_leaves_the_queue(limits):
+    scheduler, release = LLMScheduler(), asyncio.Event()
+    holder = asyncio.create_task(hold(scheduler, release))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(hold(scheduler, release))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    queue = scheduler._models["model"]
+    assert not queue.waiters and queue.in_flight == 1
+
+    release.set()
+    await holder
+    assert queue.in_flight == 0
+    async with scheduler.slot("model", LLMPriority.INTERACTIVE, estimated_tokens=10):
+        assert queue.in_flight == 1
+
+
+async def test_waiter_cancelled_as_it_is_admitted_gives_its_slot_back(limits):
+    scheduler = LLMScheduler()
+    held = scheduler.slot("model", LLMPriority.INTERACTIVE, estimated_tokens=10)
+    await held.__aenter__()
+    waiter = asyncio.create_task(hold(scheduler, asyncio.Event()))
+    await asyncio.sleep(0)
+    # Admits the waiter, which is cancelled before it gets to run
+    await held.__aexit__(None, None, None)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    assert waiter.cancelled()
+    assert scheduler._models["model"].in_flight == 0
@@ -0,0 +1,74 @@
+# tests/test_llm_singleflight.py
+import asyncio
+import pytest
+from app.core.config import settings
+from app.services.llm_guard import LLMDeadlineExceeded, llm_deadline, time_remaining
+from app.services.llm_metrics import current_operation, llm_metrics, llm_operation, track_llm_usage
+from app.services.llm_singleflight import SingleFlight
+
+
+def shared_call(release: asyncio.Event, seen: list):
+    async def work():
+        seen.append((time_remaining(), current_operation()))
+        await release.wait()
+        llm_metrics.record("test-model", 0.5, prompt_tokens=100, completion_tokens=20)
+        return "answer"
+
+    return work
+
+
+async def test_every_waiter_is_charged_the_shared_call():
+    flights, release, seen = SingleFlight(), asyncio.Event(), []
+
+    async def caller(user_id):
+        with track_llm_usage(user_id=user_id) as usage:
+            result = await flights.do("key", shared_call(release, seen))
+        return result, usage.data
+
+    callers = [asyncio.create_task(caller(user_id)) for user_id in ("leader", "follower")]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*callers)
+
+    assert len(seen) == 1
+    for result, usage in results:
+        assert result == "answer"
+        assert usage["calls"] == 1 and usage["prompt_tokens"] == 100
+    assert llm_metrics.user_stats("follower")["tokens"] == 120
+
+
+async def test_shared_call_runs_outside_the_leaders_deadline(monkeypatch):
+    monkeypatch.setattr(settings, "llm_request_deadline", 0.05)
+    flights, release, seen = SingleFlight(), asyncio.Event(), []
+
+    async def leader():
+        with llm_deadline(), llm_operation("grade_qa"):
+            return await flights.do("key", shared_call(release, seen))
+
+    leader_task = asyncio.create_task(leader())
+    await asyncio.sleep(0)
+    follower_task = asyncio.create_task(flights.do("key", shared_call(release, seen)))
+
+    with pytest.raises(LLMDeadlineExceeded):
+        await leader_task
+    release.set()
+    assert await follower_task == "answer"
+    # No deadline inside the shared call, but the operation label is kept
+    assert seen == [(None, "grade_qa")]
+
+
+async def test_shared_call_is_cancelled_when_every_waiter_leaves():
+    flights, release, seen = SingleFlight(), asyncio.Event(), []
+    callers = [asyncio.create_task(flights.do("key", shared_call(release, seen))) for _ in range(2)]
+    await asyncio.sleep(0)
+    flight = flights._flights["key"]
+
+    callers[0].cancel()
+    await asyncio.gather(callers[0], return_exceptions=True)
+    assert not flight.task.cancelled()
+
+    callers[1].cancel()
+    await asyncio.gather(callers[1], return_exceptions=True)
+    await asyncio.gather(flight.task, return_exceptions=True)
+    assert flight.task.cancelled()
+    assert "key" not in flights._flights
@@ -0,0 +1,24 @@
+# tests/test_metrics_auth.py
+import pytest
+from fastapi.testclient import TestClient
+from app.core.auth import get_current_user
+from app.main import app
+
+ENDPOINTS = [
+    "/api/metrics/cache", "/api/metrics/llm-scheduler", "/api/metrics/llm-backends", "/api/metrics/pre-grader",
+    "/api/metrics/llm-calls", "/api/metrics/llm-coalescing", "/api/metrics/document-extraction",
+]
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_metrics_need_a_signed_in_user(path):
+    assert TestClient(app).get(path).status_code == 401
+
+
+def test_llm_calls_are_served_to_a_signed_in_user():
+    app.dependency_overrides[get_current_user] = lambda: object()
+    try:
+        response = TestClient(app).get("/api/metrics/llm-calls")
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
@@ -0,0 +1,89 @@
+# tests/test_pre_grader.py
+from types import SimpleNamespace
+import pytest
+from app.services import qa_grading
+from app.services.pre_grader import PreGrader
+
+QUESTION = {
+    "question": "Why would you add an index to a database table?",
+    "answer": "An index speeds up lookups and range scans on the indexed columns, "
+    "at the cost of extra storage and slower writes.",
+    "explanation": "Indexes trade write cost and space for faster reads.",
+    "rubric": {"expected_concepts": ["faster lookups", "slower writes", "extra storage"]},
+}
+ESCALATED_ANSWER = (
+    "It depends on the query patterns; I would look at the slow query log first "
+    "and check whether the planner does sequential scans on large tables."
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_counts(monkeypatch):
+    monkeypatch.setattr(PreGrader, "counts", type(PreGrader.counts)())
+
+
+@pytest.fixture
+def llm_grade(monkeypatch):
+    calls = []
+
+    async def grade_qa_answer(**kwargs):
+        calls.append(kwargs)
+        return {"score": 70, "correctness_level": "good", "feedback": "ok"}
+
+    monkeypatch.setattr(qa_grading.LLMGrader, "grade_qa_answer", grade_qa_answer)
+    return calls
+
+
+@pytest.mark.parametrize(
+    "answer, decision",
+    [
+        ("idk", "non_answer"),
+        ("   ", "non_answer"),
+        (QUESTION["answer"], "verbatim"),
+        ("Why would you add an index to a database table", "echo"),
+        ("bananas", "off_topic"),
+        (ESCALATED_ANSWER, "escalated"),
+    ],
+)
+def test_decisions(answer, decision):
+    assert PreGrader.decide(QUESTION, answer)[0] == decision
+
+
+@pytest.mark.parametrize("answer", ["bananas", "Indexes trade write cost and space for faster reads."])
+def test_question_without_a_reference_answer_is_escalated(answer):
+    question = {**QUESTION, "answer": "", "rubric": {}}
+    assert PreGrader.decide(question, answer) == ("escalated", None)
+
+
+def test_grade_counts_each_decision_once():
+    assert PreGrader.grade(QUESTION, "idk") is not None
+    assert PreGrader.grade(QUESTION, ESCALATED_ANSWER) is None
+
+    assert PreGrader.stats() == {
+        "decisions": {"non_answer": 1, "escalated": 1},
+        "escalation_rate": 0.5,
+    }
+
+
+async def test_escalated_answer_is_pre_graded_once(llm_grade):
+    session = SimpleNamespace(difficulty_level="medium")
+
+    # Submit pre-grades, then the LLM path is told not to pre-grade again
+    assert qa_grading.pre_grade_response(QUESTION, ESCALATED_ANSWER) is None
+    fields = await qa_grading.grade_qa_response(
+        session, QUESTION, ESCALATED_ANSWER, db=None, pre_graded=True
+    )
+
+    assert fields["score"] == 70
+    assert len(llm_grade) == 1
+    assert PreGrader.counts == {"escalated": 1}
+
+
+async def test_grade_qa_response_pre_grades_when_asked(llm_grade):
+    session = SimpleNamespace(difficulty_level="medium")
+
+    fields = await qa_grading.grade_qa_response(session, QUESTION, "idk", db=None)
+
+    assert fields["is_correct"] == "poor"
+    assert not llm_grade
+    assert PreGrader.counts == {"non_answer": 1}
@@ -0,0 +1,54 @@
+# tests/test_prompt_budget.py
+import json
+from app.services.prompt_budget import compact_parsed_content, count_tokens, minify_instructions
+
+PARSED = {
+    "contact_info": {"name": "Ada", "email": "ada@example.com"},
+    "raw_text": "Ada Lovelace, engineer ...",
+    "summary": "Backend engineer",
+    "skills": ["Python", "Kafka", "PostgreSQL"],
+    "projects": [
+        {"name": "Payments API", "tech": ["Python", "PostgreSQL"]},
+        {"name": "Event pipeline", "tech": ["Kafka", "Spark"]},
+    ],
+    "certifications": [],
+    "education": [{"degree": "B.Sc. Computer Science", "notes": ""}],
+}
+
+
+def test_drops_echoed_text_contact_details_and_empty_fields():
+    compact = json.loads(compact_parsed_content(json.dumps(PARSED)))
+    assert "raw_text" not in compact and "contact_info" not in compact
+    assert "certifications" not in compact
+    assert compact["education"] == [{"degree": "B.Sc. Computer Science"}]
+
+
+def test_keeps_core_sections_and_items_about_the_focus_areas():
+    compact = json.loads(compact_parsed_content(json.dumps(PARSED), ["kafka streaming"]))
+    assert compact["skills"] == PARSED["skills"]
+    assert [p["name"] for p in compact["projects"]] == ["Event pipeline"]
+    assert "education" not in compact
+
+
+def test_unrelated_focus_areas_keep_everything():
+    assert compact_parsed_content(json.dumps(PARSED), ["behavioral"]) == compact_parsed_content(json.dumps(PARSED))
+
+
+def test_fits_the_token_budget_shortening_lists_before_dropping_sections():
+    experience = [{"role": f"Engineer {i}", "details": "Built services " * 20} for i in range(20)]
+    compact = compact_parsed_content(json.dumps({**PARSED, "experience": experience}), budget=200)
+    assert count_tokens(compact) <= 200
+    parsed = json.loads(compact)
+    assert parsed["skills"] == PARSED["skills"]
+    assert parsed["summary"] == PARSED["summary"]
+    assert 1 <= len(parsed["experience"]) < len(experience)
+
+
+def test_plain_text_is_only_cut_to_the_budget():
+    text = "Not JSON. " * 200
+    assert compact_parsed_content(text) == text
+    assert count_tokens(compact_parsed_content(text, budget=50)) <= 50
+
+
+def test_minify_instructions_strips_indentation_and_blank_lines():
+    assert minify_instructions("\n    ### Rules:\n\n        - one\n    ") == "### Rules:\n- one"
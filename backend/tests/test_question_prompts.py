@@ -0,0 +1,44 @@
+# tests/test_question_prompts.py
+import json
+import pytest
+from app.services.fake_llm import synthetic_content
+from app.services.file_processor import FileProcessor, MCQ_QUESTION_FORMAT, QA_QUESTION_FORMAT
+from app.services.prompt_budget import minify_instructions
+
+
+@pytest.mark.parametrize("practice_mode, question_format, other_format", [
+    ("mcq", MCQ_QUESTION_FORMAT, QA_QUESTION_FORMAT),
+    ("qa", QA_QUESTION_FORMAT, MCQ_QUESTION_FORMAT),
+])
+def test_fused_prompt_has_the_question_rules_but_not_their_output_format(
+    practice_mode, question_format, other_format
+):
+    prompt = FileProcessor._build_fused_prompt(
+        "resume", "Ada Lovelace, Go engineer", "hard", practice_mode, 5, ["system design"]
+    )
+    assert "### Forbidden Patterns:" in prompt
+    assert "**system design**" in prompt
+    assert '"questions": [<question>, ...]' in prompt
+    assert minify_instructions(question_format) in prompt
+    assert minify_instructions(other_format) not in prompt
+    for section in ("### Enhanced Output Requirements:", "### Content Analysis:", "Return only the JSON output"):
+        assert section not in prompt
+    assert "step 1." not in prompt
+
+
+def test_question_prompt_keeps_both_formats_and_the_content():
+    content = json.dumps({"skills": ["Go", "PostgreSQL"]})
+    prompt = FileProcessor._build_question_prompt(content, "medium", "qa", 5)
+    assert "### Enhanced Output Requirements:" in prompt
+    assert minify_instructions(MCQ_QUESTION_FORMAT) in prompt
+    assert minify_instructions(QA_QUESTION_FORMAT) in prompt
+    assert "PostgreSQL" in prompt
+    assert prompt.rstrip().endswith("Return only the JSON output.")
+
+
+@pytest.mark.parametrize("practice_mode", ["mcq", "qa"])
+def test_fake_llm_answers_the_fused_prompt(practice_mode):
+    prompt = FileProcessor._build_fused_prompt("resume", "Ada Lovelace", "easy", practice_mode, 3)
+    result = json.loads(synthetic_content(prompt))
+    valid, rejected = FileProcessor._validate_questions(result["questions"], practice_mode)
+    assert result["parsed_data"] and len(valid) == 3 and not rejected
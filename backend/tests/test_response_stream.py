@@ -0,0 +1,68 @@
+# tests/test_response_stream.py
+import threading
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from app.models.mock_session import MockSession
+from app.routers import mock_sessions
+from app.services.grading_worker import grading_pool
+
+SESSION_ID = uuid.uuid4()
+
+
+class FakeDB:
+    """Serves one snapshot of the session and its responses (None once deleted)"""
+
+    def __init__(self, session, responses=()):
+        self.session, self.responses = session, list(responses)
+        self.threads = []
+
+    def query(self, model):
+        self.threads.append(threading.current_thread())
+        found = self.session if model is MockSession else self.responses
+        return SimpleNamespace(filter=lambda *criteria: SimpleNamespace(
+            first=lambda: found, all=lambda: found,
+        ))
+
+    def close(self):
+        pass
+
+
+def pending_answer():
+    return SimpleNamespace(
+        id=uuid.uuid4(), session_id=SESSION_ID, question_index=0, question_text="Q", question_type="qa",
+        user_answer="A", is_correct="pending", score=None, feedback="Your answer is being graded.",
+        detailed_feedback=None, time_taken=None, created_at=datetime.now(timezone.utc),
+    )
+
+
+async def test_stream_ends_when_the_session_is_deleted(monkeypatch):
+    session = SimpleNamespace(id=SESSION_ID, grading_mode="background", status="ongoing")
+    snapshots = iter([FakeDB(session, [pending_answer()]), FakeDB(None)])
+    monkeypatch.setattr(mock_sessions, "SessionLocal", lambda: next(snapshots))
+
+    response = await mock_sessions.stream_responses_for_session(
+        SESSION_ID, FakeDB(session), SimpleNamespace(id=uuid.uuid4())
+    )
+    events = []
+    async for event in response.body_iterator:
+        events.append(event)
+        if len(events) == 1:
+            # Wakes the stream, which then finds the session gone
+            grading_pool.publish(SESSION_ID, {"id": "graded"})
+
+    assert [event.split("\n")[0] for event in events] == ["event: response", "event: response", "event: done"]
+    assert '"pending": 0' in events[-1]
+    assert SESSION_ID not in grading_pool._subscribers
+
+
+async def test_responses_are_loaded_off_the_event_loop(monkeypatch):
+    stream_db = FakeDB(SimpleNamespace(id=SESSION_ID, grading_mode="background", status="ongoing"))
+    monkeypatch.setattr(mock_sessions, "SessionLocal", lambda: stream_db)
+
+    response = await mock_sessions.stream_responses_for_session(
+        SESSION_ID, FakeDB(stream_db.session), SimpleNamespace(id=uuid.uuid4())
+    )
+    events = [event async for event in response.body_iterator]
+    assert events[-1].startswith("event: done")
+    assert stream_db.threads and threading.main_thread() not in stream_db.threads
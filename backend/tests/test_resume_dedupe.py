@@ -0,0 +1,109 @@
+# tests/test_resume_dedupe.py
+import io
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import pytest
+from fastapi import UploadFile
+from sqlalchemy.sql import operators
+from starlette.datastructures import Headers
+from app.models.resume import Resume
+from app.routers.resumes import store_resume
+from app.services import file_processor
+from app.services.file_processor import FileProcessor
+from app.services.uploads import spool_upload
+
+RESUME = b"Ada Lovelace\nAnalytical engines, Bernoulli numbers"
+
+
+class FakeDB:
+    """The resumes table as a list, filtered by evaluating the query's == / IS NOT criteria"""
+
+    def __init__(self):
+        self.rows = []
+
+    def query(self, entity):
+        return FakeQuery(self.rows, entity)
+
+    def add(self, row):
+        row.id = uuid.uuid4()
+        row.created_at = datetime.now(timezone.utc)
+        self.rows.append(row)
+
+    def commit(self):
+        pass
+
+    def refresh(self, row):
+        pass
+
+
+class FakeQuery:
+    def __init__(self, rows, entity):
+        self.rows, self.entity = rows, entity
+
+    def filter(self, *criteria):
+        def matches(row, criterion):
+            value = getattr(row, criterion.left.key)
+            if criterion.operator is operators.is_not:
+                return value is not None
+            assert criterion.operator is operators.eq
+            return value == criterion.right.value
+
+        rows = [row for row in self.rows if all(matches(row, c) for c in criteria)]
+        return FakeQuery(rows, self.entity)
+
+    def order_by(self, *_):
+        return self
+
+    def first(self):
+        if not self.rows:
+            return None
+        row = self.rows[-1]
+        return row if self.entity is Resume else SimpleNamespace(**{self.entity.key: getattr(row, self.entity.key)})
+
+
+@pytest.fixture
+def llm_parses(monkeypatch):
+    calls = []
+
+    async def parse_resume_with_llm(content):
+        calls.append(content)
+        return {"name": "Ada Lovelace"}
+
+    monkeypatch.setattr(FileProcessor, "parse_resume_with_llm", parse_resume_with_llm)
+    file_processor._resume_parse_cache.clear()
+    yield calls
+    file_processor._resume_parse_cache.clear()
+
+
+async def upload_resume(db, user):
+    file = UploadFile(io.BytesIO(RESUME), filename="cv.txt", headers=Headers({"content-type": "text/plain"}))
+    with await spool_upload(file) as upload:
+        return await store_resume(upload, db, user)
+
+
+async def test_same_user_uploading_the_same_file_reuses_the_resume(llm_parses, monkeypatch):
+    db, user = FakeDB(), SimpleNamespace(id=uuid.uuid4())
+    first = await upload_resume(db, user)
+
+    extracted = []
+    monkeypatch.setattr(FileProcessor, "extract_text", lambda *args: extracted.append(args))
+    file_processor._resume_parse_cache.clear()
+    again = await upload_resume(db, user)
+
+    assert again is first
+    assert len(db.rows) == 1
+    assert len(llm_parses) == 1
+    assert not extracted
+
+
+async def test_another_user_uploading_the_same_file_gets_their_own_resume(llm_parses):
+    db = FakeDB()
+    ada, grace = SimpleNamespace(id=uuid.uuid4()), SimpleNamespace(id=uuid.uuid4())
+    first = await upload_resume(db, ada)
+    second = await upload_resume(db, grace)
+
+    assert second is not first
+    assert (first.user_id, second.user_id) == (ada.id, grace.id)
+    assert first.file_hash == second.file_hash
+    assert len(db.rows) == 2
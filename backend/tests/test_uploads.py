@@ -0,0 +1,145 @@
+# tests/test_uploads.py
+import hashlib
+import io
+import tempfile
+import zipfile
+import pytest
+from fastapi import FastAPI, HTTPException, Request, UploadFile
+from starlette.datastructures import Headers
+from benchmarks.bench_extraction import make_docx, make_pdf
+from app.routers.file_parser import read_upload_text
+from app.routers.resumes import spool_resume_upload
+from app.services.document_extractor import extract_txt_text
+from app.services.uploads import RequestSizeLimitMiddleware, spool_upload
+
+TEXT = "Ada Lovelace\nAnalytical engines, Bernoulli numbers"
+
+
+@pytest.fixture(autouse=True)
+def spool_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    return tmp_path
+
+
+def upload(content: bytes, filename="resume.txt", content_type="text/plain") -> UploadFile:
+    return UploadFile(io.BytesIO(content), filename=filename, headers=Headers({"content-type": content_type}))
+
+
+def zip_of(*names) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name in names:
+            archive.writestr(name, "<xml/>")
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("content, file_type", [
+    (make_pdf(1), "pdf"),
+    (make_docx(), "docx"),
+    (TEXT.encode(), "txt"),
+    (TEXT.encode("utf-8-sig"), "txt"),
+    (TEXT.encode("utf-16"), "txt"),
+    (TEXT.encode("utf-16-be"), None),
+    (zip_of("xl/workbook.xml"), None),
+    (b"\x7fELF\x02\x01\x01\x00", None),
+])
+async def test_upload_type_is_sniffed_from_its_content(content, file_type):
+    with await spool_upload(upload(content)) as spooled:
+        assert spooled.file_type == file_type
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "utf-16", "utf-16-le"])
+def test_text_is_decoded_without_its_byte_order_mark(encoding):
+    content = TEXT.encode(encoding)
+    if encoding == "utf-16-le":
+        content = b"\xff\xfe" + content
+    assert extract_txt_text(content) == TEXT
+
+
+async def test_spooled_upload_is_hashed_and_removed_on_close(spool_dir):
+    content = make_pdf(2)
+    with await spool_upload(upload(content, "cv.pdf")) as spooled:
+        assert spooled.size == len(content)
+        assert spooled.sha256 == hashlib.sha256(content).hexdigest()
+        with open(spooled.path, "rb") as f:
+            assert f.read() == content
+    assert not any(spool_dir.iterdir())
+
+
+async def test_oversized_upload_is_rejected_and_not_kept(spool_dir):
+    with pytest.raises(HTTPException) as error:
+        await spool_upload(upload(b"x" * 1000), max_bytes=999)
+    assert error.value.status_code == 413
+    assert not any(spool_dir.iterdir())
+
+
+@pytest.mark.parametrize("filename, content", [
+    ("cv.pdf", TEXT.encode()),
+    ("cv.txt", make_pdf(1)),
+    ("cv.docx", zip_of("xl/workbook.xml")),
+])
+async def test_content_must_match_the_extension(spool_dir, filename, content):
+    with pytest.raises(HTTPException) as error:
+        await read_upload_text(upload(content, filename))
+    assert error.value.status_code == 400
+    assert not any(spool_dir.iterdir())
+
+
+async def test_resume_content_must_match_its_declared_type(spool_dir):
+    with pytest.raises(HTTPException) as error:
+        await spool_resume_upload(upload(TEXT.encode(), "cv.pdf", "application/pdf"))
+    assert error.value.status_code == 400
+    assert not any(spool_dir.iterdir())
+
+
+def body_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def receive_body(request: Request):
+        return {"size": len(await request.body())}
+
+    return app
+
+
+async def call(app, chunks, headers=()):
+    """Send `chunks` as a streamed request body; returns (status, chunks read by the app)"""
+    pending = list(chunks)
+    sent = []
+
+    async def receive():
+        if not pending:
+            return {"type": "http.disconnect"}
+        chunk = pending.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(pending)}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": "POST", "path": "/upload", "raw_path": b"/upload", "root_path": "",
+        "scheme": "http", "query_string": b"", "headers": list(headers), "server": ("test", 80),
+        "client": ("test", 1), "http_version": "1.1", "asgi": {"version": "3.0"},
+    }
+    await app(scope, receive, send)
+    start = next(m for m in sent if m["type"] == "http.response.start")
+    return start["status"], len(chunks) - len(pending)
+
+
+async def test_body_within_the_limit_is_passed_through():
+    app = RequestSizeLimitMiddleware(body_app(), max_bytes=100)
+    assert await call(app, [b"x" * 50, b"x" * 50]) == (200, 2)
+
+
+async def test_streamed_body_is_cut_off_once_it_passes_the_limit():
+    app = RequestSizeLimitMiddleware(body_app(), max_bytes=100)
+    status, read = await call(app, [b"x" * 60] * 10)
+    assert status == 413
+    assert read == 2
+
+
+async def test_declared_length_over_the_limit_is_rejected_before_reading():
+    app = RequestSizeLimitMiddleware(body_app(), max_bytes=100)
+    status, read = await call(app, [b"x" * 60] * 10, headers=[(b"content-length", b"600")])
+    assert status == 413
+    assert read == 0